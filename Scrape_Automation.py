@@ -4,11 +4,19 @@ import logging
 import pandas as pd
 
 from helper_functions.link_scrapper import scrapelinksmain
+from helper_functions.link_batch import run_link_batch
 from helper_functions.warc_scraper import warcscrappermain
 from helper_functions.pdf_scraper import pdfscrappermain
-from helper_functions.token_est import estimate_tokens_in_pdf, estimate_tokens_in_warc
+from helper_functions.token_est import estimate_pdf_tokens, estimate_tokens_in_warc, benchmark_text_extraction, calibrate_tokenizer
+from helper_functions.token_est import sample_pdf_tokens, sample_warc_tokens
 from helper_functions.compress_file import compress_pdfs_to_zip, compress_warcs_to_warcgz
 from helper_functions.dashboard import get_project_stats, get_detailed_project_data
+from helper_functions.warc_writer import DEFAULT_MAX_WARC_SIZE, is_warc_file
+from helper_functions.cdx_index import CDXIndex
+from helper_functions.pdf_store import PDF_STORE_FOLDER
+from helper_functions.url_index import get_seen_index
+from helper_functions.link_store import LINK_STORE_FILE
+from helper_functions.token_cache import TokenCache, TOKENS_FOLDER
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -19,7 +27,7 @@ output_root = "output"
 if not os.path.exists(output_root):
     os.makedirs(output_root)
 
-projects = [project for project in os.listdir(output_root) if os.path.isdir(os.path.join(output_root, project))]
+projects = [project for project in os.listdir(output_root) if os.path.isdir(os.path.join(output_root, project)) and not project.startswith('.')]
 
 with st.sidebar:
     st.header("Project Management")
@@ -59,7 +67,7 @@ with st.sidebar:
                         st.session_state.creating_project = False
                         
                         # Refresh projects list
-                        projects = [project for project in os.listdir(output_root) if os.path.isdir(os.path.join(output_root, project))]
+                        projects = [project for project in os.listdir(output_root) if os.path.isdir(os.path.join(output_root, project)) and not project.startswith('.')]
                     except Exception as e:
                         st.error(f"Error creating project: {e}")
         
@@ -141,6 +149,19 @@ with tab1:
     pagination_url = st.text_input("Pagination URL (optional)", "", key="link_scraper_pagination_url", placeholder="https://example.com/page={page_number}")
     next_button_selector = st.text_input("Next Button Selector (optional)", "", key="link_scraper_next_button", placeholder="button.next")
     max_pages = st.number_input("Max Pages", min_value=1, value=1, key="link_scraper_max_pages")
+    # Auto fetches pagination pages without Chrome once the site turns out to render the same without JavaScript
+    # HTTP skips Chrome for pagination entirely and fetches several pages at once
+    link_render_mode = st.selectbox("Render Mode", ["Auto", "Browser", "HTTP"], key="link_scraper_render_mode")
+    if link_render_mode != "Browser":
+        link_concurrency = st.number_input("Concurrent Page Requests", min_value=1, value=8, key="link_scraper_concurrency")
+    else:
+        link_concurrency = 1
+    # Keeps the existing links.csv, adds only new links and stops paginating at the first page with nothing new
+    link_incremental = st.checkbox("Only Add New Links (stop at known links)", key="link_scraper_incremental")
+    # The seen-URL index under output/ remembers the links of every project
+    link_skip_seen = st.checkbox("Skip links found in any project before", key="link_scraper_skip_seen")
+    # Sends a HEAD request to each new link, so the PDF scraper can leave out links that are not PDFs
+    link_probe = st.checkbox("Check status and content type of new links", key="link_scraper_probe")
     
     # New Options for Scroll/Load More
     # scroll_to_load_more = st.checkbox("Scroll to Load More Content", key="scroll_to_load_more")
@@ -159,6 +180,11 @@ with tab1:
             pagination_url=pagination_url,
             next_button_selector=next_button_selector,
             max_pages=max_pages,
+            render_mode=link_render_mode.lower(),
+            concurrency=link_concurrency,
+            incremental=link_incremental,
+            seen_index=get_seen_index(output_root) if link_skip_seen else None,
+            probe=link_probe,
             # scroll_to_load_more=scroll_to_load_more,
             # load_more_button_selector=load_more_button_selector
         )
@@ -167,6 +193,25 @@ with tab1:
         save_path = os.path.join(links_folder, "links.csv")
         st.success(f"Links scraped and saved to: {save_path}")
 
+    # Runs many seeds, each with its own selectors and pagination, from a YAML or CSV job file
+    with st.expander("Batch from a job file"):
+        job_file_path = st.text_input("Job File Path (YAML or CSV)", "", key="link_batch_job_file", placeholder="jobs.yaml")
+        batch_workers = st.number_input("Seeds at Once", min_value=1, value=4, key="link_batch_workers")
+        if st.button("Run Batch", key="run_link_batch"):
+            if not job_file_path or not os.path.exists(job_file_path):
+                st.error("Job file not found.")
+            else:
+                batch_progress = st.progress(0)
+                batch_results = run_link_batch(
+                    job_file_path, links_folder, workers=batch_workers, concurrency=link_concurrency,
+                    incremental=link_incremental,
+                    seen_index=get_seen_index(output_root) if link_skip_seen else None,
+                    probe=link_probe,
+                    progress_callback=lambda done, total: batch_progress.progress(done / total)
+                )
+                st.dataframe(pd.DataFrame([{"seed": name, "links": str(result)} for name, result in batch_results.items()]))
+                st.success(f"Merged links saved to: {os.path.join(links_folder, 'links.csv')}")
+
 # ---------------------------- PDF Scraper Tab ----------------------------
 with tab2:
     st.header("PDF Scraper")
@@ -177,12 +222,27 @@ with tab2:
         links_folder = os.path.join(output_root, st.session_state.current_project, st.session_state.current_subproject, "links")
         
         # List available CSV files in the links folder
-        available_csv_files = [f for f in os.listdir(links_folder) if f.endswith('.csv')]
+        # The link store holds the same links as links.csv plus where they were found and, if probed, their content type
+        available_csv_files = [f for f in os.listdir(links_folder) if f.endswith('.csv') or f == LINK_STORE_FILE]
         
         # If CSV files exist, allow selection
         if available_csv_files:
             selected_csv = st.selectbox("Select CSV File", available_csv_files, key="pdf_scraper_csv_select")
             
+            # HTTP streams the PDFs directly; Browser lets Chrome download them, for sites that block plain clients
+            pdf_download_mode = st.selectbox("Download Mode", ["HTTP", "Browser"], key="pdf_scraper_download_mode")
+            if pdf_download_mode == "HTTP":
+                pdf_concurrency = st.number_input("Concurrent Downloads", min_value=1, value=8, key="pdf_scraper_concurrency")
+                pdf_workers = 1
+            else:
+                # Number of headless Chrome processes to download with
+                pdf_workers = st.number_input("Browser Workers", min_value=1, value=min(4, os.cpu_count() or 1), key="pdf_scraper_workers")
+                pdf_concurrency = 1
+
+            # Finished links are remembered, so a rerun resumes instead of starting over
+            pdf_retry_failed = st.checkbox("Retry failed links only", key="pdf_scraper_retry_failed")
+            pdf_skip_seen = st.checkbox("Skip PDFs downloaded in any project before", key="pdf_scraper_skip_seen")
+
             # Set the output folder for PDFs
             pdf_folder = os.path.join(output_root, st.session_state.current_project, st.session_state.current_subproject, "pdfs")
         
@@ -191,7 +251,10 @@ with tab2:
                 csv_path = os.path.join(links_folder, selected_csv)
                 
                 # Run PDF scraper
-                pdfscrappermain(csv_path, pdf_folder)
+                pdfscrappermain(csv_path, pdf_folder, workers=pdf_workers, retry_failed=pdf_retry_failed,
+                                mode=pdf_download_mode.lower(), concurrency=pdf_concurrency,
+                                store_folder=os.path.join(output_root, PDF_STORE_FOLDER),
+                                seen_index=get_seen_index(output_root) if pdf_skip_seen else None)
                 st.success("PDF scraping completed.")
         else:
             st.warning("No CSV files found in the links folder. Please scrape links first.")
@@ -208,11 +271,40 @@ with tab3:
         links_folder = os.path.join(output_root, st.session_state.current_project, st.session_state.current_subproject, "links")
         
         # List available CSV files in the links folder
-        available_csv_files = [f for f in os.listdir(links_folder) if f.endswith('.csv')]
+        # The link store holds the same links as links.csv plus where they were found and, if probed, their content type
+        available_csv_files = [f for f in os.listdir(links_folder) if f.endswith('.csv') or f == LINK_STORE_FILE]
         
         # If CSV files exist, allow selection
         if available_csv_files:
             selected_csv = st.selectbox("Select CSV File", available_csv_files, key="warc_scraper_csv_select")
+
+            # Async HTTP capture only falls back to Chrome for pages that need JavaScript
+            # Auto tries a few pages per site both ways and skips Chrome for sites that render the same without it
+            capture_mode = st.selectbox("Capture Mode", ["Auto", "Async HTTP", "Browser"], key="warc_scraper_capture_mode")
+            if capture_mode != "Browser":
+                col1, col2 = st.columns(2)
+                with col1:
+                    concurrency = st.number_input("Concurrent Requests", min_value=1, value=16, key="warc_scraper_concurrency")
+                with col2:
+                    per_host_concurrency = st.number_input("Concurrent Requests per Host", min_value=1, value=4, key="warc_scraper_per_host_concurrency")
+            else:
+                concurrency, per_host_concurrency = 1, 1
+
+            # Number of headless Chrome processes for pages that need a browser
+            warc_workers = st.number_input("Browser Workers", min_value=1, value=min(4, os.cpu_count() or 1), key="warc_scraper_workers")
+
+            # Rolling output appends to a few .warc.gz files instead of writing one .warc per URL
+            warc_format = st.selectbox("Output Format", ["Rolling .warc.gz", "One .warc per URL"], key="warc_scraper_output_format")
+            if warc_format == "Rolling .warc.gz":
+                max_warc_size_mb = st.number_input("Rotate WARC at (MB)", min_value=1, value=DEFAULT_MAX_WARC_SIZE // (1024 ** 2), key="warc_scraper_max_size")
+            else:
+                max_warc_size_mb = DEFAULT_MAX_WARC_SIZE // (1024 ** 2)
+
+            # Finished links are remembered, so a rerun resumes instead of starting over
+            warc_retry_failed = st.checkbox("Retry failed links only", key="warc_scraper_retry_failed")
+            warc_recrawl = st.checkbox("Re-crawl finished links", key="warc_scraper_recrawl")
+            warc_dedup = st.checkbox("Store unchanged pages as revisit records", value=True, key="warc_scraper_dedup")
+            warc_skip_seen = st.checkbox("Skip pages captured in any project before", key="warc_scraper_skip_seen")
             
             # Set the output folder for WARCs
             warc_folder = os.path.join(output_root, st.session_state.current_project, st.session_state.current_subproject, "warcs")
@@ -222,8 +314,40 @@ with tab3:
                 csv_path = os.path.join(links_folder, selected_csv)
                 
                 # Run WARC scraper
-                warcscrappermain(csv_path, warc_folder)
+                warcscrappermain(
+                    csv_path,
+                    warc_folder,
+                    mode={"Auto": "auto", "Async HTTP": "async", "Browser": "browser"}[capture_mode],
+                    concurrency=concurrency,
+                    per_host_concurrency=per_host_concurrency,
+                    workers=warc_workers,
+                    warc_format="rolling" if warc_format == "Rolling .warc.gz" else "per-url",
+                    max_warc_size=max_warc_size_mb * 1024 ** 2,
+                    retry_failed=warc_retry_failed,
+                    recrawl=warc_recrawl,
+                    dedup=warc_dedup,
+                    seen_index=get_seen_index(output_root) if warc_skip_seen else None
+                )
                 st.success("WARC scraping completed.")
+
+            # Captures are found through the CDX index with a single seek instead of reading every WARC
+            with st.expander("Look up a captured URL"):
+                scraped_warcs_folder = os.path.join(warc_folder, "scraped-warcs")
+                lookup_url = st.text_input("URL", "", key="warc_lookup_url", placeholder="https://example.com/page")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("Look Up", key="warc_lookup_button") and lookup_url and os.path.isdir(scraped_warcs_folder):
+                        cdx_index = CDXIndex(scraped_warcs_folder)
+                        entry = cdx_index.latest(lookup_url)
+                        if entry:
+                            st.json(entry)
+                            with cdx_index.open_record(entry) as record:
+                                st.code(record.content_stream().read(2000).decode('utf-8', errors='replace'))
+                        else:
+                            st.info("This URL has not been captured yet.")
+                with col2:
+                    if st.button("Rebuild Index", key="warc_rebuild_index") and os.path.isdir(scraped_warcs_folder):
+                        st.success(f"Indexed {CDXIndex(scraped_warcs_folder).build()} records.")
         else:
             st.warning("No CSV files found in the links folder. Please scrape links first.")
     else:
@@ -241,23 +365,96 @@ with tab4:
         
         # Check if PDF and WARC folders exist and contain files
         pdf_files_exist = os.path.exists(pdf_folder) and any(f.endswith(".pdf") for f in os.listdir(pdf_folder))
-        warc_files_exist = os.path.exists(warc_folder) and any(f.endswith(".warc") for f in os.listdir(warc_folder))
+        warc_files_exist = os.path.exists(warc_folder) and any(is_warc_file(f) for f in os.listdir(warc_folder))
         
         if pdf_files_exist or warc_files_exist:
+            # Token counts are kept per file in tokens-counted/, so only new or changed files are read again;
+            # the cache is opened only while counting, as every rerun of the app would otherwise leave one open
+            token_cache_folder = os.path.join(output_root, st.session_state.current_project, st.session_state.current_subproject)
+
+            # Tokens are estimated as characters / 4 unless the tokenizer file of the target model is given
+            tokenizer_path = st.text_input("Tokenizer File (tokenizer.json, leave empty to estimate as characters / 4)", key="token_est_tokenizer").strip() or None
+            if tokenizer_path and not os.path.isfile(tokenizer_path):
+                st.error(f"Tokenizer file not found: {tokenizer_path}")
+                tokenizer_path = None
+            if tokenizer_path and st.button("Calibrate Estimate Against Tokenizer", key="calibrate_tokenizer"):
+                calibration = calibrate_tokenizer(
+                    tokenizer_path,
+                    pdf_folder=pdf_folder if pdf_files_exist else None,
+                    warc_folder=warc_folder if warc_files_exist else None,
+                    report_path=os.path.join(output_root, st.session_state.current_project, st.session_state.current_subproject, TOKENS_FOLDER, "calibration.csv")
+                )
+                st.write(f"{calibration['documents']} documents: characters / 4 gives {calibration['heuristic_tokens']} tokens, "
+                         f"the tokenizer {calibration['tokenizer_tokens']} ({calibration['total_error_percent']:+.1f}% in total, "
+                         f"{calibration['mean_abs_error_percent']:.1f}% per document on average, {calibration['chars_per_token']:.2f} characters per token)")
+                if calibration['rows']:
+                    st.dataframe(pd.DataFrame(calibration['rows']))
+
             # File Type Selection (PDF or WARC)
             file_type = st.selectbox("Select File Type for Token Estimation", ["PDF", "WARC"], key="token_est_file_type")
+
+            # Sampling counts a stratified random sample of files (or WARC records) and stops once the estimate is tight enough
+            estimation_mode = st.radio("Estimation Mode", ["Count Every File", "Sample (Estimate with Confidence Interval)"], key="token_est_mode")
+            sampling = estimation_mode != "Count Every File"
+            if sampling:
+                sample_margin = st.number_input("Stop When Within (± %)", min_value=0.5, max_value=50.0, value=5.0, step=0.5, key="token_est_sample_margin")
+                sample_time_limit = st.number_input("Time Limit (seconds)", min_value=5, value=60, key="token_est_sample_time")
             
             if file_type == "PDF" and pdf_files_exist:
-                if st.button("Estimate Tokens for PDFs", key="estimate_pdf_tokens"):
+                # PDFs are read by several processes at once; very large files are split into page ranges
+                pdf_token_workers = st.number_input("Processes", min_value=1, value=os.cpu_count() or 1, key="token_est_pdf_workers")
+                if sampling and st.button("Estimate Tokens for PDFs", key="sample_pdf_tokens"):
+                    sample_status = st.empty()
+                    pdf_sample_result = sample_pdf_tokens(
+                        pdf_folder, target_margin=sample_margin / 100, time_limit=sample_time_limit,
+                        workers=pdf_token_workers, tokenizer_path=tokenizer_path,
+                        progress_callback=lambda estimate, margin, sampled: sample_status.text(f"{sampled} files sampled: {estimate:,.0f} ± {margin:,.0f} tokens")
+                    )
+                    st.success(f"About {pdf_sample_result['estimate']:,.0f} tokens ({pdf_sample_result['confidence']:.0%} interval "
+                               f"{pdf_sample_result['low']:,.0f} - {pdf_sample_result['high']:,.0f}), from {pdf_sample_result['sampled']} of {pdf_sample_result['units']} files.")
+                    if pdf_sample_result['stopped'] == 'time':
+                        st.warning("Stopped at the time limit before the interval reached the target; allow more time for a tighter estimate.")
+                    if pdf_sample_result['errors']:
+                        st.warning(f"{len(pdf_sample_result['errors'])} sampled PDF files could not be read and were counted as 0 tokens.")
+                elif not sampling and st.button("Estimate Tokens for PDFs", key="estimate_pdf_tokens"):
                     # Estimate tokens for PDF files in the "scraped-pdfs" folder
-                    total_tokens, num_files = estimate_tokens_in_pdf(pdf_folder)
-                    st.success(f"Total tokens in PDF files: {total_tokens}. Estimated from {num_files} PDF files.")
+                    pdf_token_progress = st.progress(0)
+                    with TokenCache(token_cache_folder) as token_cache:
+                        pdf_token_result = estimate_pdf_tokens(
+                            pdf_folder, workers=pdf_token_workers,
+                            progress_callback=lambda done, total: pdf_token_progress.progress(done / total),
+                            error_report_path=os.path.join(os.path.dirname(pdf_folder), "token_errors.csv"),
+                            cache=token_cache,
+                            tokenizer_path=tokenizer_path
+                        )
+                    st.success(f"Total tokens in PDF files: {pdf_token_result['total_tokens']}. Estimated from {pdf_token_result['files']} PDF files "
+                               f"({pdf_token_result['cached']} unchanged since the last estimate).")
+                    if pdf_token_result['errors']:
+                        st.warning(f"{len(pdf_token_result['errors'])} PDF files could not be read and were counted as 0 tokens.")
+                        st.dataframe(pd.DataFrame(sorted(pdf_token_result['errors'].items()), columns=["File", "Error"]))
                 
             elif file_type == "WARC" and warc_files_exist:
-                if st.button("Estimate Tokens for WARCs", key="estimate_warc_tokens"):
+                if sampling and st.button("Estimate Tokens for WARCs", key="sample_warc_tokens"):
+                    # Records are sampled through the CDX index, and files the index does not cover as a whole
+                    sample_status = st.empty()
+                    warc_sample_result = sample_warc_tokens(
+                        warc_folder, target_margin=sample_margin / 100, time_limit=sample_time_limit, tokenizer_path=tokenizer_path,
+                        progress_callback=lambda estimate, margin, sampled: sample_status.text(f"{sampled} sampled: {estimate:,.0f} ± {margin:,.0f} tokens")
+                    )
+                    st.success(f"About {warc_sample_result['estimate']:,.0f} tokens ({warc_sample_result['confidence']:.0%} interval "
+                               f"{warc_sample_result['low']:,.0f} - {warc_sample_result['high']:,.0f}), from {warc_sample_result['sampled']} of {warc_sample_result['units']} {warc_sample_result['unit']} units.")
+                    if warc_sample_result['stopped'] == 'time':
+                        st.warning("Stopped at the time limit before the interval reached the target; allow more time for a tighter estimate.")
+                elif not sampling and st.button("Estimate Tokens for WARCs", key="estimate_warc_tokens"):
                     # Estimate tokens for WARC files in the "scraped-warcs" folder
-                    total_tokens, num_files = estimate_tokens_in_warc(warc_folder)
+                    with TokenCache(token_cache_folder) as token_cache:
+                        total_tokens, num_files = estimate_tokens_in_warc(warc_folder, cache=token_cache, tokenizer_path=tokenizer_path)
                     st.success(f"Total tokens in WARC files: {total_tokens}. Estimated from {num_files} WARC files.")
+                # Times the old BeautifulSoup text extraction against the lxml one on the same records
+                if st.button("Compare Text Extraction Speed", key="benchmark_warc_text"):
+                    benchmark = benchmark_text_extraction(warc_folder)
+                    st.write(f"{benchmark['records']} records: BeautifulSoup {benchmark['beautifulsoup_records_per_second']:.1f} records/s, "
+                             f"lxml {benchmark['lxml_records_per_second']:.1f} records/s")
                 
             if not pdf_files_exist and file_type == "PDF":
                 st.warning(f"No PDFs found in {pdf_folder}. Please scrape PDFs first.")
@@ -283,7 +480,7 @@ with tab5:
         
         # Check if PDF and WARC folders exist and contain files
         pdf_files_exist = os.path.exists(pdf_folder) and any(f.endswith(".pdf") for f in os.listdir(pdf_folder))
-        warc_files_exist = os.path.exists(warc_folder) and any(f.endswith(".warc") for f in os.listdir(warc_folder))
+        warc_files_exist = os.path.exists(warc_folder) and any(is_warc_file(f) for f in os.listdir(warc_folder))
         
         if pdf_files_exist or warc_files_exist:
             # File Type Selection (PDF or WARC)
@@ -350,7 +547,10 @@ with tab7:
         st.metric("WARC Files", f"{stats['warc_count']} files")
     with col4:
         st.metric("Links (CSV Files)", f"{stats['link_count']} files")
-        st.metric("Token Files", f"{stats['token_count']} files")
+        st.metric("Files with Token Counts", f"{stats['token_count']} files")
+    st.metric("Stored Links", stats["stored_link_count"])
+    if stats["links_by_content_type"]:
+        st.dataframe(pd.DataFrame(sorted(stats["links_by_content_type"].items()), columns=["Content Type", "Links"]))
     
     col5, col6 = st.columns(2)
     with col5:
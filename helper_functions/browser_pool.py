@@ -0,0 +1,225 @@
+import sys
+import time
+import queue
+import signal
+import logging
+import multiprocessing
+from collections import deque, OrderedDict
+from urllib.parse import urlsplit
+
+# Function run inside each worker process: owns one browser and works through its inbox
+def _worker_main(worker_key, inbox, results, driver_factory, driver_kwargs, handler, handler_kwargs):
+    # Make terminate() run the finally block so Chrome and chromedriver are not orphaned
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    driver = driver_factory(worker_key[0], **driver_kwargs)
+    try:
+        results.put(('ready', worker_key, None, None))
+        while True:
+            task = inbox.get()
+            if task is None:
+                break
+            index, url = task
+            try:
+                ok = handler(url, driver, **handler_kwargs)
+                results.put(('done' if ok is not False else 'failed', worker_key, index, None))
+            except Exception as e:
+                results.put(('failed', worker_key, index, str(e)))
+    finally:
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+class BrowserPool:
+    """Runs handler(url, driver, **handler_kwargs) over a link list with one browser per process.
+
+    Links are handed out one at a time to whichever worker is idle, so the list is split
+    dynamically across workers. A worker that dies or exceeds task_timeout is killed and
+    replaced, and its link is retried until max_attempts is reached.
+
+    With a scheduler (politeness.HostScheduler), a link is only handed out once its host
+    has a free slot; meanwhile idle workers take links from other hosts.
+    """
+
+    def __init__(self, driver_factory, handler, workers=4, driver_kwargs=None, handler_kwargs=None,
+                 task_timeout=180, startup_timeout=60, max_attempts=2, scheduler=None):
+        self.driver_factory = driver_factory
+        self.handler = handler
+        self.workers = workers
+        self.driver_kwargs = driver_kwargs or {}
+        self.handler_kwargs = handler_kwargs or {}
+        self.task_timeout = task_timeout
+        self.startup_timeout = startup_timeout
+        self.max_attempts = max_attempts
+        self.scheduler = scheduler
+
+        self._context = multiprocessing.get_context()
+        self._results = None
+        self._slots = {}
+        self._generation = 0
+
+    def _spawn(self, slot):
+        self._generation += 1
+        worker_key = (slot, self._generation)
+        inbox = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_key, inbox, self._results, self.driver_factory, self.driver_kwargs, self.handler, self.handler_kwargs),
+            daemon=True
+        )
+        process.start()
+        self._slots[slot] = {
+            'key': worker_key,
+            'process': process,
+            'inbox': inbox,
+            'ready': False,
+            'task': None,
+            'since': time.monotonic()
+        }
+
+    def _stop(self, slot):
+        process = self._slots[slot]['process']
+        process.terminate()
+        process.join(10)
+        if process.is_alive():
+            process.kill()
+            process.join()
+
+    def run(self, link_list, catname='', progress_callback=None):
+        """Processes link_list and returns a dict mapping each URL to True (done) or False (failed)."""
+        total = len(link_list)
+        pending = _HostQueues(self.scheduler)
+        for index, url in enumerate(link_list):
+            pending.append((index, url, 1))
+        outcome = {}
+        finished = 0
+        startup_failures = 0
+
+        self._results = self._context.Queue()
+        for slot in range(min(self.workers, total)):
+            self._spawn(slot)
+
+        def finish(index, url, ok, error=None):
+            nonlocal finished
+            finished += 1
+            outcome[url] = ok
+            if ok:
+                logging.info(f"{finished}/{total} - {catname} - Done {url}")
+            else:
+                logging.error(f"{finished}/{total} - {catname} - Failed {url}: {error}")
+            if progress_callback:
+                progress_callback(finished, total, url, ok)
+
+        try:
+            while finished < total:
+                # Hand the next link to every idle worker
+                for slot, worker in self._slots.items():
+                    if worker['ready'] and worker['task'] is None and pending:
+                        task = pending.next_ready()
+                        if task is None:
+                            break
+                        index, url, attempt = task
+                        worker['task'] = (index, url, attempt)
+                        worker['since'] = time.monotonic()
+                        worker['inbox'].put((index, url))
+
+                try:
+                    event, worker_key, index, error = self._results.get(timeout=0.2 if pending else 1)
+                except queue.Empty:
+                    event = None
+
+                if event:
+                    worker = self._slots.get(worker_key[0])
+                    # Ignore messages from a worker that has already been replaced
+                    if worker and worker['key'] == worker_key:
+                        if event == 'ready':
+                            worker['ready'] = True
+                            startup_failures = 0
+                        elif worker['task'] and worker['task'][0] == index:
+                            _, url, _ = worker['task']
+                            worker['task'] = None
+                            if self.scheduler:
+                                self.scheduler.release(url, latency=time.monotonic() - worker['since'], ok=event == 'done')
+                            finish(index, url, event == 'done', error)
+
+                # Replace workers that crashed, hung on a link or never came up
+                now = time.monotonic()
+                for slot, worker in list(self._slots.items()):
+                    crashed = not worker['process'].is_alive()
+                    hung = worker['task'] is not None and now - worker['since'] > self.task_timeout
+                    stuck = not worker['ready'] and now - worker['since'] > self.startup_timeout
+                    if not (crashed or hung or stuck):
+                        continue
+
+                    logging.warning(f"Restarting browser worker {slot} ({'crashed' if crashed else 'timed out'})")
+                    self._stop(slot)
+                    if not worker['ready']:
+                        startup_failures += 1
+                    if worker['task']:
+                        index, url, attempt = worker['task']
+                        if self.scheduler:
+                            self.scheduler.release(url, ok=False)
+                        if attempt < self.max_attempts:
+                            pending.append((index, url, attempt + 1))
+                        else:
+                            finish(index, url, False, f"worker failed {attempt} times")
+                    if pending or any(other['task'] for other_slot, other in self._slots.items() if other_slot != slot):
+                        self._spawn(slot)
+                    else:
+                        del self._slots[slot]
+
+                # Give up instead of restarting forever when no browser can start at all
+                if startup_failures >= 2 * self.workers:
+                    logging.error("Browser workers keep failing to start. Stopping.")
+                    for index, url, _ in pending.drain():
+                        finish(index, url, False, "no browser worker could start")
+                    break
+        finally:
+            for worker in self._slots.values():
+                if worker['process'].is_alive():
+                    worker['inbox'].put(None)
+            for slot, worker in self._slots.items():
+                worker['process'].join(30)
+                if worker['process'].is_alive():
+                    self._stop(slot)
+            self._slots = {}
+
+        return outcome
+
+class _HostQueues:
+    """Pending links grouped by host, handed out round-robin over the hosts the scheduler allows."""
+
+    def __init__(self, scheduler=None):
+        self.scheduler = scheduler
+        self._queues = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, task):
+        host = urlsplit(task[1]).netloc
+        self._queues.setdefault(host, deque()).append(task)
+        self._size += 1
+
+    def next_ready(self):
+        """Returns the next task whose host has a free slot, or None if every host has to wait."""
+        for host in list(self._queues):
+            tasks = self._queues[host]
+            if self.scheduler and self.scheduler.try_acquire(tasks[0][1]):
+                continue
+            task = tasks.popleft()
+            self._size -= 1
+            # Move the host to the back so the other hosts get their turn
+            del self._queues[host]
+            if tasks:
+                self._queues[host] = tasks
+            return task
+        return None
+
+    def drain(self):
+        for tasks in self._queues.values():
+            yield from tasks
+        self._queues.clear()
+        self._size = 0
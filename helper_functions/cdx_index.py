@@ -0,0 +1,184 @@
+import os
+import json
+import heapq
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from warcio.archiveiterator import ArchiveIterator
+from helper_functions.warc_writer import is_warc_file
+
+# Sorted CDXJ index kept next to the WARC files it describes
+CDX_INDEX_FILE = 'index.cdxj'
+
+# Unsorted entries appended while capturing, merged into the sorted index by compact()
+CDX_LOG_FILE = 'index.cdxj.log'
+
+# Record types that get an index entry
+INDEXED_RECORD_TYPES = ('response', 'revisit')
+
+_append_lock = threading.Lock()
+
+def surt_key(url):
+    """Sort-friendly URL key, e.g. https://www.bkn.go.id/Berita/?b=2&a=1 -> id,go,bkn)/berita/?a=1&b=2"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    key = ','.join(reversed(host.split('.')))
+    if parts.port and parts.port not in (80, 443):
+        key += f':{parts.port}'
+    key += ')' + (parts.path or '/').lower()
+    if parts.query:
+        key += '?' + '&'.join(sorted(parts.query.split('&'))).lower()
+    return key.replace(' ', '%20')
+
+def cdx_line(record, filename, offset, length):
+    """Returns the CDXJ line for a record stored at offset/length in filename, or None if it is not indexed."""
+    if record.rec_type not in INDEXED_RECORD_TYPES:
+        return None
+
+    url = record.rec_headers.get_header('WARC-Target-URI')
+    warc_date = record.rec_headers.get_header('WARC-Date') or ''
+    timestamp = ''.join(c for c in warc_date if c.isdigit())[:14]
+    fields = {
+        'url': url,
+        'digest': record.rec_headers.get_header('WARC-Payload-Digest'),
+        'filename': filename,
+        'offset': offset,
+        'length': length
+    }
+    if record.http_headers:
+        fields['status'] = record.http_headers.get_statuscode()
+        content_type = record.http_headers.get_header('Content-Type')
+        if content_type:
+            fields['mime'] = content_type.split(';')[0].strip().lower()
+    if record.rec_type == 'revisit':
+        fields['mime'] = 'warc/revisit'
+    return f"{surt_key(url)} {timestamp} {json.dumps(fields, sort_keys=True)}\n"
+
+def _parse_line(line):
+    key, timestamp, fields = line.rstrip('\n').split(' ', 2)
+    entry = json.loads(fields)
+    entry['urlkey'] = key
+    entry['timestamp'] = timestamp
+    return entry
+
+class CDXIndex:
+    """CDXJ index of the WARC files in a folder, mapping URL and time to file, offset and length.
+
+    Lookups binary-search the sorted index file by seeking, so they stay fast however many
+    records there are, and the record itself is read with a single seek into its WARC file.
+    """
+
+    def __init__(self, warc_folder):
+        self.warc_folder = warc_folder
+        self.index_path = os.path.join(warc_folder, CDX_INDEX_FILE)
+        self.log_path = os.path.join(warc_folder, CDX_LOG_FILE)
+
+    def append(self, lines):
+        """Adds unsorted entries; safe across threads and, since each batch is one append, across processes."""
+        lines = [line for line in lines if line]
+        if not lines:
+            return
+        with _append_lock, open(self.log_path, 'a', encoding='utf-8') as log_file:
+            log_file.write(''.join(lines))
+
+    def compact(self):
+        """Merges appended entries into the sorted index."""
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'r', encoding='utf-8') as log_file:
+            new_lines = sorted(log_file)
+
+        # WARC files are never rewritten (a URL captured again gets a new file), so old entries stay valid
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as out:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as index_file:
+                    out.writelines(heapq.merge(index_file, new_lines))
+            else:
+                out.writelines(new_lines)
+        os.replace(temp_path, self.index_path)
+        os.remove(self.log_path)
+
+    def build(self):
+        """Rebuilds the index from scratch by reading every WARC file in the folder."""
+        lines = []
+        warc_files = sorted(name for name in os.listdir(self.warc_folder) if is_warc_file(name))
+        for warc_file in warc_files:
+            with open(os.path.join(self.warc_folder, warc_file), 'rb') as stream:
+                iterator = ArchiveIterator(stream)
+                for record in iterator:
+                    if record.rec_type in INDEXED_RECORD_TYPES:
+                        lines.append(cdx_line(record, warc_file, iterator.get_record_offset(), iterator.get_record_length()))
+        lines.sort()
+
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as out:
+            out.writelines(lines)
+        os.replace(temp_path, self.index_path)
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        logging.info(f"Indexed {len(lines)} records from {len(warc_files)} WARC files")
+        return len(lines)
+
+    def _search_sorted(self, key):
+        if not os.path.exists(self.index_path):
+            return []
+        prefix = key.encode('utf-8') + b' '
+        with open(self.index_path, 'rb') as index_file:
+            # Find the first line whose key is >= key; a position stands for the first line starting at or after it
+            lo, hi = 0, os.path.getsize(self.index_path)
+            while lo < hi:
+                mid = (lo + hi) // 2
+                index_file.seek(mid - 1 if mid else 0)
+                if mid:
+                    index_file.readline()
+                line = index_file.readline()
+                if line and line.split(b' ', 1)[0] < prefix[:-1]:
+                    lo = mid + 1
+                else:
+                    hi = mid
+
+            index_file.seek(lo - 1 if lo else 0)
+            if lo:
+                index_file.readline()
+            matches = []
+            for line in index_file:
+                if not line.startswith(prefix):
+                    break
+                matches.append(_parse_line(line.decode('utf-8')))
+        return matches
+
+    def lookup(self, url):
+        """Returns all captures of url, oldest first."""
+        key = surt_key(url)
+        matches = self._search_sorted(key)
+        if os.path.exists(self.log_path):
+            with open(self.log_path, 'r', encoding='utf-8') as log_file:
+                matches += [_parse_line(line) for line in log_file if line.startswith(key + ' ')]
+        return sorted(matches, key=lambda entry: entry['timestamp'])
+
+    def entries(self):
+        """Yields every entry, including those appended and not merged into the sorted index yet."""
+        for path in (self.index_path, self.log_path):
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as index_file:
+                    for line in index_file:
+                        yield _parse_line(line)
+
+    def latest(self, url):
+        matches = self.lookup(url)
+        return matches[-1] if matches else None
+
+    def contains(self, url):
+        """Whether url has been captured already."""
+        return bool(self.lookup(url))
+
+    @contextmanager
+    def open_record(self, entry):
+        """Yields the warcio record an index entry points to, read with one seek."""
+        with open(os.path.join(self.warc_folder, entry['filename']), 'rb') as stream:
+            stream.seek(entry['offset'])
+            yield next(iter(ArchiveIterator(stream)))
@@ -2,6 +2,10 @@ import os
 import zipfile
 import shutil
 import logging
+from warcio.archiveiterator import ArchiveIterator
+from warcio.warcwriter import WARCWriter
+from helper_functions.warc_writer import is_warc_file
+from helper_functions.pdf_store import unique_pdf_files
 
 def compress_pdfs_to_zip(pdf_dir, description, output_dir):
     try:
@@ -14,11 +18,11 @@ def compress_pdfs_to_zip(pdf_dir, description, output_dir):
         
         # Create the ZIP file and add PDFs
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            for pdf_file in os.listdir(pdf_dir):
-                if pdf_file.endswith(".pdf"):
-                    pdf_path = os.path.join(pdf_dir, pdf_file)
-                    zipf.write(pdf_path, arcname=pdf_file)  # Add file to ZIP with relative name
-                    logging.info(f"Added {pdf_file} to the ZIP archive.")
+            # The same document downloaded under several names is archived once
+            for pdf_file in unique_pdf_files(pdf_dir):
+                pdf_path = os.path.join(pdf_dir, pdf_file)
+                zipf.write(pdf_path, arcname=pdf_file)  # Add file to ZIP with relative name
+                logging.info(f"Added {pdf_file} to the ZIP archive.")
         
         logging.info(f"ZIP archive created at: {zip_path}")
         return zip_path
@@ -36,11 +40,18 @@ def compress_warcs_to_warcgz(warc_dir, description, output_dir):
         gz_path = os.path.join(output_dir, gz_file_name)
 
         with open(gz_path, 'wb') as output_file:
+            warc_writer = WARCWriter(output_file, gzip=True)
             for warc_file in os.listdir(warc_dir):
-                if warc_file.endswith(".warc"):
+                if is_warc_file(warc_file):
                     warc_path = os.path.join(warc_dir, warc_file)
                     with open(warc_path, 'rb') as input_file:
-                        shutil.copyfileobj(input_file, output_file)
+                        if warc_file.endswith(".warc.gz"):
+                            # Already gzipped per record, and gzip members can simply be concatenated
+                            shutil.copyfileobj(input_file, output_file)
+                        else:
+                            # Gzip plain WARCs record by record so the result stays seekable per record
+                            for record in ArchiveIterator(input_file):
+                                warc_writer.write_record(record)
                     logging.info(f"Added {warc_file} to the WARC.GZ archive.")
         
         logging.info(f"Combined WARC.GZ file created at: {gz_path}")
@@ -1,4 +1,8 @@
 import os
+from helper_functions.warc_writer import is_warc_file
+from helper_functions.pdf_store import unique_pdf_files
+from helper_functions.link_store import LinkStore, LINK_STORE_FILE
+from helper_functions.token_cache import PDF_KIND, WARC_KIND, cached_token_totals
 
 # Function to get the project statistics
 def get_project_stats(output_root):
@@ -10,14 +14,18 @@ def get_project_stats(output_root):
         "warc_count": 0,
         "warc_size": 0.0,
         "link_count": 0,
+        "stored_link_count": 0,
+        "links_by_content_type": {},
         "token_count": 0,
         "total_size": 0.0
     }
+    # PDFs hardlinked from the shared PDF store into several subprojects are counted once
+    seen_pdfs = set()
 
     # Loop through each project in the output directory
     for project in os.listdir(output_root):
         project_path = os.path.join(output_root, project)
-        if os.path.isdir(project_path):
+        if os.path.isdir(project_path) and not project.startswith('.'):
             stats["total_projects"] += 1
 
             # Loop through each subproject in the project
@@ -29,16 +37,18 @@ def get_project_stats(output_root):
                     # Count PDF files and their sizes
                     pdf_folder = os.path.join(subproject_path, "pdfs", "scraped-pdfs")
                     if os.path.exists(pdf_folder):
-                        for pdf_file in os.listdir(pdf_folder):
-                            if pdf_file.endswith(".pdf"):
+                        for pdf_file in unique_pdf_files(pdf_folder):
+                            pdf_stat = os.stat(os.path.join(pdf_folder, pdf_file))
+                            if (pdf_stat.st_dev, pdf_stat.st_ino) not in seen_pdfs:
+                                seen_pdfs.add((pdf_stat.st_dev, pdf_stat.st_ino))
                                 stats["pdf_count"] += 1
-                                stats["pdf_size"] += os.path.getsize(os.path.join(pdf_folder, pdf_file))
+                                stats["pdf_size"] += pdf_stat.st_size
 
                     # Count WARC files and their sizes
                     warc_folder = os.path.join(subproject_path, "warcs", "scraped-warcs")
                     if os.path.exists(warc_folder):
                         for warc_file in os.listdir(warc_folder):
-                            if warc_file.endswith(".warc"):
+                            if is_warc_file(warc_file):
                                 stats["warc_count"] += 1
                                 stats["warc_size"] += os.path.getsize(os.path.join(warc_folder, warc_file))
 
@@ -49,11 +59,16 @@ def get_project_stats(output_root):
                             if link_file.endswith(".csv"):
                                 stats["link_count"] += 1
 
-                    tokens_folder = os.path.join(subproject_path, "tokens-counted")
-                    if os.path.exists(tokens_folder):
-                        for token_file in os.listdir(tokens_folder):
-                            if token_file.endswith(".txt"):
-                                stats["token_count"] += 1
+                        # Stored links are counted in SQL, without reading the store
+                        link_store_path = os.path.join(links_folder, LINK_STORE_FILE)
+                        if os.path.exists(link_store_path):
+                            with LinkStore(link_store_path) as store:
+                                stats["stored_link_count"] += store.count()
+                                for content_type, count in store.counts_by_content_type().items():
+                                    stats["links_by_content_type"][content_type] = stats["links_by_content_type"].get(content_type, 0) + count
+
+                    # Files with a cached token count
+                    stats["token_count"] += sum(files for _, files in cached_token_totals(subproject_path).values())
 
     # Convert sizes from bytes to MB or GB
     stats["pdf_size"] = stats["pdf_size"] / (1024 ** 2)  # MB
@@ -69,7 +84,7 @@ def get_detailed_project_data(output_root):
     # Loop through each project and subproject to gather details
     for project in os.listdir(output_root):
         project_path = os.path.join(output_root, project)
-        if os.path.isdir(project_path):
+        if os.path.isdir(project_path) and not project.startswith('.'):
             total_pdf_tokens = 0
             total_warc_tokens = 0
             total_size = 0.0
@@ -80,7 +95,6 @@ def get_detailed_project_data(output_root):
                 if os.path.isdir(subproject_path):
                     pdf_folder = os.path.join(subproject_path, "pdfs", "scraped-pdfs")
                     warc_folder = os.path.join(subproject_path, "warcs", "scraped-warcs")
-                    tokens_folder = os.path.join(subproject_path, "tokens-counted")
 
                     # Get PDF details
                     pdf_files = 0
@@ -88,10 +102,9 @@ def get_detailed_project_data(output_root):
                     pdf_tokens = 0
 
                     if os.path.exists(pdf_folder):
-                        for pdf_file in os.listdir(pdf_folder):
-                            if pdf_file.endswith(".pdf"):
-                                pdf_files += 1
-                                pdf_size += os.path.getsize(os.path.join(pdf_folder, pdf_file))
+                        for pdf_file in unique_pdf_files(pdf_folder):
+                            pdf_files += 1
+                            pdf_size += os.path.getsize(os.path.join(pdf_folder, pdf_file))
 
                     # Get WARC details
                     warc_files = 0
@@ -100,23 +113,14 @@ def get_detailed_project_data(output_root):
 
                     if os.path.exists(warc_folder):
                         for warc_file in os.listdir(warc_folder):
-                            if warc_file.endswith(".warc"):
+                            if is_warc_file(warc_file):
                                 warc_files += 1
                                 warc_size += os.path.getsize(os.path.join(warc_folder, warc_file))
 
-                    # Get token details
-                    pdf_token_count = 0
-                    warc_token_count = 0
-
-                    if os.path.exists(tokens_folder):
-                        for token_file in os.listdir(tokens_folder):
-                            if token_file.endswith(".txt"):
-                                with open(os.path.join(tokens_folder, token_file), 'r') as f:
-                                    tokens = f.read().split()
-                                    if "pdf" in token_file:
-                                        pdf_token_count += len(tokens)
-                                    elif "warc" in token_file:
-                                        warc_token_count += len(tokens)
+                    # Get token details from the token cache the estimator fills
+                    token_totals = cached_token_totals(subproject_path)
+                    pdf_token_count = token_totals.get(PDF_KIND, (0, 0))[0]
+                    warc_token_count = token_totals.get(WARC_KIND, (0, 0))[0]
 
                     # Prepare data for the table
                     total_size += pdf_size + warc_size
@@ -0,0 +1,101 @@
+import os
+import sqlite3
+import threading
+
+# Default file name of the digest index inside the WARC project folder
+DEDUP_INDEX_FILE = 'dedup.sqlite'
+
+# WARC revisit profile for a 304 answer to a conditional request
+SERVER_NOT_MODIFIED_PROFILE = 'http://netpreserve.org/warc/1.0/revisit/server-not-modified'
+
+# Open indexes, one per database file and process
+_digest_indexes = {}
+_digest_indexes_lock = threading.Lock()
+
+class DigestIndex:
+    """Remembers what was captured before, so unchanged content can be stored as a revisit record.
+
+    Two tables are kept: one maps each payload digest to the first capture that stored it in
+    full, the other keeps the last digest, ETag and Last-Modified seen for each URL so the
+    next fetch can be a conditional request. Safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS payloads (
+                digest TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                warc_date TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+        """)
+
+    def conditional_headers(self, url):
+        """Returns If-None-Match/If-Modified-Since headers for a URL captured before."""
+        with self._lock:
+            row = self.conn.execute("SELECT etag, last_modified FROM urls WHERE url = ?", (url,)).fetchone()
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def original_for_url(self, url):
+        """Returns (digest, url, warc_date) of the full capture the URL's last payload refers to."""
+        with self._lock:
+            return self.conn.execute(
+                "SELECT p.digest, p.url, p.warc_date FROM urls u JOIN payloads p ON p.digest = u.digest WHERE u.url = ?",
+                (url,)
+            ).fetchone()
+
+    def original_for_digest(self, digest):
+        """Returns (url, warc_date) of the full capture with this payload digest, or None."""
+        with self._lock:
+            return self.conn.execute("SELECT url, warc_date FROM payloads WHERE digest = ?", (digest,)).fetchone()
+
+    def record_capture(self, url, digest, warc_date, etag=None, last_modified=None):
+        """Stores a capture; the first capture of a digest becomes the original later revisits point to."""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO payloads (digest, url, warc_date) VALUES (?, ?, ?)",
+                (digest, url, warc_date)
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO urls (url, digest, etag, last_modified) VALUES (?, ?, ?, ?)",
+                (url, digest, etag, last_modified)
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+def get_digest_index(db_path):
+    """Returns the shared DigestIndex for db_path in the current process."""
+    # Keyed by pid so a forked browser worker opens its own connection
+    key = (os.path.abspath(db_path), os.getpid())
+    with _digest_indexes_lock:
+        if key not in _digest_indexes:
+            _digest_indexes[key] = DigestIndex(db_path)
+        return _digest_indexes[key]
+
+def close_digest_indexes():
+    with _digest_indexes_lock:
+        for key, index in list(_digest_indexes.items()):
+            if key[1] == os.getpid():
+                index.close()
+                del _digest_indexes[key]
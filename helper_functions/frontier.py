@@ -0,0 +1,121 @@
+import time
+import sqlite3
+import logging
+
+# States a URL moves through in the frontier
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+# Default file name of the frontier database inside a scraper's project folder
+FRONTIER_FILE = 'frontier.sqlite'
+
+class Frontier:
+    """Persistent record of which URLs of a scrape are pending, in flight, done or failed.
+
+    Kept as a SQLite file in the subproject folder so a run that is interrupted (Streamlit
+    reload, Chrome crash) can pick up where it stopped. URLs still marked in flight when the
+    frontier is opened belonged to a run that died and are put back to pending.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                updated_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS urls_state ON urls (state)")
+        with self.conn:
+            self.conn.execute("UPDATE urls SET state = ? WHERE state = ?", (PENDING, IN_FLIGHT))
+
+    def add(self, urls):
+        """Adds URLs as pending; URLs the frontier already knows keep their state."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO urls (url, state, updated_at) VALUES (?, ?, ?)",
+                ((url, PENDING, now) for url in urls)
+            )
+
+    def select(self, urls, state):
+        """Returns the URLs from urls (in their original order) that are currently in state."""
+        in_state = {row[0] for row in self.conn.execute("SELECT url FROM urls WHERE state = ?", (state,))}
+        return [url for url in urls if url in in_state]
+
+    def reset(self, urls):
+        """Puts finished or failed URLs back to pending so they are fetched again."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE urls SET state = ?, updated_at = ? WHERE url = ? AND state IN (?, ?)",
+                ((PENDING, now, url, DONE, FAILED) for url in urls)
+            )
+
+    def mark_in_flight(self, urls):
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE urls SET state = ?, attempts = attempts + 1, updated_at = ? WHERE url = ?",
+                ((IN_FLIGHT, now, url) for url in urls)
+            )
+
+    def mark_done(self, url):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE urls SET state = ?, last_error = NULL, updated_at = ? WHERE url = ?",
+                (DONE, time.time(), url)
+            )
+
+    def mark_failed(self, url, error=None):
+        with self.conn:
+            self.conn.execute(
+                "UPDATE urls SET state = ?, last_error = ?, updated_at = ? WHERE url = ?",
+                (FAILED, error, time.time(), url)
+            )
+
+    def mark(self, url, ok, error=None):
+        if ok:
+            self.mark_done(url)
+        else:
+            self.mark_failed(url, error)
+
+    def counts(self):
+        """Returns the number of URLs in each state."""
+        counts = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0}
+        for state, count in self.conn.execute("SELECT state, COUNT(*) FROM urls GROUP BY state"):
+            counts[state] = count
+        return counts
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def claim_links(frontier, link_list, retry_failed=False, recrawl=False):
+    """Adds link_list to the frontier and returns the links this run should work on, marked in flight.
+
+    A normal run takes the pending links; retry_failed=True takes only the links that failed before
+    and recrawl=True takes every link again.
+    """
+    frontier.add(link_list)
+    if recrawl:
+        frontier.reset(link_list)
+    claimed = frontier.select(link_list, FAILED if retry_failed else PENDING)
+    frontier.mark_in_flight(claimed)
+    skipped = len(link_list) - len(claimed)
+    if skipped:
+        logging.info(f"Frontier: skipping {skipped} of {len(link_list)} links already handled in an earlier run")
+    return claimed
@@ -0,0 +1,136 @@
+import re
+import sqlite3
+import threading
+from langdetect import DetectorFactory, detect_langs
+from langdetect.lang_detect_exception import LangDetectException
+
+# langdetect picks random n-grams; a fixed seed makes the same text always get the same language
+DetectorFactory.seed = 0
+
+# Default file name of the language cache inside the WARC output folder
+LANGUAGE_CACHE_FILE = 'languages.sqlite'
+
+# Bumped whenever detect_language changes, so cached results from an older version are not used
+LANGUAGE_ID_VERSION = 1
+
+# Characters of text the detection looks at, taken as evenly spaced windows over the whole text
+LANGUAGE_SAMPLE_CHARS = 2000
+LANGUAGE_SAMPLE_WINDOWS = 4
+
+# Frequent function words; a sample full of one list and nearly free of the other needs no langdetect
+STOPWORDS = {
+    'id': {'yang', 'dan', 'di', 'ke', 'dari', 'ini', 'itu', 'dengan', 'untuk', 'pada', 'adalah', 'dalam', 'tidak',
+           'akan', 'juga', 'atau', 'oleh', 'sebagai', 'karena', 'bahwa', 'ada', 'kami', 'kita', 'mereka', 'telah',
+           'sudah', 'dapat', 'serta', 'para', 'tersebut'},
+    'en': {'the', 'and', 'of', 'to', 'in', 'is', 'that', 'for', 'with', 'as', 'on', 'are', 'was', 'this', 'by',
+           'be', 'from', 'or', 'an', 'it', 'which', 'have', 'has', 'not', 'at'},
+}
+STOPWORD_MIN_RATIO = 0.08
+STOPWORD_MIN_WORDS = 30
+
+# Below this probability langdetect is unsure, and the page's <html lang> decides instead
+LANGDETECT_MIN_PROBABILITY = 0.8
+
+# Old or regional codes that mean the same language
+LANGUAGE_ALIASES = {'in': 'id', 'ind': 'id', 'eng': 'en'}
+
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+def normalize_language(code):
+    """Returns the primary subtag of a language code in lower case ('id-ID' -> 'id'), or None."""
+    code = (code or '').strip().lower().replace('_', '-').split('-')[0]
+    return LANGUAGE_ALIASES.get(code, code) or None
+
+def language_sample(text, max_chars=LANGUAGE_SAMPLE_CHARS, windows=LANGUAGE_SAMPLE_WINDOWS):
+    """Returns at most max_chars of text, from windows spread evenly over it so menus at the top do not dominate."""
+    text = ' '.join(text.split())
+    if len(text) <= max_chars:
+        return text
+    window = max_chars // windows
+    step = (len(text) - window) // (windows - 1) if windows > 1 else 0
+    return ' '.join(text[i * step:i * step + window] for i in range(windows))
+
+def stopword_language(sample):
+    """Returns the language whose stopwords clearly dominate sample, or None if no list does."""
+    words = WORD_PATTERN.findall(sample.lower())
+    if len(words) < STOPWORD_MIN_WORDS:
+        return None
+    ratios = {language: sum(word in stopwords for word in words) / len(words) for language, stopwords in STOPWORDS.items()}
+    best = max(ratios, key=ratios.get)
+    others = max((ratio for language, ratio in ratios.items() if language != best), default=0)
+    if ratios[best] >= STOPWORD_MIN_RATIO and ratios[best] > 2 * others:
+        return best
+    return None
+
+def detect_language(text, html_lang=None):
+    """Returns the language code of text, or 'unknown'.
+
+    A bounded sample of the text is checked against stopword lists first. If that is not
+    decisive (menus and archive lists dilute the stopwords of many pages), the sample is passed
+    to langdetect, seeded so the result is the same on every run. The <html lang> attribute only
+    breaks the tie when langdetect is unsure or finds nothing, since templates often keep a
+    default <html lang="en"> on pages in another language.
+    """
+    sample = language_sample(text)
+    language = stopword_language(sample)
+    if language:
+        return language
+    html_lang = normalize_language(html_lang)
+    if not sample:
+        return html_lang or 'unknown'
+    try:
+        best = detect_langs(sample)[0]
+    except (LangDetectException, IndexError):
+        return html_lang or 'unknown'
+    if best.prob < LANGDETECT_MIN_PROBABILITY and html_lang:
+        return html_lang
+    return normalize_language(best.lang) or 'unknown'
+
+class LanguageCache:
+    """Languages detected before, keyed by payload digest, so estimating again never detects twice.
+
+    Writes are committed in batches by commit(). Safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS languages (
+                digest TEXT PRIMARY KEY,
+                language TEXT NOT NULL,
+                version INTEGER NOT NULL
+            )
+        """)
+
+    def get(self, digest):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT language FROM languages WHERE digest = ? AND version = ?", (digest, LANGUAGE_ID_VERSION)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, digest, language):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO languages (digest, language, version) VALUES (?, ?, ?)",
+                (digest, language, LANGUAGE_ID_VERSION)
+            )
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,127 @@
+import os
+import re
+import csv
+import hashlib
+import logging
+import yaml
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+from helper_functions.link_scrapper import scrapelinksmain, save_links_to_csv
+from helper_functions.link_store import LinkStore, LINK_STORE_FILE
+from helper_functions.politeness import HostScheduler
+
+# Folder inside the links folder holding one subfolder (with its own links.csv) per seed
+SEEDS_FOLDER = 'seeds'
+
+# Settings a seed of a job file may set, with the value used when neither the seed nor the defaults do
+SEED_SETTINGS = {
+    'name': None,
+    'base_url': None,
+    'link_selector': 'a',
+    'pagination_url': None,
+    'next_button_selector': None,
+    'max_pages': 5,
+    'render_mode': 'auto',
+}
+
+def load_jobs(job_path):
+    """Reads the seeds of a YAML or CSV job file as a list of dicts with every SEED_SETTINGS key.
+
+    A YAML file is either a list of seeds or a mapping with a `seeds` list and optional
+    `defaults` applied to every seed. A CSV file has one seed per row, with the setting names
+    as its header; empty cells fall back to the defaults.
+    """
+    defaults = {}
+    if job_path.lower().endswith(('.yaml', '.yml')):
+        with open(job_path, 'r') as f:
+            data = yaml.safe_load(f) or []
+        if isinstance(data, dict):
+            defaults = data.get('defaults') or {}
+            data = data.get('seeds') or []
+        seeds = data
+    else:
+        with open(job_path, 'r', newline='') as f:
+            seeds = [{key: value for key, value in row.items() if value and value.strip()} for row in csv.DictReader(f)]
+
+    jobs = []
+    for number, seed in enumerate(seeds, start=1):
+        job = {key: seed.get(key, defaults.get(key, default)) for key, default in SEED_SETTINGS.items()}
+        if not job['base_url']:
+            raise ValueError(f"Seed {number} in {job_path} has no base_url")
+        job['max_pages'] = int(job['max_pages'])
+        job['render_mode'] = str(job['render_mode']).lower()
+        job['name'] = str(job['name'] or seed_name(job))
+        jobs.append(job)
+
+    names = [job['name'] for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Seed names must be unique in {job_path}: {', '.join(duplicates)}")
+    return jobs
+
+def seed_name(job):
+    """Default folder name of a seed: its host plus a short hash of its URL and selector."""
+    key = f"{job['pagination_url'] or job['base_url']} {job['link_selector']}"
+    host = re.sub(r'[^\w.-]', '_', urlsplit(job['base_url']).netloc)
+    return f"{host}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+
+# Function to scrape every seed of a job file, workers seeds at a time
+def run_link_batch(job_path, project_folder, workers=4, concurrency=8, incremental=False, seen_index=None,
+                   probe=False, progress_callback=None):
+    """Runs scrapelinksmain for each seed of the job file on one shared pool of workers.
+
+    Each seed writes its links to seeds/<name>/links.csv in project_folder; afterwards the links
+    of all seeds are merged, in job file order and without duplicates, into project_folder's
+    links.csv and links.sqlite. A failing seed is logged and left out of the merge without
+    stopping the others.
+    All seeds share one HostScheduler, so seeds on the same site do not add up to more load than
+    one would. Returns {seed name: number of links, or the error message}.
+    """
+    jobs = load_jobs(job_path)
+    scheduler = HostScheduler(max_concurrency=concurrency)
+    results = {}
+
+    def run_seed(job):
+        seed_folder = os.path.join(project_folder, SEEDS_FOLDER, job['name'])
+        os.makedirs(seed_folder, exist_ok=True)
+        links = scrapelinksmain(
+            project_folder=seed_folder,
+            base_url=job['base_url'],
+            link_selector=job['link_selector'],
+            pagination_url=job['pagination_url'],
+            next_button_selector=job['next_button_selector'],
+            max_pages=job['max_pages'],
+            render_mode=job['render_mode'],
+            concurrency=concurrency,
+            incremental=incremental,
+            scheduler=scheduler,
+            seen_index=seen_index,
+            probe=probe,
+            log_thread_only=True,
+        )
+        return links or []
+
+    seed_links = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_seed, job): job['name'] for job in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            name = futures[future]
+            try:
+                seed_links[name] = future.result()
+                results[name] = len(seed_links[name])
+                logging.info(f"Seed {name}: {results[name]} links")
+            except Exception as e:
+                results[name] = str(e)
+                logging.error(f"Seed {name} failed: {e}")
+            if progress_callback:
+                progress_callback(done, len(jobs))
+
+    merged = [link for job in jobs for link in seed_links.get(job['name'], [])]
+    save_links_to_csv(list(dict.fromkeys(merged)), project_folder, append=incremental or seen_index is not None)
+    # The merged link store keeps the source page and discovery time each seed recorded
+    with LinkStore(os.path.join(project_folder, LINK_STORE_FILE)) as store:
+        for job in jobs:
+            seed_store = os.path.join(project_folder, SEEDS_FOLDER, job['name'], LINK_STORE_FILE)
+            if os.path.exists(seed_store):
+                store.merge_from(seed_store)
+    return results
@@ -1,11 +1,114 @@
 import os
 import logging
 import time
+import functools
+import itertools
+import threading
+from contextlib import contextmanager
 import pandas as pd
+import lxml.etree
+from lxml.cssselect import CSSSelector
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
+from helper_functions.politeness import HostScheduler
+from helper_functions.render_detect import RenderDetector, RENDER_MODES_FILE, STATIC, parse_html, base_url_of
+from helper_functions.warc_scraper import get_http_session
+from helper_functions.url_index import LINKS, dedupe_urls
+from helper_functions.link_store import LinkStore, LINK_STORE_FILE
+
+# Runs a scroll or click in the page, then reports back once the page has settled: no DOM mutations
+# and no fetch/XHR requests in flight for quiet_ms, or timeout_ms at the latest. Resolves to whether
+# the DOM changed at all. Only requests started after the action are waited for; those already
+# open before it (long polling, streams) and keepalive fetches (beacons) do not keep the page busy.
+WAIT_FOR_UPDATE_SCRIPT = """
+const [action, target, timeoutMs, quietMs] = arguments;
+const done = arguments[arguments.length - 1];
+if (!window.__ezPending) {
+    window.__ezPending = new Set();
+    let nextId = 0;
+    const send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        const id = nextId++;
+        window.__ezPending.add(id);
+        this.addEventListener('loadend', () => window.__ezPending.delete(id));
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        const fetch = window.fetch;
+        window.fetch = function (resource, init) {
+            if (init && init.keepalive) {
+                return fetch.apply(this, arguments);
+            }
+            const id = nextId++;
+            window.__ezPending.add(id);
+            return fetch.apply(this, arguments).finally(() => window.__ezPending.delete(id));
+        };
+    }
+}
+const openBefore = new Set(window.__ezPending);
+let changed = false;
+const started = Date.now();
+let lastActivity = started;
+const observer = new MutationObserver(() => { changed = true; lastActivity = Date.now(); });
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, characterData: true});
+if (action === 'scroll') {
+    window.scrollBy(0, window.innerHeight);
+} else if (action === 'click') {
+    target.scrollIntoView({block: 'center'});
+    target.click();
+}
+const timer = setInterval(() => {
+    const now = Date.now();
+    for (const id of window.__ezPending) {
+        if (!openBefore.has(id)) {
+            lastActivity = now;
+            break;
+        }
+    }
+    if (now - lastActivity >= quietMs || now - started >= timeoutMs) {
+        clearInterval(timer);
+        observer.disconnect();
+        done(changed);
+    }
+}, 50);
+"""
+
+# Collects every element matching a selector in one go: its absolute URL without the #fragment,
+# its text and where it sits on the page. Elements without a http(s) link are left out.
+EXTRACT_LINKS_SCRIPT = """
+const selector = arguments[0];
+const links = [];
+document.querySelectorAll(selector).forEach((element, index) => {
+    const raw = element.getAttribute('href');
+    if (!raw) {
+        return;
+    }
+    let url;
+    try {
+        url = new URL(raw.trim(), document.baseURI);
+    } catch (e) {
+        return;
+    }
+    if (url.protocol !== 'http:' && url.protocol !== 'https:') {
+        return;
+    }
+    url.hash = '';
+    const rect = element.getBoundingClientRect();
+    links.push({
+        href: url.href,
+        text: (element.innerText || element.textContent || '').replace(/\\s+/g, ' ').trim(),
+        index: index,
+        top: Math.round(rect.top + window.scrollY),
+        left: Math.round(rect.left + window.scrollX)
+    });
+});
+return links;
+"""
 
 # Set up logging to log into project-specific folder
 def setup_webdriver(project_folder):
@@ -20,29 +123,154 @@ def setup_webdriver(project_folder):
     driver = webdriver.Chrome(options=options)
     return driver
 
-def extract_links(driver, link_selector):
-    """Extracts links using the provided CSS selector."""
+def extract_link_details(driver, link_selector, timeout=25):
+    """Extracts links using the provided CSS selector, as dicts with href, text, index, top and left.
+
+    All matches are read by one script in the page rather than one WebDriver call per element.
+    """
     try:
-        links = WebDriverWait(driver, 25).until(
-            EC.presence_of_all_elements_located((By.CSS_SELECTOR, link_selector))
-        )
-        links = [link.get_attribute('href') for link in links]
+        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, link_selector)))
+        links = driver.execute_script(EXTRACT_LINKS_SCRIPT, link_selector)
         logging.info(f"Extracted {len(links)} links.")
         return links
     except Exception as e:
         logging.error(f"Error extracting links: {e}")
         return []
 
+def extract_links(driver, link_selector):
+    """Extracts links using the provided CSS selector."""
+    return [link['href'] for link in extract_link_details(driver, link_selector)]
+
+def fetch_html(url):
+    """Fetches a page over plain HTTP, without a browser, and returns its body as bytes."""
+    response = get_http_session().get(url, timeout=30)
+    response.raise_for_status()
+    return response.content
+
+@functools.lru_cache(maxsize=32)
+def compile_selector(link_selector):
+    return CSSSelector(link_selector)
+
+def extract_link_details_from_html(html, page_url, link_selector):
+    """Extracts links using the provided CSS selector from HTML (bytes or str) fetched without a browser.
+
+    Returns dicts like extract_link_details; top and left are None, as there is no layout.
+    Relative links resolve against the page's <base href>, as document.baseURI does in the browser.
+    """
+    if not html.strip():
+        return []
+    try:
+        document = parse_html(html)
+    except lxml.etree.ParserError:
+        return []
+    base_url = base_url_of(document, page_url)
+    links = []
+    for index, element in enumerate(compile_selector(link_selector)(document)):
+        href = (element.get('href') or '').strip()
+        if href:
+            url = urljoin(base_url, href).split('#')[0]
+            if url.startswith(('http://', 'https://')):
+                links.append({'href': url, 'text': ' '.join(element.text_content().split()), 'index': index, 'top': None, 'left': None})
+    logging.info(f"Extracted {len(links)} links over HTTP.")
+    return links
+
+def extract_links_from_html(html, page_url, link_selector):
+    """Extracts links using the provided CSS selector from HTML fetched without a browser."""
+    return [link['href'] for link in extract_link_details_from_html(html, page_url, link_selector)]
+
+def remember_details(link_details, source_page, details=None):
+    """Returns the hrefs of link_details, keeping the first details seen of each link in details if given."""
+    if details is not None:
+        for link in link_details:
+            details.setdefault(link['href'], dict(link, source_page=source_page))
+    return [link['href'] for link in link_details]
+
+def _fetch_page_links(page_url, link_selector, scheduler):
+    scheduler.acquire(page_url)
+    started = time.monotonic()
+    ok = True
+    try:
+        return extract_link_details_from_html(fetch_html(page_url), page_url, link_selector)
+    except Exception as e:
+        ok = False
+        logging.warning(f"Error fetching {page_url} over HTTP: {e}")
+        return []
+    finally:
+        scheduler.release(page_url, latency=time.monotonic() - started, ok=ok)
+
+def scrape_links_http(pagination_url, link_selector='a', max_pages=10, max_no_new_links=5, concurrency=8,
+                      start_page=1, known_links=None, scheduler=None, stop_at_known=False, details=None):
+    """Fetches the {page_number} pages of a static listing over HTTP, concurrency pages at a time.
+
+    Pages are requested ahead in a sliding window but handled in page order, so scraping stops
+    after the same max_no_new_links pages without new links as the browser loop would; pages
+    still queued at that point are dropped. With stop_at_known, the first page whose links are
+    all in known_links ends the crawl. Returns the new links in the order they were found; the
+    source page, text and position of each go into the details dict, if given.
+    """
+    scheduler = scheduler or HostScheduler(max_concurrency=concurrency)
+    seen = set(known_links or ())
+    links = []
+    no_new_pages = 0
+    pages = iter(range(start_page, max_pages + 1))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        def request(page_number):
+            return page_number, executor.submit(_fetch_page_links, pagination_url.format(page_number=page_number), link_selector, scheduler)
+
+        window = [request(page_number) for page_number in itertools.islice(pages, concurrency)]
+        while window:
+            page_number, future = window.pop(0)
+            page_links = remember_details(future.result(), pagination_url.format(page_number=page_number), details)
+            new_links = [link for link in dict.fromkeys(page_links) if link not in seen]
+            seen.update(new_links)
+            links.extend(new_links)
+            logging.info(f"Scraped page {page_number}: {len(new_links)} new links")
+            no_new_pages = 0 if new_links else no_new_pages + 1
+            reached_known = stop_at_known and page_links and not new_links
+            if no_new_pages >= max_no_new_links or reached_known:
+                logging.info("Page only has links we already know. Stopping scraping." if reached_known
+                             else f"No new links found after {max_no_new_links} pages. Stopping scraping.")
+                for _, pending in window:
+                    pending.cancel()
+                break
+            # Keep the window full: one page handled, one more requested
+            next_page = next(pages, None)
+            if next_page is not None:
+                window.append(request(next_page))
+    return links
+
+def wait_for_page_update(driver, action=None, element=None, timeout=10, quiet_period=0.5):
+    """Scrolls one screen (action='scroll') or clicks element (action='click'), then waits for the page to settle.
+
+    Returns as soon as the DOM has stopped changing and no request started since the action is in
+    flight for quiet_period seconds, or after timeout seconds at the latest. Requests already open
+    before the action (long polling) are not waited for. Returns whether the DOM changed.
+    """
+    driver.set_script_timeout(timeout + 5)
+    return driver.execute_async_script(WAIT_FOR_UPDATE_SCRIPT, action, element, int(timeout * 1000), int(quiet_period * 1000))
+
+def click_and_wait(driver, element, timeout=10):
+    """Clicks element and waits for the resulting update, or for the next page if the click navigates away."""
+    try:
+        return wait_for_page_update(driver, 'click', element, timeout=timeout)
+    except WebDriverException:
+        # The page was unloaded while the script waited, so wait for the new one instead
+        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+        return True
+
 def scroll_to_load(driver, max_scrolls=10, wait_time=2):
-    """Gradually scroll down the page to load dynamic content."""
+    """Gradually scroll down the page to load dynamic content.
+
+    wait_time is the longest to wait after a scroll; usually the page settles much sooner.
+    """
     try:
         last_height = driver.execute_script("return document.body.scrollHeight")
         no_new_content_count = 0  # Track how many times we encounter no new content
 
         for _ in range(max_scrolls):
-            # Scroll down by a fixed amount
-            driver.execute_script("window.scrollBy(0, window.innerHeight);")
-            time.sleep(wait_time)  # Wait for content to load
+            # Scroll down by a fixed amount and wait for content to load
+            wait_for_page_update(driver, 'scroll', timeout=wait_time)
 
             # Check if the page height has changed
             new_height = driver.execute_script("return document.body.scrollHeight")
@@ -61,40 +289,63 @@ def scroll_to_load(driver, max_scrolls=10, wait_time=2):
     except Exception as e:
         logging.error(f"Error while scrolling: {e}")
 
-def click_load_more_button(driver, button_selector):
+def click_load_more_button(driver, button_selector, wait_time=10):
     """Clicks the 'Load More' button to load additional content."""
     try:
         load_more_button = WebDriverWait(driver, 10).until(
             EC.element_to_be_clickable((By.CSS_SELECTOR, button_selector))
         )
-        driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", load_more_button)
-        time.sleep(1)
-        driver.execute_script("arguments[0].click();", load_more_button)
+        click_and_wait(driver, load_more_button, timeout=wait_time)
         logging.info("Clicked 'Load More' button.")
-        time.sleep(2)  # Adjust based on how long it takes for new content to load
     except Exception as e:
         logging.warning(f"Error clicking 'Load More' button: {e}")
         return False  # Return False if there is no button or an error occurs
     return True
 
 def scrape_links(driver, pagination_url=None, link_selector='a', next_button_selector=None, max_pages=10, 
-                 scroll_to_load_more=False, load_more_button_selector=None, max_no_new_links=5):
+                 scroll_to_load_more=False, load_more_button_selector=None, max_no_new_links=5, scheduler=None,
+                 render_detector=None, start_page=1, known_links=None, stop_at_known=False, details=None, stopped=None):
+    # The scheduler paces page loads per host (robots.txt Crawl-delay, backing off on slow responses)
+    # stopped, if given, is a dict that gets stopped['known'] = True when stop_at_known ended the crawl
+    scheduler = scheduler or HostScheduler()
     links = set()  # Using a set to prevent duplicate links
     new_links_count = 0  # Count the number of new links found in each iteration
     load_more_attempts = 0
-    last_found_links = set()  # To track previously found links
+    # To track previously found links; known_links from earlier runs count as found, so only new ones are returned
+    last_found_links = set(known_links or ())
 
     if pagination_url:
         # Pagination scraping logic (same as before)
-        for page_number in range(1, max_pages + 1):
+        for page_number in range(start_page, max_pages + 1):
             page_url = pagination_url.format(page_number=page_number)
-            driver.get(page_url)
-            current_links = extract_links(driver, link_selector)
+            scheduler.acquire(page_url)
+            started = time.monotonic()
+            # Hosts that render the same without JavaScript are fetched over HTTP; undecided ones are compared both ways
+            if render_detector and render_detector.mode_for(page_url) == STATIC:
+                try:
+                    current_links = remember_details(extract_link_details_from_html(fetch_html(page_url), page_url, link_selector), page_url, details)
+                except Exception as e:
+                    logging.error(f"Error fetching {page_url} over HTTP: {e}")
+                    current_links = []
+            else:
+                driver.get(page_url)
+                current_links = remember_details(extract_link_details(driver, link_selector), page_url, details)
+                if render_detector and render_detector.mode_for(page_url) is None:
+                    try:
+                        render_detector.observe(page_url, fetch_html(page_url), driver.page_source)
+                    except Exception as e:
+                        logging.warning(f"Could not compare {page_url} over HTTP: {e}")
+            scheduler.release(page_url, latency=time.monotonic() - started)
             new_links = set(current_links) - last_found_links  # Find new links by comparing with the last iteration
             links.update(new_links)
             last_found_links.update(current_links)
             logging.info(f"Scraped page {page_number}: {page_url}")
             logging.info(f"New links found on this page: {len(new_links)}")
+            if stop_at_known and current_links and not new_links:  # Everything from here on was harvested before
+                logging.info("Page only has links we already know. Stopping scraping.")
+                if stopped is not None:
+                    stopped['known'] = True
+                break
             if not new_links:
                 new_links_count += 1
             else:
@@ -103,20 +354,28 @@ def scrape_links(driver, pagination_url=None, link_selector='a', next_button_sel
             if new_links_count >= max_no_new_links:  # Stop after 5 iterations with no new links
                 logging.info(f"No new links found after {max_no_new_links} attempts. Stopping scraping.")
                 break
-            time.sleep(2)
     else:
         current_page = 1
         while current_page <= max_pages:
+            # Every iteration triggers new requests to the site, so wait for the host's turn
+            scheduler.acquire(driver.current_url)
+            scheduler.release(driver.current_url)
+
             # Always check and click "Load More" button if it exists
             if load_more_button_selector:
                 load_more_button_exists = click_load_more_button(driver, load_more_button_selector)
                 if load_more_button_exists:
-                    current_links = extract_links(driver, link_selector)
+                    current_links = remember_details(extract_link_details(driver, link_selector), driver.current_url, details)
                     new_links = set(current_links) - last_found_links  # Check for new links
                     links.update(new_links)
                     last_found_links.update(current_links)
                     logging.info(f"Clicked 'Load More' button and found {len(new_links)} new links.")
                     load_more_attempts = 0  # Reset the load more attempts counter
+                    if stop_at_known and current_links and not new_links:
+                        logging.info("Only links we already know were loaded. Stopping scraping.")
+                        if stopped is not None:
+                            stopped['known'] = True
+                        break
                 else:
                     load_more_attempts += 1
                     logging.info(f"No 'Load More' button found. Attempts: {load_more_attempts}")
@@ -127,11 +386,16 @@ def scrape_links(driver, pagination_url=None, link_selector='a', next_button_sel
             # If scroll to load more is enabled
             if scroll_to_load_more:
                 scroll_to_load(driver)  # Scroll gradually and try to load new content
-                current_links = extract_links(driver, link_selector)
+                current_links = remember_details(extract_link_details(driver, link_selector), driver.current_url, details)
                 new_links = set(current_links) - last_found_links  # Check for new links
                 links.update(new_links)
                 last_found_links.update(current_links)
                 logging.info(f"Scrolled and found {len(new_links)} new links.")
+                if stop_at_known and current_links and not new_links:
+                    logging.info("Only links we already know were loaded. Stopping scraping.")
+                    if stopped is not None:
+                        stopped['known'] = True
+                    break
                 if not new_links:
                     new_links_count += 1
                 else:
@@ -142,7 +406,6 @@ def scrape_links(driver, pagination_url=None, link_selector='a', next_button_sel
                     break
 
             logging.info(f"Scraped page {current_page}")
-            time.sleep(2)
             current_page += 1  # Increment the page number
 
             # If we are scraping without a pagination URL, we need to handle the next button (if applicable)
@@ -151,51 +414,186 @@ def scrape_links(driver, pagination_url=None, link_selector='a', next_button_sel
                     next_button_element = WebDriverWait(driver, 10).until(
                         EC.element_to_be_clickable((By.CSS_SELECTOR, next_button_selector))
                     )
-                    driver.execute_script("arguments[0].scrollIntoView({behavior: 'smooth', block: 'center'});", next_button_element)
-                    time.sleep(1)
-                    driver.execute_script("arguments[0].click();", next_button_element)
+                    click_and_wait(driver, next_button_element)
                     current_page += 1
-                    time.sleep(2)
                 except Exception as e:
                     logging.warning(f"Error or no next button: {e}. Stopping scraping.")
                     break
 
     return list(links)  # Convert the set back to a list to save
 
-def save_links_to_csv(links, project_folder):
+def load_known_links(project_folder):
+    """Returns the links already saved in the project's links.csv; none if it is missing, empty or has no link column."""
+    csv_path = os.path.join(project_folder, 'links.csv')
+    if not os.path.exists(csv_path):
+        return set()
+    try:
+        return set(pd.read_csv(csv_path, usecols=['link'])['link'].dropna())
+    except (pd.errors.EmptyDataError, ValueError):
+        # save_links_to_csv writes an empty file, without a header, for a run that found no links
+        return set()
+
+# append=True adds the links that are not in links.csv yet instead of rewriting the file
+def save_links_to_csv(links, project_folder, append=False):
     # No need to create a nested 'links' folder, just use the provided folder
     os.makedirs(project_folder, exist_ok=True)  # Ensure the folder exists
     
     # Save links as a CSV with a static name 'links.csv'
     csv_file = 'links.csv'  # Static file name
+    csv_path = os.path.join(project_folder, csv_file)
+    # A links.csv without known links is written anew, so it gets its header back
+    known_links = load_known_links(project_folder) if append else set()
+    if known_links:
+        links = [link for link in dict.fromkeys(links) if link not in known_links]
+        pd.DataFrame({'link': links}).to_csv(csv_path, mode='a', header=False, index=False)
+        logging.info(f"Added {len(links)} new links to {csv_file}")
+        return
+
     df = pd.DataFrame(links)
     df = df.rename(columns={0: 'link'})  # Rename the first column to 'link'
     
     # Save directly to the provided folder
-    df.to_csv(os.path.join(project_folder, csv_file), index=False)
+    df.to_csv(csv_path, index=False)
     logging.info(f"Saved {len(links)} links to {csv_file}")
 
-def scrapelinksmain(project_folder, base_url, link_selector, pagination_url=None, next_button_selector=None, 
-                    max_pages=5, scroll_to_load_more=False, load_more_button_selector=None):
-    # Set up logging for this specific project
-    logging.basicConfig(filename=os.path.join(project_folder, 'link_scraper.log'), level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Function to log into a project's link_scraper.log while the block runs
+# thread_only=True keeps out what other threads log, for projects scraped side by side
+@contextmanager
+def project_log(project_folder, thread_only=False):
+    os.makedirs(project_folder, exist_ok=True)
+    handler = logging.FileHandler(os.path.join(project_folder, 'link_scraper.log'))
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    if thread_only:
+        thread_id = threading.get_ident()
+        handler.addFilter(lambda record: record.thread == thread_id)
+    root = logging.getLogger()
+    if root.level > logging.INFO:
+        root.setLevel(logging.INFO)
+    root.addHandler(handler)
+    try:
+        yield
+    finally:
+        root.removeHandler(handler)
+        handler.close()
 
-    driver = setup_webdriver(project_folder)
+# Function to drop variants of the same URL and, with a seen_index, the links any project found before
+def keep_new_links(links, seen_index=None):
+    links = dedupe_urls(links)
+    if seen_index:
+        # One step, so seeds scraped in parallel never both keep a link they found at the same time
+        links = seen_index.add_new(links, LINKS)
+        seen_index.flush()
+    return links
+
+def _probe_link(url, scheduler):
+    scheduler.acquire(url)
+    started = time.monotonic()
+    ok = True
     try:
-        logging.info(f"Scraping website: {base_url}")
-        driver.get(base_url)
-        
-        all_links = scrape_links(
-            driver, 
-            pagination_url=pagination_url, 
-            link_selector=link_selector, 
-            next_button_selector=next_button_selector, 
-            max_pages=max_pages,
-            scroll_to_load_more=False,
-            load_more_button_selector=load_more_button_selector
-        )
-        
-        # Save links to a CSV file in the project's links folder
-        save_links_to_csv(all_links, project_folder)
+        session = get_http_session()
+        response = session.head(url, allow_redirects=True, timeout=30)
+        # Some servers refuse HEAD; a streamed GET reads the headers without the body
+        if response.status_code in (405, 501):
+            response = session.get(url, allow_redirects=True, timeout=30, stream=True)
+            response.close()
+        ok = response.status_code < 500
+        return response.status_code, response.headers.get('Content-Type')
+    except Exception as e:
+        ok = False
+        logging.warning(f"Could not probe {url}: {e}")
+        return None, None
     finally:
-        driver.quit()
+        scheduler.release(url, latency=time.monotonic() - started, ok=ok)
+
+# Function to fill in the HTTP status and content type of the stored links not checked yet
+def probe_links(store, concurrency=8, scheduler=None):
+    scheduler = scheduler or HostScheduler(max_concurrency=concurrency)
+    links = store.urls(unchecked=True)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for url, (http_status, content_type) in zip(links, executor.map(lambda url: _probe_link(url, scheduler), links)):
+            if http_status is not None:
+                store.set_status(url, http_status, content_type)
+    logging.info(f"Probed {len(links)} links")
+    return len(links)
+
+# The link store keeps every link ever found in the folder with its source page, text, position and discovery
+# time; probe=True also asks each new link's server for its HTTP status and content type
+def save_links_to_store(links, project_folder, details=None, probe=False, concurrency=8, scheduler=None):
+    with LinkStore(os.path.join(project_folder, LINK_STORE_FILE)) as store:
+        added = store.add(links, details)
+        logging.info(f"Added {added} new links to {LINK_STORE_FILE}")
+        if probe:
+            probe_links(store, concurrency=concurrency, scheduler=scheduler)
+
+# render_mode='http' fetches the pagination pages concurrently over plain HTTP, without Chrome
+# render_mode='auto' loads the first pagination pages in Chrome and over HTTP, and switches to the
+# concurrent HTTP crawl once they give the same links (the decision is remembered per host)
+# incremental=True keeps links.csv, adds only new links to it and stops at the first page with nothing new
+# With a seen_index, links.csv is added to as well, since links found in earlier runs are filtered out of the result
+def scrapelinksmain(project_folder, base_url, link_selector, pagination_url=None, next_button_selector=None, 
+                    max_pages=5, scroll_to_load_more=False, load_more_button_selector=None, render_mode='browser',
+                    concurrency=8, incremental=False, scheduler=None, seen_index=None, probe=False,
+                    log_thread_only=False):
+    # Log into this project's folder while it is scraped; seeds of a batch run in parallel, so each keeps to its own thread
+    with project_log(project_folder, thread_only=log_thread_only):
+        # Seeds run side by side in a batch share one scheduler, so a host is paced across all of them
+        scheduler = scheduler or HostScheduler(max_concurrency=concurrency)
+        known_links = load_known_links(project_folder) if incremental else set()
+        if known_links:
+            logging.info(f"Incremental run: {len(known_links)} links already known")
+        details = {}
+
+        render_detector = RenderDetector(cache_path=os.path.join(project_folder, RENDER_MODES_FILE)) if render_mode == 'auto' else None
+        first_page_url = pagination_url.format(page_number=1) if pagination_url else None
+        if pagination_url and (render_mode == 'http' or (render_detector and render_detector.mode_for(first_page_url) == STATIC)):
+            logging.info(f"Scraping {pagination_url} over HTTP")
+            all_links = scrape_links_http(pagination_url, link_selector=link_selector, max_pages=max_pages, concurrency=concurrency,
+                                          known_links=known_links, scheduler=scheduler, stop_at_known=incremental, details=details)
+            all_links = keep_new_links(all_links, seen_index)
+            save_links_to_csv(all_links, project_folder, append=incremental or seen_index is not None)
+            save_links_to_store(all_links, project_folder, details, probe=probe, concurrency=concurrency, scheduler=scheduler)
+            return all_links
+
+        driver = setup_webdriver(project_folder)
+        try:
+            logging.info(f"Scraping website: {base_url}")
+            driver.get(base_url)
+
+            # Sample the first pages both ways before deciding how to fetch the rest
+            sample_pages = min(render_detector.sample_size, max_pages) if render_detector and pagination_url else max_pages
+            stopped = {}
+            all_links = scrape_links(
+                driver, 
+                pagination_url=pagination_url, 
+                link_selector=link_selector, 
+                next_button_selector=next_button_selector, 
+                max_pages=sample_pages,
+                scroll_to_load_more=False,
+                load_more_button_selector=load_more_button_selector,
+                scheduler=scheduler,
+                render_detector=render_detector,
+                known_links=known_links,
+                stop_at_known=incremental,
+                details=details,
+                stopped=stopped
+            )
+            # A sample that already reached the known links leaves nothing new past it
+            if sample_pages < max_pages and not stopped.get('known'):
+                known_links = known_links | set(all_links)
+                if render_detector.mode_for(first_page_url) == STATIC:
+                    logging.info(f"{pagination_url} renders without JavaScript, fetching the remaining pages over HTTP")
+                    all_links += scrape_links_http(pagination_url, link_selector=link_selector, max_pages=max_pages, concurrency=concurrency,
+                                                   start_page=sample_pages + 1, known_links=known_links, scheduler=scheduler,
+                                                   stop_at_known=incremental, details=details)
+                else:
+                    all_links += scrape_links(driver, pagination_url=pagination_url, link_selector=link_selector, max_pages=max_pages,
+                                              scheduler=scheduler, render_detector=render_detector, start_page=sample_pages + 1,
+                                              known_links=known_links, stop_at_known=incremental, details=details)
+            all_links = keep_new_links(all_links, seen_index)
+        
+            # Save links to a CSV file in the project's links folder
+            save_links_to_csv(all_links, project_folder, append=incremental or seen_index is not None)
+            save_links_to_store(all_links, project_folder, details, probe=probe, concurrency=concurrency, scheduler=scheduler)
+            return all_links
+        finally:
+            driver.quit()
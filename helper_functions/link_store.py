@@ -0,0 +1,181 @@
+import csv
+import time
+import sqlite3
+import threading
+
+# Default file name of the link store inside a subproject's links folder
+LINK_STORE_FILE = 'links.sqlite'
+
+# Types servers send for downloads of any kind; a link of one of these may still be the type asked for
+GENERIC_CONTENT_TYPES = ('application/octet-stream', 'binary/octet-stream', 'application/download',
+                         'application/force-download', 'application/x-download')
+
+# Other names a content type is served under, and the file extension its links usually end in
+CONTENT_TYPE_ALIASES = {'application/pdf': ('application/x-pdf', 'application/acrobat', 'text/pdf')}
+CONTENT_TYPE_EXTENSIONS = {'application/pdf': '.pdf'}
+
+# Columns of a link, in the order export_csv writes them
+LINK_FIELDS = ['url', 'source_page', 'link_text', 'position', 'top', 'left', 'discovered_at', 'http_status', 'content_type', 'checked_at']
+
+class LinkStore:
+    """SQLite table of the links a subproject found, with where and when each was found.
+
+    Every link keeps the page it was found on, its anchor text, its position on that page
+    and the time it was first seen; probe_links() adds the HTTP status and content type of
+    the target. Link sets of other stores can be diffed and joined in SQL through attach(),
+    without loading either into memory. Safe to share between threads.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS links (
+                url TEXT PRIMARY KEY,
+                source_page TEXT,
+                link_text TEXT,
+                position INTEGER,
+                top REAL,
+                "left" REAL,
+                discovered_at REAL NOT NULL,
+                http_status INTEGER,
+                content_type TEXT,
+                checked_at REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS links_content_type ON links (content_type)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS links_discovered_at ON links (discovered_at)")
+
+    def add(self, links, details=None):
+        """Adds links with their details ({url: {source_page, text, index, top, left}}); known links keep their first discovery."""
+        details = details or {}
+        now = time.time()
+        rows = []
+        for url in links:
+            detail = details.get(url, {})
+            rows.append((url, detail.get('source_page'), detail.get('text'), detail.get('index'),
+                         detail.get('top'), detail.get('left'), now))
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO links (url, source_page, link_text, position, top, "left", discovered_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+            return self.conn.total_changes - before
+
+    def set_status(self, url, http_status, content_type):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE links SET http_status = ?, content_type = ?, checked_at = ? WHERE url = ?",
+                (http_status, content_type, time.time(), url)
+            )
+
+    def urls(self, content_type=None, status=None, source_page=None, since=None, unchecked=False):
+        """Returns the URLs matching every filter given, in discovery order.
+
+        content_type matches by prefix ('application/pdf' also matches '...; charset=...'), along with
+        its aliases (application/x-pdf) and generic download types (application/octet-stream). Links
+        not probed yet are kept, since their type is still unknown, and so are links whose URL ends
+        in the type's extension whatever they were served as. unchecked=True returns only unprobed links.
+        """
+        conditions, params = [], []
+        if content_type:
+            types = (content_type,) + CONTENT_TYPE_ALIASES.get(content_type, ()) + GENERIC_CONTENT_TYPES
+            matches = ["content_type IS NULL"] + ["content_type LIKE ?"] * len(types)
+            params.extend(f"{kind}%" for kind in types)
+            extension = CONTENT_TYPE_EXTENSIONS.get(content_type)
+            if extension:
+                matches += ["url LIKE ?", "url LIKE ?"]
+                params += [f"%{extension}", f"%{extension}?%"]
+            conditions.append(f"({' OR '.join(matches)})")
+        if status is not None:
+            conditions.append("http_status = ?")
+            params.append(status)
+        if source_page:
+            conditions.append("source_page = ?")
+            params.append(source_page)
+        if since is not None:
+            conditions.append("discovered_at >= ?")
+            params.append(since)
+        if unchecked:
+            conditions.append("checked_at IS NULL")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            return [row[0] for row in self.conn.execute(f"SELECT url FROM links {where} ORDER BY discovered_at, rowid", params)]
+
+    def attach(self, other_path, alias='other'):
+        """Attaches another link store, so queries can join links with {alias}.links."""
+        with self._lock:
+            self.conn.execute("ATTACH DATABASE ? AS " + alias, (other_path,))
+
+    def detach(self, alias='other'):
+        with self._lock:
+            self.conn.execute("DETACH DATABASE " + alias)
+
+    def diff(self, other_path):
+        """Returns the URLs in this store that the store at other_path does not have."""
+        self.attach(other_path, 'diff_source')
+        try:
+            with self._lock:
+                return [row[0] for row in self.conn.execute(
+                    "SELECT url FROM links WHERE url NOT IN (SELECT url FROM diff_source.links) ORDER BY discovered_at, rowid"
+                )]
+        finally:
+            self.detach('diff_source')
+
+    def merge_from(self, other_path):
+        """Copies the links of the store at other_path that this one does not have, with all their columns."""
+        self.attach(other_path, 'merge_source')
+        try:
+            with self._lock, self.conn:
+                before = self.conn.total_changes
+                self.conn.execute("INSERT OR IGNORE INTO links SELECT * FROM merge_source.links ORDER BY discovered_at, rowid")
+                return self.conn.total_changes - before
+        finally:
+            self.detach('merge_source')
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def counts_by_content_type(self):
+        """Returns {content type without parameters, or 'unchecked': number of links}."""
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT COALESCE(TRIM(SUBSTR(content_type, 1, INSTR(content_type || ';', ';') - 1)), 'unchecked'), COUNT(*)
+                FROM links GROUP BY 1
+            """).fetchall()
+        return dict(rows)
+
+    def export_csv(self, csv_path):
+        """Writes every link with its columns to csv_path."""
+        with self._lock:
+            columns = ', '.join('"' + field + '"' for field in LINK_FIELDS)
+            rows = self.conn.execute(f"SELECT {columns} FROM links ORDER BY discovered_at, rowid")
+            with open(csv_path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(LINK_FIELDS)
+                writer.writerows(rows)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def read_link_list(path, content_type=None):
+    """Returns the links of a links CSV (first column) or a link store, optionally only those of content_type."""
+    if path.endswith('.sqlite'):
+        with LinkStore(path) as store:
+            return store.urls(content_type=content_type)
+    with open(path, 'r') as f:
+        reader = csv.reader(f)
+        next(reader)  # Skip header row
+        return [row[0] for row in reader]
@@ -0,0 +1,392 @@
+import os
+import re
+import csv
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit, unquote
+from helper_functions.politeness import HostScheduler, is_throttling_status
+from helper_functions.warc_scraper import get_http_session
+from helper_functions.pdf_store import sha256_file
+
+# Every PDF starts with this, though the spec lets up to 1 KB of junk come before it
+PDF_MAGIC = b'%PDF-'
+PDF_MAGIC_WINDOW = 1024
+
+# Bytes read from the socket and written to disk at a time
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Files at least this big are fetched as range_parts byte ranges in parallel, when the server allows it
+PARALLEL_MIN_SIZE = 32 * 1024 ** 2
+
+# Folder inside the output folder where unfinished downloads wait to be resumed
+PARTIAL_FOLDER = '.partial'
+
+# Ask for the file as stored, so byte ranges and Content-Length refer to the PDF itself
+PDF_REQUEST_HEADERS = {'Accept': 'application/pdf,*/*;q=0.8', 'Accept-Encoding': 'identity'}
+
+# Default file name of the per-file result log inside the PDF project folder
+DOWNLOAD_LOG_FILE = 'download_log.csv'
+DOWNLOAD_LOG_FIELDS = ['finished_at', 'url', 'file', 'status', 'bytes', 'sha256', 'content_type', 'error']
+
+# Content types a PDF is served with in practice; anything else is logged as mislabelled
+PDF_CONTENT_TYPES = ('application/pdf', 'application/x-pdf', 'application/octet-stream', 'binary/octet-stream', 'application/download')
+
+# Download outcomes
+OK = 'ok'
+NOT_PDF = 'not_pdf'
+HTTP_ERROR = 'http_error'
+THROTTLED = 'throttled'
+INCOMPLETE = 'incomplete'
+FAILED = 'failed'
+
+def load_download_log(log_path):
+    """Returns {url: log row} of the last successful download of every URL in the log."""
+    rows = {}
+    if log_path and os.path.exists(log_path):
+        with open(log_path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                if row['status'] == OK:
+                    rows[row['url']] = row
+    return rows
+
+def pdf_filename(url, response):
+    """Picks a file name from Content-Disposition, else from the last segment of the URL path."""
+    disposition = response.headers.get('Content-Disposition', '')
+    match = re.search(r"filename\*=(?:UTF-8'')?([^;]+)|filename=\"?([^\";]+)\"?", disposition, flags=re.I)
+    if match:
+        name = unquote((match.group(1) or match.group(2)).strip())
+    else:
+        name = unquote(urlsplit(url).path.rstrip('/').split('/')[-1])
+    name = re.sub(r'[\\/:*?"<>|\x00-\x1f]', '_', os.path.basename(name)).strip(' .') or hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    if not name.lower().endswith('.pdf'):
+        name += '.pdf'
+    return name
+
+class PDFDownloader:
+    """Downloads PDFs over plain HTTP, many at once, streaming each one to disk in chunks.
+
+    A download is only kept if its first bytes are a PDF header; an HTML error or login page
+    served in its place is dropped and logged as not_pdf. Every result is appended to the CSV
+    log at log_path, which also serves as the URL -> file mapping: a file name already taken by
+    another URL gets a short hash of the URL added.
+
+    Unfinished downloads are kept in output_folder/.partial, so a file in output_folder is
+    always a whole PDF. When the server supports byte ranges, a dropped connection is resumed
+    where it stopped (up to max_retries times, and again on the next run), guarded by If-Range
+    so a file that changed in between is fetched anew. Files of parallel_min_size bytes or more
+    are split into range_parts ranges fetched at the same time; they still count as a single
+    request towards the host's slots in the scheduler.
+
+    Each document is kept in output_folder once: a URL serving a file whose SHA-256 the folder
+    already has is mapped to the existing file. With a PDFStore, finished files are hardlinks to
+    the store, and a URL any project fetched before is linked in without downloading it again.
+    """
+
+    def __init__(self, output_folder, concurrency=8, scheduler=None, log_path=None, timeout=60,
+                 range_parts=4, parallel_min_size=PARALLEL_MIN_SIZE, max_retries=3, store=None):
+        self.output_folder = output_folder
+        self.concurrency = concurrency
+        self.scheduler = scheduler or HostScheduler()
+        self.log_path = log_path
+        self.timeout = timeout
+        self.range_parts = range_parts
+        self.parallel_min_size = parallel_min_size
+        self.max_retries = max_retries
+        self.partial_folder = os.path.join(output_folder, PARTIAL_FOLDER)
+        self.store = store
+
+        downloads = load_download_log(log_path)
+        self.url_to_file = {url: row['file'] for url, row in downloads.items()}
+        self._file_owners = {name: url for url, name in self.url_to_file.items()}
+        self._file_for_digest = {row['sha256']: row['file'] for row in downloads.values() if row.get('sha256')}
+        self._lock = threading.Lock()
+        os.makedirs(self.partial_folder, exist_ok=True)
+        # Names of unfinished downloads stay reserved for the URL that will resume them
+        for state_file in os.listdir(self.partial_folder):
+            if state_file.endswith('.json'):
+                with open(os.path.join(self.partial_folder, state_file), 'r') as f:
+                    state = json.load(f)
+                self._file_owners[state['file']] = state['url']
+
+    def _claim_name(self, url, name):
+        with self._lock:
+            owner = self._file_owners.get(name)
+            if (owner is not None and owner != url) or (owner is None and os.path.exists(os.path.join(self.output_folder, name))):
+                stem, extension = os.path.splitext(name)
+                name = f"{stem}-{hashlib.sha1(url.encode('utf-8')).hexdigest()[:8]}{extension}"
+            self._file_owners[name] = url
+            return name
+
+    def download(self, url):
+        """Downloads one URL and returns its result as a dict with the fields of the log."""
+        result = {'url': url, 'file': '', 'status': FAILED, 'bytes': 0, 'sha256': '', 'content_type': '', 'error': ''}
+        try:
+            for attempt in range(2):
+                state = self._load_state(url)
+                if state is not None and not state['ranges']:
+                    # Without byte ranges (or a known size) a partial file can neither be resumed nor told
+                    # apart from a whole one, so a download an earlier run left behind starts over
+                    logging.info(f"Discarding the partial download of {url}: the server does not support resuming")
+                    self._discard(url, state)
+                    state = None
+                if state is None:
+                    state = self._begin(url, result)
+                    if state is None:
+                        return result
+                else:
+                    result['content_type'] = state['content_type']
+                    logging.info(f"Resuming {url} from {self._downloaded_bytes(url, state)} of {state['total']} bytes")
+
+                if self._fetch_segments(url, state):
+                    break
+                # If-Range was not honoured, so the file changed since the partial download started
+                logging.warning(f"{url} changed since it was partly downloaded, starting over")
+                self._discard(url, state)
+            else:
+                result['error'] = "Server does not honour byte ranges"
+                return result
+
+            size = self._downloaded_bytes(url, state)
+            result['bytes'] = size
+            if state['total'] is not None and size != state['total']:
+                result['status'] = INCOMPLETE
+                result['error'] = f"Got {size} of {state['total']} bytes"
+                self._discard(url, state)
+                return result
+
+            self._assemble(url, state)
+            result['file'] = state['file']
+            self._keep_once(url, result)
+            result['status'] = OK
+            return result
+        except Exception as e:
+            result['error'] = str(e)
+            state = self._load_state(url)
+            if state is not None and not state['ranges']:
+                self._discard(url, state)  # Without range support there is nothing to resume from
+            return result
+
+    def _begin(self, url, result):
+        """Starts a fresh download. Returns its state, or None when result already says why there is nothing to fetch."""
+        with get_http_session().get(url, stream=True, timeout=(10, self.timeout), headers=PDF_REQUEST_HEADERS) as response:
+            result['content_type'] = response.headers.get('Content-Type', '')
+            if response.status_code != 200:
+                result['status'] = THROTTLED if is_throttling_status(response.status_code) else HTTP_ERROR
+                result['error'] = f"HTTP {response.status_code}"
+                return None
+
+            chunks = response.iter_content(DOWNLOAD_CHUNK_SIZE)
+            head = b''
+            for chunk in chunks:
+                head += chunk
+                if len(head) >= PDF_MAGIC_WINDOW:
+                    break
+            if PDF_MAGIC not in head[:PDF_MAGIC_WINDOW]:
+                result['status'] = NOT_PDF
+                result['error'] = f"Body does not start with {PDF_MAGIC.decode()}"
+                return None
+            if result['content_type'].split(';')[0].strip().lower() not in PDF_CONTENT_TYPES:
+                logging.warning(f"PDF served as '{result['content_type']}': {url}")
+
+            # Content-Length counts encoded bytes, so it is only the file size on unencoded responses
+            content_length = response.headers.get('Content-Length')
+            total = int(content_length) if content_length and not response.headers.get('Content-Encoding') else None
+            etag = response.headers.get('ETag')
+            state = {
+                'url': url,
+                'file': self._claim_name(url, pdf_filename(url, response)),
+                'content_type': result['content_type'],
+                'total': total,
+                'ranges': total is not None and response.headers.get('Accept-Ranges', '').lower() == 'bytes',
+                # If-Range needs a strong validator; a weak ETag only works for If-None-Match
+                'validator': etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+            }
+            parts = self.range_parts if state['ranges'] and total >= self.parallel_min_size else 1
+            if parts > 1:
+                segment_size = -(-total // parts)
+                state['segments'] = [[start, min(start + segment_size, total) - 1] for start in range(0, total, segment_size)]
+            else:
+                state['segments'] = [[0, total - 1 if total is not None else None]]
+            self._save_state(url, state)
+
+            if parts == 1:
+                # One segment: keep this response's bytes instead of asking for them again
+                try:
+                    with open(self._segment_path(url, 0), 'wb') as f:
+                        f.write(head)
+                        for chunk in chunks:
+                            f.write(chunk)
+                except requests.RequestException as e:
+                    if not state['ranges']:
+                        raise
+                    logging.warning(f"Download of {url} dropped, resuming: {e}")
+            else:
+                logging.info(f"Downloading {url} ({total} bytes) in {parts} parallel ranges")
+            return state
+
+    def _fetch_segments(self, url, state):
+        """Fetches whatever is missing of each segment. Returns False if the server answered a range with the whole file."""
+        pending = [index for index in range(len(state['segments'])) if not self._segment_complete(url, state, index)]
+        if not pending:
+            return True
+        if not state['ranges']:
+            raise IOError("Connection closed early and the server does not support resuming")
+        if len(pending) == 1:
+            return self._fetch_segment(url, state, pending[0])
+        with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+            return all(list(executor.map(lambda index: self._fetch_segment(url, state, index), pending)))
+
+    def _fetch_segment(self, url, state, index):
+        start, end = state['segments'][index]
+        path = self._segment_path(url, index)
+        for attempt in range(1, self.max_retries + 1):
+            done = os.path.getsize(path) if os.path.exists(path) else 0
+            if start + done > end:
+                return True
+            headers = dict(PDF_REQUEST_HEADERS, Range=f"bytes={start + done}-{end}")
+            if state['validator']:
+                headers['If-Range'] = state['validator']
+            try:
+                with get_http_session().get(url, stream=True, timeout=(10, self.timeout), headers=headers) as response:
+                    if response.status_code != 206:
+                        return False
+                    with open(path, 'ab') as f:
+                        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(f"Range {start + done}-{end} of {url} dropped, resuming (attempt {attempt}): {e}")
+                time.sleep(attempt)
+
+        if not self._segment_complete(url, state, index):
+            raise IOError(f"Range {start}-{end} of {url} still incomplete after {self.max_retries} attempts")
+        return True
+
+    def _segment_complete(self, url, state, index):
+        start, end = state['segments'][index]
+        path = self._segment_path(url, index)
+        if end is None:
+            # Size unknown: the segment was streamed to the end in _begin of this run, as such a download is never resumed
+            return os.path.exists(path)
+        return os.path.exists(path) and os.path.getsize(path) >= end - start + 1
+
+    def _downloaded_bytes(self, url, state):
+        return sum(os.path.getsize(self._segment_path(url, index)) for index in range(len(state['segments']))
+                   if os.path.exists(self._segment_path(url, index)))
+
+    def _assemble(self, url, state):
+        final_path = os.path.join(self.output_folder, state['file'])
+        if len(state['segments']) == 1:
+            os.replace(self._segment_path(url, 0), final_path)
+        else:
+            with open(final_path + '.part', 'wb') as out:
+                for index in range(len(state['segments'])):
+                    with open(self._segment_path(url, index), 'rb') as segment:
+                        shutil.copyfileobj(segment, out, DOWNLOAD_CHUNK_SIZE * 16)
+            os.replace(final_path + '.part', final_path)
+        self._discard(url, state)
+
+    def _partial_key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def _segment_path(self, url, index):
+        return os.path.join(self.partial_folder, f"{self._partial_key(url)}.{index}.part")
+
+    def _state_path(self, url):
+        return os.path.join(self.partial_folder, f"{self._partial_key(url)}.json")
+
+    def _load_state(self, url):
+        path = self._state_path(url)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self, url, state):
+        with open(self._state_path(url), 'w') as f:
+            json.dump(state, f)
+
+    def _discard(self, url, state):
+        for index in range(len(state['segments'])):
+            if os.path.exists(self._segment_path(url, index)):
+                os.remove(self._segment_path(url, index))
+        if os.path.exists(self._state_path(url)):
+            os.remove(self._state_path(url))
+
+    def _keep_once(self, url, result):
+        """Hashes a finished download and drops it if the folder already has the same document."""
+        path = os.path.join(self.output_folder, result['file'])
+        result['sha256'] = self.store.add(path, url) if self.store else sha256_file(path)
+        with self._lock:
+            existing = self._file_for_digest.get(result['sha256'])
+            duplicate = existing and existing != result['file'] and os.path.exists(os.path.join(self.output_folder, existing))
+            if not duplicate:
+                self._file_for_digest[result['sha256']] = result['file']
+        if duplicate:
+            os.remove(path)
+            logging.info(f"{url} serves the same document as {existing}")
+            result['file'] = existing
+
+    def _link_stored(self, url, sha256, file_name):
+        """Puts a document from the store into the folder, without downloading it."""
+        with self._lock:
+            existing = self._file_for_digest.get(sha256)
+        if existing and os.path.exists(os.path.join(self.output_folder, existing)):
+            name = existing
+        else:
+            name = self._claim_name(url, file_name)
+            self.store.link_into(sha256, os.path.join(self.output_folder, name))
+            with self._lock:
+                self._file_for_digest[sha256] = name
+        logging.info(f"Took {url} from the PDF store")
+        return {'url': url, 'file': name, 'status': OK, 'bytes': os.path.getsize(os.path.join(self.output_folder, name)),
+                'sha256': sha256, 'content_type': 'application/pdf', 'error': ''}
+
+    def _paced_download(self, url):
+        stored = self.store.lookup_url(url) if self.store else None
+        if stored:
+            return self._link_stored(url, *stored)
+        self.scheduler.acquire(url)
+        started = time.monotonic()
+        result = self.download(url)
+        self.scheduler.release(url, latency=time.monotonic() - started, ok=result['status'] not in (FAILED, THROTTLED))
+        return result
+
+    def _log_result(self, result):
+        if not self.log_path:
+            return
+        write_header = not os.path.exists(self.log_path)
+        with open(self.log_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=DOWNLOAD_LOG_FIELDS)
+            if write_header:
+                writer.writeheader()
+            writer.writerow(dict(result, finished_at=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())))
+
+    def run(self, link_list, catname='', progress_callback=None):
+        """Downloads link_list and returns {url: result}.
+
+        progress_callback(done, total, url, result), if given, is called as each download finishes.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self._paced_download, link): link for link in link_list}
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                url = result['url']
+                results[url] = result
+                if result['status'] == OK:
+                    self.url_to_file[url] = result['file']
+                    logging.info(f"{done}/{len(link_list)} - {catname} - Downloaded {result['file']} ({result['bytes']} bytes) from {url}")
+                else:
+                    logging.error(f"{done}/{len(link_list)} - {catname} - {result['status']} for {url}: {result['error']}")
+                self._log_result(result)
+                if progress_callback:
+                    progress_callback(done, len(link_list), url, result)
+        return results
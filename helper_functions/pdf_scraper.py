@@ -1,10 +1,17 @@
 import os
-import csv
 import time
+import shutil
 from selenium import webdriver
 import logging
+from helper_functions.browser_pool import BrowserPool
+from helper_functions.frontier import Frontier, FRONTIER_FILE, claim_links
+from helper_functions.politeness import HostScheduler
+from helper_functions.pdf_downloader import PDFDownloader, DOWNLOAD_LOG_FILE, OK
+from helper_functions.pdf_store import PDFStore
+from helper_functions.url_index import PDFS, skip_seen_links, record_done_links
+from helper_functions.link_store import read_link_list
 
-def setup_webdriver(output_folder):
+def setup_webdriver(output_folder, headless=False):
     # Ensure the output folder exists and is an absolute path
     output_folder = os.path.abspath(output_folder)
     os.makedirs(output_folder, exist_ok=True)
@@ -27,16 +34,30 @@ def setup_webdriver(output_folder):
     # Additional Chrome options to enforce download behavior
     options.add_argument("--no-sandbox")
     options.add_argument("--disable-dev-shm-usage")
+    if headless:
+        options.add_argument("--headless=new")
     
     # Create the WebDriver
     driver = webdriver.Chrome(options=options)
     
     return driver
 
-def wait_for_download(path):
+# Function to start a headless Chrome for one pool worker, downloading into its own folder
+def setup_pool_webdriver(worker_id, output_folder):
+    download_folder = os.path.join(os.path.abspath(output_folder), f".worker-{worker_id}")
+    shutil.rmtree(download_folder, ignore_errors=True)  # Drop partial files left by a crashed worker
+    driver = setup_webdriver(download_folder, headless=True)
+    driver.download_folder = download_folder
+    return driver
+
+def wait_for_download(path, appear_timeout=0):
     # Wait for downloads to complete
     max_wait_time = 300  # 5 minutes maximum wait
     start_time = time.time()
+
+    # Optionally wait for the download to show up in the folder at all
+    while not os.listdir(path) and time.time() - start_time < appear_timeout:
+        time.sleep(0.5)
     
     while True:
         # Check if download is complete (no .crdownload files)
@@ -52,18 +73,85 @@ def wait_for_download(path):
         
         time.sleep(2)
 
-def scrape_from_list(link_list, output_folder, catname):
-    driver = setup_webdriver(output_folder)
+# Function to download one PDF in a pool worker and move it into the shared output folder
+def download_pdf_with_driver(link, driver, output_folder):
+    download_folder = driver.download_folder
+    driver.get(link)
+    wait_for_download(download_folder, appear_timeout=30)
+
+    downloaded = []
+    for name in os.listdir(download_folder):
+        if name.endswith('.crdownload'):
+            os.remove(os.path.join(download_folder, name))  # Timed out, don't let it leak into the next link
+        else:
+            shutil.move(os.path.join(download_folder, name), os.path.join(output_folder, name))
+            downloaded.append(name)
+    return bool(downloaded)
+
+# mode='http' streams the PDFs directly, concurrency at a time, and logs each file to log_path;
+# mode='browser' lets Chrome download them, for sites that only serve PDFs to a real browser
+# store_folder holds the PDF store shared by all projects, so each document is downloaded and kept once
+# frontier, if given, records the outcome of every link so an interrupted run can be resumed
+# Requests to each host are paced by a HostScheduler
+def scrape_from_list(link_list, output_folder, catname, workers=1, frontier=None, scheduler=None,
+                     mode='http', concurrency=8, log_path=None, store_folder=None):
     os.makedirs(output_folder, exist_ok=True)
+    if not link_list:
+        return
+    scheduler = scheduler or HostScheduler()
+
+    if mode == 'http':
+        store = PDFStore(store_folder) if store_folder else None
+        downloader = PDFDownloader(output_folder, concurrency=concurrency, scheduler=scheduler, log_path=log_path, store=store)
+        progress_callback = (lambda done, total, link, result: frontier.mark(link, result['status'] == OK, result['error'] or None)) if frontier else None
+        try:
+            downloader.run(link_list, catname=catname, progress_callback=progress_callback)
+        finally:
+            if store:
+                store.close()
+        return
+
+    # Each pool worker downloads into its own folder, so every file can be waited on and attributed
+    if workers > 1:
+        pool = BrowserPool(
+            setup_pool_webdriver,
+            download_pdf_with_driver,
+            workers=workers,
+            driver_kwargs={'output_folder': output_folder},
+            handler_kwargs={'output_folder': output_folder},
+            task_timeout=360,
+            scheduler=scheduler
+        )
+        progress_callback = (lambda done, total, link, ok: frontier.mark(link, ok)) if frontier else None
+        pool.run(link_list, catname=catname, progress_callback=progress_callback)
+        return
+
+    driver = setup_webdriver(output_folder)
     
+    # Downloads in the shared folder can't be told apart, so a link counts as done once its download started
     for id, link in enumerate(link_list):
-        driver.get(link)
-        logging.info(f"{id}/{len(link_list)} - Downloading pdf from {link}")
+        scheduler.acquire(link)
+        try:
+            driver.get(link)
+            logging.info(f"{id}/{len(link_list)} - Downloading pdf from {link}")
+            scheduler.release(link)
+            if frontier:
+                frontier.mark_done(link)
+        except Exception as e:
+            logging.error(f"Error downloading {link}: {e}")
+            scheduler.release(link, ok=False)
+            if frontier:
+                frontier.mark_failed(link, str(e))
     wait_for_download(output_folder)
 
     driver.quit()
 
-def pdfscrappermain(csv_path, project_folder):
+# Progress is journaled in frontier.sqlite; a new run continues with the links that are still pending
+# and retry_failed=True runs only the links that failed before
+# The result of every HTTP download, and so which file came from which URL, is logged in download_log.csv
+# With a seen_index, PDFs another project already downloaded are skipped and the new ones are added to it
+def pdfscrappermain(csv_path, project_folder, workers=1, retry_failed=False, mode='http', concurrency=8, store_folder=None,
+                    seen_index=None):
     # Set up logging inside the project folder
     logging.basicConfig(filename=os.path.join(project_folder, 'pdf_scraper.log'), level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     
@@ -72,12 +160,18 @@ def pdfscrappermain(csv_path, project_folder):
     
     os.makedirs(output_folder, exist_ok=True)
 
-    # Read the CSV file and extract links
-    with open(csv_path, 'r') as f:
-        reader = csv.reader(f)
-        next(reader)  # Skip header row
-        link_list = [row[0] for row in reader]
+    # Read the links from the CSV file or link store; links probed as something other than a PDF are left out
+    link_list = read_link_list(csv_path, content_type='application/pdf')
     
     # Call the scrape function to download PDFs
-    scrape_from_list(link_list=link_list, output_folder=output_folder, catname=csv_path.split('/')[-1])
+    with Frontier(os.path.join(project_folder, FRONTIER_FILE)) as frontier:
+        link_list = claim_links(frontier, link_list, retry_failed=retry_failed)
+        if seen_index:
+            link_list = skip_seen_links(frontier, link_list, seen_index, PDFS)
+        scrape_from_list(link_list=link_list, output_folder=output_folder, catname=csv_path.split('/')[-1], workers=workers, frontier=frontier,
+                         mode=mode, concurrency=concurrency, log_path=os.path.join(project_folder, DOWNLOAD_LOG_FILE),
+                         store_folder=store_folder)
+        if seen_index:
+            record_done_links(frontier, link_list, seen_index, PDFS)
+        logging.info(f"PDF frontier: {frontier.counts()}")
 
@@ -0,0 +1,134 @@
+import os
+import time
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+# Folder inside the output root holding every PDF once, shared by all projects
+PDF_STORE_FOLDER = '.pdf-store'
+
+# Bytes hashed at a time
+HASH_CHUNK_SIZE = 1024 * 1024
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def link_or_copy(source, target):
+    """Hardlinks source to target, replacing target; copies where hardlinks are not possible."""
+    temp_path = target + '.link'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+
+def unique_pdf_files(folder):
+    """Returns the names of the PDFs in folder, leaving out files whose content another one already has.
+
+    Only files of equal size are hashed, so this stays cheap on folders without duplicates.
+    """
+    by_size = {}
+    for name in sorted(os.listdir(folder)):
+        if name.endswith('.pdf'):
+            by_size.setdefault(os.path.getsize(os.path.join(folder, name)), []).append(name)
+
+    unique = []
+    for names in by_size.values():
+        if len(names) == 1:
+            unique.extend(names)
+            continue
+        seen = set()
+        for name in names:
+            digest = sha256_file(os.path.join(folder, name))
+            if digest not in seen:
+                seen.add(digest)
+                unique.append(name)
+    return sorted(unique)
+
+class PDFStore:
+    """Content-addressed store of downloaded PDFs, keyed by SHA-256 and shared across projects.
+
+    Each unique document is kept once under objects/, and the scraped-pdfs folders of the
+    projects hold hardlinks to it. A manifest maps every URL to the hash of the document it
+    served, so a URL already fetched for any project is linked in without downloading it
+    again. Safe to share between threads.
+    """
+
+    def __init__(self, store_folder):
+        self.store_folder = store_folder
+        self.objects_folder = os.path.join(store_folder, 'objects')
+        os.makedirs(self.objects_folder, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(store_folder, 'manifest.sqlite'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS objects (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                added_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+
+    def object_path(self, sha256):
+        return os.path.join(self.objects_folder, sha256[:2], f"{sha256}.pdf")
+
+    def lookup_url(self, url):
+        """Returns (sha256, original file name) of the stored document url served, or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT o.sha256, o.file_name FROM urls u JOIN objects o ON o.sha256 = u.sha256 WHERE u.url = ?",
+                (url,)
+            ).fetchone()
+        if row and os.path.exists(self.object_path(row[0])):
+            return row
+        return None
+
+    def add(self, path, url):
+        """Stores the file at path as the document url served and returns its hash.
+
+        The file stays where it is, turned into a hardlink of the stored copy.
+        """
+        sha256 = sha256_file(path)
+        object_path = self.object_path(sha256)
+        with self._lock:
+            if os.path.exists(object_path):
+                link_or_copy(object_path, path)
+            else:
+                os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                link_or_copy(path, object_path)
+            now = time.time()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR IGNORE INTO objects (sha256, size, file_name, added_at) VALUES (?, ?, ?, ?)",
+                    (sha256, os.path.getsize(object_path), os.path.basename(path), now)
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO urls (url, sha256, fetched_at) VALUES (?, ?, ?)",
+                    (url, sha256, now)
+                )
+        return sha256
+
+    def link_into(self, sha256, path):
+        """Puts the stored document at path."""
+        link_or_copy(self.object_path(sha256), path)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,163 @@
+import time
+import asyncio
+import logging
+import threading
+import requests
+import urllib3
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Seconds between requests to one host when robots.txt sets no Crawl-delay
+DEFAULT_CRAWL_DELAY = 0.25
+
+# Upper bound for a host's delay, whether it comes from robots.txt or from backing off
+MAX_CRAWL_DELAY = 60.0
+
+# How often a caller re-checks a host that has no free concurrency slot
+SLOT_POLL_INTERVAL = 0.1
+
+class _HostState:
+    def __init__(self, delay, concurrency):
+        self.base_delay = delay
+        self.delay = delay
+        self.tokens = 1.0
+        self.refilled_at = time.monotonic()
+        self.limit = float(concurrency)
+        self.in_flight = 0
+        self.successes = 0
+
+class HostScheduler:
+    """Decides when a request to a host may start.
+
+    Each host gets a token bucket that refills one token every `delay` seconds. The delay
+    starts at the host's robots.txt Crawl-delay, or default_delay if it has none. On top
+    of that each host has a concurrency limit that adapts to how the host responds
+    (additive increase, multiplicative decrease):
+    - An error or throttling response halves the limit and doubles the delay.
+    - A response slower than target_latency lowers the limit by one.
+    - A run of fast successes raises the limit by one and eases the delay back
+      towards its base value.
+
+    Hosts are independent, so a slow host never holds up a fast one. The scheduler is
+    thread-safe and can be used from threads (acquire), from asyncio (acquire_async) or
+    from a dispatch loop that must not block (try_acquire). Every acquired slot must be
+    given back with release().
+    """
+
+    def __init__(self, default_delay=DEFAULT_CRAWL_DELAY, max_concurrency=4, min_concurrency=1,
+                 target_latency=5.0, respect_robots=True, user_agent='*'):
+        self.default_delay = default_delay
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.target_latency = target_latency
+        self.respect_robots = respect_robots
+        self.user_agent = user_agent
+
+        self._hosts = {}
+        self._lock = threading.Lock()
+        # Per-host locks and pending asyncio lookups, so robots.txt of a new host is read once
+        self._host_locks = {}
+        self._lookups = {}
+
+    def _robots_delay(self, url):
+        if not self.respect_robots:
+            return None
+        parts = urlsplit(url)
+        try:
+            response = requests.get(f"{parts.scheme}://{parts.netloc}/robots.txt", timeout=10, verify=False)
+            if response.status_code != 200:
+                return None
+            parser = RobotFileParser()
+            parser.parse(response.text.splitlines())
+            return parser.crawl_delay(self.user_agent)
+        except Exception as e:
+            logging.warning(f"Could not read robots.txt for {parts.netloc}: {e}")
+            return None
+
+    def host_state(self, url):
+        """Returns the state of url's host, reading its robots.txt the first time the host is seen."""
+        host = urlsplit(url).netloc
+        state = self._hosts.get(host)
+        if state is None:
+            with self._lock:
+                host_lock = self._host_locks.setdefault(host, threading.Lock())
+            # The network call holds only this host's lock; other callers for the host wait for its result
+            with host_lock:
+                state = self._hosts.get(host)
+                if state is None:
+                    crawl_delay = self._robots_delay(url)
+                    delay = min(float(crawl_delay), MAX_CRAWL_DELAY) if crawl_delay is not None else self.default_delay
+                    state = _HostState(delay, self.max_concurrency)
+                    with self._lock:
+                        self._hosts[host] = state
+                    if crawl_delay is not None:
+                        logging.info(f"Using robots.txt Crawl-delay of {delay}s for {host}")
+        return state
+
+    def try_acquire(self, url):
+        """Takes a slot for url's host if one is free. Returns 0 on success, else the seconds to wait before retrying."""
+        state = self.host_state(url)
+        with self._lock:
+            now = time.monotonic()
+            if state.delay > 0:
+                state.tokens = min(1.0, state.tokens + (now - state.refilled_at) / state.delay)
+            else:
+                state.tokens = 1.0
+            state.refilled_at = now
+
+            if state.in_flight >= max(1, int(state.limit)):
+                return SLOT_POLL_INTERVAL
+            if state.tokens < 1.0:
+                return (1.0 - state.tokens) * state.delay
+
+            state.tokens -= 1.0
+            state.in_flight += 1
+            return 0
+
+    def acquire(self, url):
+        while True:
+            wait = self.try_acquire(url)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            # Tasks starting together on a new host share one lookup instead of each taking an executor thread
+            lookup = self._lookups.get(host)
+            if lookup is None:
+                lookup = asyncio.get_running_loop().run_in_executor(None, self.host_state, url)
+                self._lookups[host] = lookup
+                lookup.add_done_callback(lambda _: self._lookups.pop(host, None))
+            await asyncio.shield(lookup)
+        while True:
+            wait = self.try_acquire(url)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def release(self, url, latency=None, ok=True):
+        """Gives back a slot and adapts the host's concurrency and delay to how the request went."""
+        state = self.host_state(url)
+        with self._lock:
+            state.in_flight = max(0, state.in_flight - 1)
+
+            if not ok:
+                state.limit = max(self.min_concurrency, state.limit / 2)
+                state.delay = min(MAX_CRAWL_DELAY, max(state.delay * 2, state.base_delay, 0.5))
+                state.successes = 0
+            elif latency is not None and latency > self.target_latency:
+                state.limit = max(self.min_concurrency, state.limit - 1)
+                state.successes = 0
+            else:
+                state.successes += 1
+                if state.successes >= state.limit:
+                    state.limit = min(self.max_concurrency, state.limit + 1)
+                    state.delay = max(state.base_delay, state.delay * 0.75)
+                    state.successes = 0
+
+def is_throttling_status(status_code):
+    """True for responses that mean the server wants us to slow down."""
+    return status_code in (429, 503)
@@ -0,0 +1,134 @@
+import os
+import re
+import json
+import logging
+import threading
+import lxml.html
+import lxml.etree
+from urllib.parse import urljoin, urlsplit
+
+# Render modes a host can be classified as
+STATIC = 'static'
+JAVASCRIPT = 'js'
+
+# Default file name of the saved decisions inside a scraper's project folder
+RENDER_MODES_FILE = 'render_modes.json'
+
+# Charset declarations lxml honours at the start of a document
+DECLARED_CHARSET_PATTERN = re.compile(rb'<meta[^>]+charset|<\?xml[^>]+encoding', re.I)
+
+def parse_html(html):
+    """Parses a page with lxml; raises lxml.etree.ParserError if it has no elements (only comments, say).
+
+    Bytes are decoded as the page declares, or as UTF-8 if it declares nothing (lxml would
+    assume Latin-1). A str is parsed as UTF-8 bytes, since lxml refuses strings that carry
+    an XML encoding declaration.
+    """
+    if isinstance(html, str):
+        html = html.encode('utf-8')
+    elif DECLARED_CHARSET_PATTERN.search(html[:2048]):
+        return lxml.html.document_fromstring(html)
+    return lxml.html.document_fromstring(html, parser=lxml.html.HTMLParser(encoding='utf-8'))
+
+def base_url_of(document, page_url):
+    """Returns the URL relative links of a parsed page resolve against: its <base href>, or page_url."""
+    base = document.xpath('//base/@href')
+    return urljoin(page_url, base[0].strip()) if base and base[0].strip() else page_url
+
+def page_signature(html, base_url):
+    """Returns (links, words) of a page (bytes or str): the absolute hrefs it links to and the words of its visible text."""
+    if not html or not html.strip():
+        return set(), set()
+    try:
+        document = parse_html(html)
+    except lxml.etree.ParserError:
+        return set(), set()
+    base_url = base_url_of(document, base_url)
+    for element in document.xpath('//script|//style|//noscript'):
+        element.drop_tree()
+
+    links = set()
+    for href in document.xpath('//a/@href'):
+        href = href.strip()
+        if href and not href.startswith(('#', 'javascript:', 'mailto:')):
+            links.add(urljoin(base_url, href).split('#')[0])
+    words = set(document.text_content().lower().split())
+    return links, words
+
+def similarity(a, b):
+    """Jaccard similarity of two sets; two empty sets count as identical."""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+class RenderDetector:
+    """Decides per host whether pages can be fetched over plain HTTP or need a browser.
+
+    For the first sample_size pages of a host the caller loads the page both ways and passes
+    the two HTML versions to observe(). If the links and text of every sample match, the host
+    is static and the rest of it can skip the browser; one mismatch marks it as needing
+    JavaScript. Hosts not decided yet report None. Decisions are saved to cache_path, if
+    given, so the next run does not sample again.
+    """
+
+    def __init__(self, sample_size=3, link_threshold=0.9, text_threshold=0.8, cache_path=None):
+        self.sample_size = sample_size
+        self.link_threshold = link_threshold
+        self.text_threshold = text_threshold
+        self.cache_path = cache_path
+
+        self._modes = {}
+        self._matches = {}
+        self._lock = threading.Lock()
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r') as f:
+                self._modes = json.load(f)
+
+    def mode_for(self, url):
+        """Returns STATIC, JAVASCRIPT or None if url's host has not been decided yet."""
+        return self._modes.get(urlsplit(url).netloc)
+
+    def pick_samples(self, link_list):
+        """Returns the links to load both ways: up to sample_size per undecided host, in list order."""
+        samples = []
+        per_host = {}
+        for link in link_list:
+            host = urlsplit(link).netloc
+            if host in self._modes or per_host.get(host, 0) >= self.sample_size:
+                continue
+            per_host[host] = per_host.get(host, 0) + 1
+            samples.append(link)
+        return samples
+
+    def observe(self, url, http_html, browser_html):
+        """Compares the HTTP and the browser version of a page and returns the host's mode, if decided."""
+        http_links, http_words = page_signature(http_html, url)
+        browser_links, browser_words = page_signature(browser_html, url)
+        link_score = similarity(http_links, browser_links)
+        text_score = similarity(http_words, browser_words)
+        matches = link_score >= self.link_threshold and text_score >= self.text_threshold
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host in self._modes:
+                return self._modes[host]
+            if not matches:
+                mode = JAVASCRIPT
+            else:
+                self._matches[host] = self._matches.get(host, 0) + 1
+                if self._matches[host] < self.sample_size:
+                    return None
+                mode = STATIC
+            self._modes[host] = mode
+            self._save()
+
+        logging.info(f"Render mode for {host}: {mode} (links {link_score:.2f}, text {text_score:.2f} on {url})")
+        return mode
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        temp_path = self.cache_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self._modes, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self.cache_path)
@@ -0,0 +1,115 @@
+import os
+import time
+import sqlite3
+import threading
+from helper_functions.pdf_store import sha256_file
+from helper_functions.token_counter import HEURISTIC_TOKENIZER
+
+# Folder inside a subproject holding the token counts, and the cache file in it
+TOKENS_FOLDER = 'tokens-counted'
+TOKEN_CACHE_FILE = 'token_cache.sqlite'
+
+# Kinds of files the cache counts separately
+PDF_KIND = 'pdf'
+WARC_KIND = 'warc'
+
+class TokenCache:
+    """Token count of every PDF and WARC file of a subproject, so estimating again only reads new or changed files.
+
+    Files are keyed by their path relative to the subproject. An entry is reused while the
+    file's size and mtime are unchanged; if only the mtime changed (a copy, a touch) the
+    content hash decides. Counts are only reused with the tokenizer they were made with. Files
+    that could not be read are cached with their error, so they are not retried until they
+    change. Safe to share between threads.
+    """
+
+    def __init__(self, subproject_folder):
+        self.subproject_folder = subproject_folder
+        tokens_folder = os.path.join(subproject_folder, TOKENS_FOLDER)
+        os.makedirs(tokens_folder, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(tokens_folder, TOKEN_CACHE_FILE), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS files (
+                kind TEXT NOT NULL,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                tokens REAL NOT NULL,
+                error TEXT,
+                counted_at REAL NOT NULL,
+                tokenizer TEXT NOT NULL DEFAULT '',
+                PRIMARY KEY (kind, path)
+            )
+        """)
+        # Caches from before the tokenizer column get an empty name, so their counts are redone once
+        if 'tokenizer' not in {row[1] for row in self.conn.execute("PRAGMA table_info(files)")}:
+            self.conn.execute("ALTER TABLE files ADD COLUMN tokenizer TEXT NOT NULL DEFAULT ''")
+
+    def _relative(self, path):
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.subproject_folder))
+
+    def lookup(self, kind, path, tokenizer=HEURISTIC_TOKENIZER):
+        """Returns (tokens, error) cached for the file at path, or None if it is new, changed or counted with another tokenizer."""
+        relative_path = self._relative(path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, sha256, tokens, error, tokenizer FROM files WHERE kind = ? AND path = ?", (kind, relative_path)
+            ).fetchone()
+        if not row or row[0] != stat.st_size or row[5] != tokenizer:
+            return None
+        size, mtime_ns, sha256, tokens, error, _ = row
+        if mtime_ns != stat.st_mtime_ns:
+            if sha256_file(path) != sha256:
+                return None
+            with self._lock, self.conn:
+                self.conn.execute("UPDATE files SET mtime_ns = ? WHERE kind = ? AND path = ?", (stat.st_mtime_ns, kind, relative_path))
+        return tokens, error
+
+    def store(self, kind, path, tokens, error=None, tokenizer=HEURISTIC_TOKENIZER):
+        stat = os.stat(path)
+        sha256 = sha256_file(path)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (kind, path, size, mtime_ns, sha256, tokens, error, counted_at, tokenizer) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, self._relative(path), stat.st_size, stat.st_mtime_ns, sha256, tokens, error, time.time(), tokenizer)
+            )
+
+    def prune(self, kind, folder, present_files):
+        """Drops the entries of files in folder that are not in present_files (names) any more."""
+        prefix = self._relative(folder)
+        keep = {os.path.join(prefix, name) for name in present_files}
+        with self._lock, self.conn:
+            stale = [
+                (kind, path) for (path,) in self.conn.execute("SELECT path FROM files WHERE kind = ?", (kind,))
+                if os.path.dirname(path) == prefix and path not in keep
+            ]
+            self.conn.executemany("DELETE FROM files WHERE kind = ? AND path = ?", stale)
+
+    def totals(self):
+        """Returns {kind: (cached tokens, number of files)}."""
+        with self._lock:
+            rows = self.conn.execute("SELECT kind, SUM(tokens), COUNT(*) FROM files GROUP BY kind").fetchall()
+        return {kind: (tokens, files) for kind, tokens, files in rows}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def cached_token_totals(subproject_folder):
+    """Returns {kind: (tokens, files)} from the subproject's token cache without creating one."""
+    if not os.path.exists(os.path.join(subproject_folder, TOKENS_FOLDER, TOKEN_CACHE_FILE)):
+        return {}
+    with TokenCache(subproject_folder) as cache:
+        return cache.totals()
@@ -0,0 +1,71 @@
+import os
+import re
+import threading
+from helper_functions.pdf_store import sha256_file
+
+# Characters per token the heuristic estimate assumes
+CHARS_PER_TOKEN = 4
+
+# Name the heuristic counts are cached under; changed whenever its counting changes, so old counts are redone
+HEURISTIC_TOKENIZER = 'chars/4'
+
+# Texts given to the tokenizer in one call; encode_batch spreads a batch over the tokenizer's threads
+TOKENIZER_BATCH_SIZE = 256
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Loaded tokenizer files, one per file and process
+_token_counters = {}
+_token_counters_lock = threading.Lock()
+
+class HeuristicTokenCounter:
+    """Estimates tokens as characters / 4, counting a run of whitespace as one character."""
+
+    name = HEURISTIC_TOKENIZER
+
+    def count(self, text):
+        return len(WHITESPACE_PATTERN.sub(' ', text).strip()) // CHARS_PER_TOKEN
+
+    def count_batch(self, texts):
+        return [self.count(text) for text in texts]
+
+class TokenizerFileCounter:
+    """Counts tokens exactly with a Hugging Face tokenizer file (the tokenizer.json of the model budgeted for).
+
+    Texts are encoded batch_size at a time with encode_batch, which runs on the tokenizer's
+    own thread pool. Special tokens, truncation and padding are left out, so the count is that
+    of the text alone. Needs the tokenizers package, which is only imported here.
+    """
+
+    def __init__(self, tokenizer_path, batch_size=TOKENIZER_BATCH_SIZE):
+        from tokenizers import Tokenizer
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+        self.batch_size = batch_size
+        # Includes the file's hash, so counts cached with another version of the tokenizer are redone
+        self.name = f"{os.path.basename(tokenizer_path)}:{sha256_file(tokenizer_path)[:12]}"
+
+    def count(self, text):
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts):
+        counts = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size], add_special_tokens=False)
+            counts.extend(len(encoding.ids) for encoding in encodings)
+        return counts
+
+def get_token_counter(tokenizer_path=None):
+    """Returns the counter for tokenizer_path, or the characters / 4 heuristic if it is None.
+
+    A tokenizer file is loaded once per process.
+    """
+    if not tokenizer_path:
+        return HeuristicTokenCounter()
+    # Keyed by pid so a forked worker loads its own copy
+    key = (os.path.abspath(tokenizer_path), os.getpid())
+    with _token_counters_lock:
+        if key not in _token_counters:
+            _token_counters[key] = TokenizerFileCounter(tokenizer_path)
+        return _token_counters[key]
@@ -1,83 +1,520 @@
 import os
+import csv
 import fitz 
 from tqdm import tqdm
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from warcio.archiveiterator import ArchiveIterator
+from helper_functions.warc_writer import is_warc_file
+from helper_functions.pdf_store import unique_pdf_files
 from bs4 import BeautifulSoup
-from langdetect import detect
+import lxml.html
+import lxml.etree
+from helper_functions.lang_id import LanguageCache, LANGUAGE_CACHE_FILE, LANGUAGE_ID_VERSION, detect_language
+from helper_functions.token_cache import PDF_KIND, WARC_KIND
+from helper_functions.token_counter import HeuristicTokenCounter, get_token_counter, TOKENIZER_BATCH_SIZE
+from helper_functions.token_sampling import stratified_sample, SAMPLE_TARGET_MARGIN, SAMPLE_CONFIDENCE, SAMPLE_TIME_LIMIT
+from helper_functions.cdx_index import CDXIndex
 import re
 import os
 import time
+import hashlib
 
-def count_tokens_in_pdf(pdf_path):
+# Files larger than this are opened up front and split into page ranges, so one huge PDF is spread over the pool
+LARGE_PDF_SIZE = 20 * 1024 * 1024
+
+# Pages one task extracts from a large PDF
+PAGES_PER_TASK = 100
+
+def pdf_page_texts(pdf_path, start_page=0, end_page=None):
+    """Returns the text of each page from start_page up to end_page (default: the last page)."""
+    pdf_document = fitz.open(pdf_path)
     try:
-        pdf_document = fitz.open(pdf_path)
-        total_characters = 0
-        
-        for page_num in range(len(pdf_document)):
-            page = pdf_document.load_page(page_num)
-            text = page.get_text()
-            total_characters += len(text) 
-        
+        return [
+            pdf_document.load_page(page_num).get_text()
+            for page_num in range(start_page, len(pdf_document) if end_page is None else min(end_page, len(pdf_document)))
+        ]
+    finally:
         pdf_document.close()
-        
-        tokens = total_characters / 4
-        return total_characters, tokens
+
+def count_tokens_in_pdf(pdf_path, start_page=0, end_page=None, tokenizer_path=None):
+    """Returns (characters, tokens) of the text on pages start_page up to end_page (default: the last page).
+
+    The pages are counted as one batch with the tokenizer file at tokenizer_path, or with the
+    characters / 4 estimate if it is None.
+    """
+    texts = pdf_page_texts(pdf_path, start_page, end_page)
+    total_characters = sum(len(text) for text in texts)
+    tokens = sum(get_token_counter(tokenizer_path).count_batch(texts))
+    return total_characters, tokens
+
+def _pdf_tasks(folder_path, pdf_files, pages_per_task=PAGES_PER_TASK, tokenizer_path=None):
+    """Returns (file name, path, start page, end page, tokenizer path) tasks: one per file, or one per page range of a large file."""
+    tasks = []
+    for pdf_file in pdf_files:
+        file_path = os.path.join(folder_path, pdf_file)
+        page_count = None
+        if os.path.getsize(file_path) > LARGE_PDF_SIZE:
+            try:
+                with fitz.open(file_path) as pdf_document:
+                    page_count = len(pdf_document)
+            except Exception:
+                pass  # Counted as one task; the error is reported when it runs
+        if page_count and page_count > pages_per_task:
+            tasks.extend((pdf_file, file_path, start, start + pages_per_task, tokenizer_path) for start in range(0, page_count, pages_per_task))
+        else:
+            tasks.append((pdf_file, file_path, 0, None, tokenizer_path))
+    return tasks
+
+def _run_pdf_task(task):
+    """Process pool entry point: returns (file name, tokens, error message or None)."""
+    pdf_file, file_path, start_page, end_page, tokenizer_path = task
+    try:
+        _, tokens = count_tokens_in_pdf(file_path, start_page, end_page, tokenizer_path)
+        return pdf_file, tokens, None
     except Exception as e:
-        raise e
+        pages = f" (pages {start_page + 1}-{end_page})" if end_page else ""
+        return pdf_file, 0, f"{type(e).__name__}: {e}{pages}"
 
-def estimate_tokens_in_pdf(folder_path):
-    total_tokens = 0
-    error_count = 0
-    pdf_files = [f for f in os.listdir(folder_path) if f.endswith('.pdf')]
+# Function to count the tokens of every PDF in a folder, spread over a pool of worker processes
+def estimate_pdf_tokens(folder_path, workers=None, pages_per_task=PAGES_PER_TASK, progress_callback=None, error_report_path=None,
+                        cache=None, tokenizer_path=None):
+    """Counts the tokens of the PDFs in folder_path with workers processes (default: one per CPU).
+
+    Returns a dict with total_tokens, files (number of PDFs), cached (how many were taken from
+    cache), tokens per file and errors per file; a file with an error on any of its pages counts
+    as 0 tokens. The errors are also written to error_report_path as CSV, if given.
+    progress_callback, if given, is called with (done, total) tasks as they finish. With a
+    TokenCache only new or changed files are read. Tokens are counted with the tokenizer file at
+    tokenizer_path, loaded once in each worker, or with the characters / 4 estimate if it is None.
+    """
+    # The same document downloaded under several names is counted once
+    pdf_files = unique_pdf_files(folder_path)
     logging.info(f"Found {len(pdf_files)} PDF files")
+    tokenizer = get_token_counter(tokenizer_path).name
 
-    for pdf_file in tqdm(pdf_files, desc="Processing PDFs", leave=True):
-        file_path = os.path.join(folder_path, pdf_file)
-        try:
-            _, token_count = count_tokens_in_pdf(file_path)
-            total_tokens += token_count
-        except Exception:
-            error_count += 1
+    file_tokens = {pdf_file: 0 for pdf_file in pdf_files}
+    errors = {}
+    cached_files = set()
+    if cache:
+        cache.prune(PDF_KIND, folder_path, pdf_files)
+        for pdf_file in pdf_files:
+            cached = cache.lookup(PDF_KIND, os.path.join(folder_path, pdf_file), tokenizer)
+            if cached:
+                tokens, error = cached
+                file_tokens[pdf_file] = int(tokens)
+                if error:
+                    errors[pdf_file] = [error]
+                cached_files.add(pdf_file)
+        logging.info(f"Token cache: {len(cached_files)} of {len(pdf_files)} PDF files unchanged")
+
+    tasks = _pdf_tasks(folder_path, [pdf_file for pdf_file in pdf_files if pdf_file not in cached_files], pages_per_task, tokenizer_path)
+    workers = workers or os.cpu_count() or 1
+
+    def collect(done, result):
+        pdf_file, tokens, error = result
+        if error:
+            errors.setdefault(pdf_file, []).append(error)
+        file_tokens[pdf_file] += tokens
+        progress.update(1)
+        if progress_callback:
+            progress_callback(done, len(tasks))
+
+    with tqdm(total=len(tasks), desc="Processing PDFs", leave=True) as progress:
+        if workers == 1:
+            for done, task in enumerate(tasks, start=1):
+                collect(done, _run_pdf_task(task))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_run_pdf_task, task) for task in tasks]
+                for done, future in enumerate(as_completed(futures), start=1):
+                    collect(done, future.result())
+
+    errors = {pdf_file: '; '.join(messages) for pdf_file, messages in errors.items()}
+    for pdf_file, error in errors.items():
+        file_tokens[pdf_file] = 0
+        logging.error(f"Could not count tokens in {pdf_file}: {error}")
+    if cache:
+        for pdf_file in pdf_files:
+            if pdf_file not in cached_files:
+                cache.store(PDF_KIND, os.path.join(folder_path, pdf_file), file_tokens[pdf_file], errors.get(pdf_file), tokenizer)
+    if error_report_path:
+        with open(error_report_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['file', 'error'])
+            writer.writerows(sorted(errors.items()))
+    return {
+        'total_tokens': sum(file_tokens.values()),
+        'files': len(pdf_files),
+        'cached': len(cached_files),
+        'file_tokens': file_tokens,
+        'errors': errors,
+    }
+
+def estimate_tokens_in_pdf(folder_path, workers=None, cache=None, tokenizer_path=None):
+    result = estimate_pdf_tokens(folder_path, workers=workers, cache=cache, tokenizer_path=tokenizer_path)
+    return result['total_tokens'], result['files']
 
-    return total_tokens, len(pdf_files)
 
+# Most of a body that is read for its text; the rest of oversized pages is skipped
+MAX_TEXT_BODY_BYTES = 5 * 1024 * 1024
 
-def count_tokens(text):
-    cleaned_text = re.sub(r'\s+', '', text)
-    token_count = len(cleaned_text) // 4
-    return token_count
+# Content types whose bodies are read for text
+TEXT_CONTENT_TYPES = ('html', 'xml', 'text/')
+
+CHARSET_PATTERN = re.compile(r'charset=([^\s;]+)', re.I)
+
+def count_tokens(text, counter=None):
+    """Returns the tokens in text, by default with the characters / 4 estimate."""
+    return (counter or HeuristicTokenCounter()).count(text)
 
 def extract_text_from_html(html_content):
     soup = BeautifulSoup(html_content, 'html.parser')
     text = soup.get_text(separator=' ')
     return text
 
-def estimate_tokens_in_warc(output_folder):
+def html_text_and_lang(body, charset='utf-8'):
+    """Returns (visible text, <html lang> attribute or None) of an HTML body (bytes), parsed with lxml.
+
+    Script and style content is dropped.
+    """
+    if not body.strip():
+        return '', None
+    try:
+        parser = lxml.html.HTMLParser(encoding=charset, remove_comments=True, remove_pis=True)
+    except LookupError:
+        parser = lxml.html.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+    try:
+        document = lxml.html.document_fromstring(body, parser=parser)
+    except (lxml.etree.ParserError, ValueError):
+        return '', None
+    lxml.etree.strip_elements(document, 'script', 'style', 'noscript', 'template', with_tail=False)
+    return ' '.join(document.itertext()), document.get('lang') or document.get('xml:lang')
+
+def html_to_text(body, charset='utf-8'):
+    """Returns the visible text of an HTML body (bytes), parsed with lxml; script and style content is dropped."""
+    return html_text_and_lang(body, charset)[0]
+
+def record_content_type(record):
+    """Returns the Content-Type of a WARC record's payload: the HTTP header, or the WARC header for conversion records."""
+    if record.http_headers:
+        return record.http_headers.get_header('Content-Type') or ''
+    return record.rec_headers.get_header('Content-Type') or ''
+
+def charset_from_content_type(content_type):
+    match = CHARSET_PATTERN.search(content_type)
+    return match.group(1).strip('"\'') if match else 'utf-8'
+
+def record_text_details(record, max_bytes=MAX_TEXT_BODY_BYTES):
+    """Returns (text, <html lang> or None, payload digest) of a response or conversion record.
+
+    At most max_bytes of the body are read, decoded with the charset of its Content-Type (UTF-8 if
+    Python does not know it). Bodies that are not HTML, XML or plain text (images, PDFs and the
+    like) give no text. The digest is the record's WARC-Payload-Digest, or a SHA-1 of the bytes
+    read if it has none.
+    """
+    content_type = record_content_type(record).lower()
+    digest = record.rec_headers.get_header('WARC-Payload-Digest')
+    if content_type and not any(kind in content_type for kind in TEXT_CONTENT_TYPES):
+        return '', None, digest
+    body = record.content_stream().read(max_bytes)
+    digest = digest or f"sha1-read:{hashlib.sha1(body).hexdigest()}"
+    charset = charset_from_content_type(content_type)
+    if content_type.startswith('text/plain'):
+        # A charset Python does not know is read as UTF-8, as html_text_and_lang does
+        try:
+            return body.decode(charset, errors='ignore'), None, digest
+        except LookupError:
+            return body.decode('utf-8', errors='ignore'), None, digest
+    text, html_lang = html_text_and_lang(body, charset)
+    return text, html_lang, digest
+
+def record_text(record, max_bytes=MAX_TEXT_BODY_BYTES):
+    """Returns the text of a response or conversion record, reading at most max_bytes of its body."""
+    return record_text_details(record, max_bytes)[0]
+
+# Function to measure records per second of the BeautifulSoup and the lxml text extraction on the same records
+def benchmark_text_extraction(output_folder, max_records=500):
+    bodies = []
+    for warc_file in sorted(file for file in os.listdir(output_folder) if is_warc_file(file)):
+        with open(os.path.join(output_folder, warc_file), 'rb') as stream:
+            for record in ArchiveIterator(stream):
+                if record.rec_type in ('response', 'conversion'):
+                    content_type = record_content_type(record)
+                    bodies.append((content_type, record.content_stream().read()))
+                    if len(bodies) >= max_records:
+                        break
+        if len(bodies) >= max_records:
+            break
+
+    started = time.perf_counter()
+    for _, body in bodies:
+        extract_text_from_html(body.decode('utf-8', errors='ignore'))
+    soup_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for content_type, body in bodies:
+        html_to_text(body[:MAX_TEXT_BODY_BYTES], charset_from_content_type(content_type.lower()))
+    lxml_seconds = time.perf_counter() - started
+
+    result = {
+        'records': len(bodies),
+        'beautifulsoup_records_per_second': len(bodies) / soup_seconds if soup_seconds else 0.0,
+        'lxml_records_per_second': len(bodies) / lxml_seconds if lxml_seconds else 0.0,
+    }
+    logging.info(f"Text extraction benchmark: {result}")
+    return result
+
+# Documents of each file type a calibration report reads, and the pages read of each PDF
+CALIBRATION_DOCUMENTS = 100
+CALIBRATION_PDF_PAGES = 20
+
+def calibration_texts(pdf_folder=None, warc_folder=None, max_documents=CALIBRATION_DOCUMENTS):
+    """Returns (document, text) pairs: the first pages of up to max_documents PDFs spread over the folder,
+    and up to max_documents Indonesian WARC records, the ones estimate_tokens_in_warc counts.
+    """
+    documents = []
+    if pdf_folder and os.path.isdir(pdf_folder):
+        pdf_files = unique_pdf_files(pdf_folder)
+        for pdf_file in pdf_files[::max(1, len(pdf_files) // max_documents)][:max_documents]:
+            try:
+                text = '\n'.join(pdf_page_texts(os.path.join(pdf_folder, pdf_file), 0, CALIBRATION_PDF_PAGES))
+            except Exception as e:
+                logging.error(f"Could not read {pdf_file} for calibration: {e}")
+                continue
+            if text.strip():
+                documents.append((pdf_file, text))
+
+    if warc_folder and os.path.isdir(warc_folder):
+        warc_documents = []
+        for warc_file in sorted(file for file in os.listdir(warc_folder) if is_warc_file(file)):
+            with open(os.path.join(warc_folder, warc_file), 'rb') as stream:
+                for record in ArchiveIterator(stream):
+                    if record.rec_type in ('response', 'conversion'):
+                        text, html_lang, _ = record_text_details(record)
+                        if text.strip() and detect_language(text, html_lang) == 'id':
+                            warc_documents.append((f"{warc_file} {record.rec_headers.get_header('WARC-Target-URI')}", text))
+                            if len(warc_documents) >= max_documents:
+                                break
+            if len(warc_documents) >= max_documents:
+                break
+        documents.extend(warc_documents)
+    return documents
+
+# Function to measure how far the characters / 4 estimate is from a real tokenizer on the same texts
+def calibrate_tokenizer(tokenizer_path, pdf_folder=None, warc_folder=None, max_documents=CALIBRATION_DOCUMENTS, report_path=None):
+    """Counts sampled documents with the estimate and with the tokenizer file at tokenizer_path.
+
+    Returns a dict with documents, heuristic_tokens, tokenizer_tokens, total_error_percent (of
+    the estimated total against the tokenizer's), mean_abs_error_percent (over documents),
+    chars_per_token (what the estimate would have to divide by) and rows, one per document.
+    The rows are also written to report_path as CSV, if given.
+    """
+    documents = calibration_texts(pdf_folder, warc_folder, max_documents)
+    texts = [text for _, text in documents]
+    estimated = HeuristicTokenCounter().count_batch(texts)
+    counted = get_token_counter(tokenizer_path).count_batch(texts)
+
+    rows = []
+    for (document, text), estimate, actual in zip(documents, estimated, counted):
+        rows.append({
+            'document': document,
+            'characters': len(' '.join(text.split())),
+            'heuristic_tokens': estimate,
+            'tokenizer_tokens': actual,
+            'error_percent': round((estimate - actual) / actual * 100, 2) if actual else 0.0,
+        })
+
+    total_estimated, total_counted = sum(estimated), sum(counted)
+    result = {
+        'documents': len(rows),
+        'heuristic_tokens': total_estimated,
+        'tokenizer_tokens': total_counted,
+        'total_error_percent': (total_estimated - total_counted) / total_counted * 100 if total_counted else 0.0,
+        'mean_abs_error_percent': sum(abs(row['error_percent']) for row in rows) / len(rows) if rows else 0.0,
+        'chars_per_token': sum(row['characters'] for row in rows) / total_counted if total_counted else 0.0,
+        'rows': rows,
+    }
+    if report_path:
+        with open(report_path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['document', 'characters', 'heuristic_tokens', 'tokenizer_tokens', 'error_percent'])
+            writer.writeheader()
+            writer.writerows(rows)
+    logging.info(f"Tokenizer calibration on {len(rows)} documents: estimate {total_estimated}, tokenizer {total_counted} tokens, "
+                 f"{result['total_error_percent']:.1f}% off in total")
+    return result
+
+def record_language(record_details, language_cache):
+    """Returns the language of a record's (text, html lang, digest), from language_cache when it was detected before."""
+    text_content, html_lang, digest = record_details
+    language = language_cache.get(digest) if digest else None
+    if language is None:
+        language = detect_language(text_content, html_lang)
+        if digest:
+            language_cache.put(digest, language)
+    return language
+
+def count_tokens_in_warc_file(warc_file_path, language_cache, counter):
+    """Returns the tokens of the Indonesian response and conversion records of one WARC file.
+
+    A browser-rendered conversion record replaces the response it refers to. Texts are counted
+    in batches of TOKENIZER_BATCH_SIZE.
+    """
+    token_count = 0
+    last_response_id = None
+    # Texts not counted yet; the last one stays pending while it may be a response a conversion record replaces
+    pending_texts = []
+    last_is_response = False
+
+    with open(warc_file_path, 'rb') as stream:
+        for record in ArchiveIterator(stream):
+            if record.rec_type in ('response', 'conversion'):
+                record_details = record_text_details(record)
+                record_text_content = record_details[0] if record_language(record_details, language_cache) == 'id' else ''
+
+                if (record.rec_type == 'conversion' and last_is_response
+                        and record.rec_headers.get_header('WARC-Refers-To') == last_response_id):
+                    pending_texts[-1] = record_text_content
+                    last_is_response = False
+                    continue
+
+                if len(pending_texts) >= TOKENIZER_BATCH_SIZE:
+                    token_count += sum(counter.count_batch(pending_texts))
+                    pending_texts = []
+                pending_texts.append(record_text_content)
+                last_is_response = record.rec_type == 'response'
+                if last_is_response:
+                    last_response_id = record.rec_headers.get_header('WARC-Record-ID')
+
+    return token_count + sum(counter.count_batch(pending_texts))
+
+def warc_cache_tokenizer(counter):
+    """Name WARC counts are cached under: the counter's, with the language detection version and body limit.
+
+    Both change which text of a WARC file is counted, so counts made with other values are redone.
+    """
+    return f"{counter.name};lang-v{LANGUAGE_ID_VERSION};body-{MAX_TEXT_BODY_BYTES}"
+
+# Languages are cached by payload digest in languages.sqlite in the folder, so estimating again skips detection
+# With a TokenCache, WARC files unchanged since they were last counted are not read again
+# Texts are counted with the tokenizer file at tokenizer_path, or with characters / 4
+def estimate_tokens_in_warc(output_folder, cache=None, tokenizer_path=None):
     total_token_count = 0
+    language_cache = LanguageCache(os.path.join(output_folder, LANGUAGE_CACHE_FILE))
+    counter = get_token_counter(tokenizer_path)
+    cache_tokenizer = warc_cache_tokenizer(counter)
 
-    warc_files = [file for file in os.listdir(output_folder) if file.endswith('.warc')]
+    warc_files = [file for file in os.listdir(output_folder) if is_warc_file(file)]
     logging.info(f'Found {len(warc_files)} WARC files')
+    if cache:
+        cache.prune(WARC_KIND, output_folder, warc_files)
 
     for processed_files, warc_file in enumerate(warc_files, start=1):
         warc_file_path = os.path.join(output_folder, warc_file)
 
-        with open(warc_file_path, 'rb') as stream:
-            for record in ArchiveIterator(stream):
-                if record.rec_type == 'response':
-                    content = record.content_stream().read().decode('utf-8', errors='ignore')
+        cached = cache.lookup(WARC_KIND, warc_file_path, cache_tokenizer) if cache else None
+        if cached:
+            total_token_count += int(cached[0])
+            logging.info(f'Processed {processed_files}/{len(warc_files)} files. Token count in {warc_file}: {int(cached[0])} (cached)')
+            continue
 
-                    text_content = extract_text_from_html(content)
+        token_count = count_tokens_in_warc_file(warc_file_path, language_cache, counter)
+        total_token_count += token_count
+        language_cache.commit()
+        if cache:
+            cache.store(WARC_KIND, warc_file_path, token_count, tokenizer=cache_tokenizer)
+        logging.info(f'Processed {processed_files}/{len(warc_files)} files. Token count in {warc_file}: {token_count}')
 
-                    try:
-                        language = detect(text_content)
-                    except:
-                        language = 'unknown'
+    language_cache.close()
+    return total_token_count, len(warc_files)
 
-                    if language == 'id':
-                        token_count = count_tokens(text_content)
-                        total_token_count += token_count
+# Function to estimate the tokens of a folder of PDFs from a sample of its files, with a confidence interval
+def sample_pdf_tokens(folder_path, target_margin=SAMPLE_TARGET_MARGIN, confidence=SAMPLE_CONFIDENCE, time_limit=SAMPLE_TIME_LIMIT,
+                      workers=None, tokenizer_path=None, seed=None, progress_callback=None):
+    """Estimates the tokens of the PDFs in folder_path by counting a stratified random sample of them.
 
-        logging.info(f'Processed {processed_files}/{len(warc_files)} files. Token count in {warc_file}: {token_count}')
+    Files are stratified by size and each round of the sample is counted on workers processes.
+    Returns the dict of stratified_sample, with files and errors (sampled files that could not
+    be read, counted as 0 tokens) added.
+    """
+    pdf_files = unique_pdf_files(folder_path)
+    units = [(pdf_file, os.path.getsize(os.path.join(folder_path, pdf_file))) for pdf_file in pdf_files]
+    errors = {}
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        def measure(batch):
+            tasks = [(pdf_file, os.path.join(folder_path, pdf_file), 0, None, tokenizer_path) for pdf_file in batch]
+            tokens = []
+            for pdf_file, file_tokens, error in executor.map(_run_pdf_task, tasks):
+                if error:
+                    errors[pdf_file] = error
+                tokens.append(0 if error else file_tokens)
+            return tokens
+
+        result = stratified_sample(units, measure, target_margin, confidence, time_limit, seed, progress_callback)
+
+    result['files'] = len(pdf_files)
+    result['errors'] = errors
+    logging.info(f"Sampled {result['sampled']} of {len(pdf_files)} PDF files: about {result['estimate']:.0f} tokens "
+                 f"(± {result['margin']:.0f}, stopped on {result['stopped']})")
+    return result
+
+# Function to estimate the tokens of a folder of WARCs from a sample of its records (or files, without a CDX index)
+def sample_warc_tokens(output_folder, target_margin=SAMPLE_TARGET_MARGIN, confidence=SAMPLE_CONFIDENCE, time_limit=SAMPLE_TIME_LIMIT,
+                       tokenizer_path=None, seed=None, progress_callback=None):
+    """Estimates the tokens of the WARC files in output_folder by counting a stratified random sample.
+
+    Files in the CDX index (index.cdxj) are sampled by their text response records, stratified
+    by length and each read with one seek; conversion records are not indexed, so pages rendered
+    in a browser count with their raw response. Files the index does not cover are sampled whole,
+    by size, alongside them. Returns the dict of stratified_sample, with files and unit ('record',
+    'file' or 'record and file') added.
+    """
+    warc_files = [file for file in os.listdir(output_folder) if is_warc_file(file)]
+    language_cache = LanguageCache(os.path.join(output_folder, LANGUAGE_CACHE_FILE))
+    counter = get_token_counter(tokenizer_path)
+    cdx_index = CDXIndex(output_folder)
+    indexed_files, entries = set(), []
+    for entry in cdx_index.entries():
+        indexed_files.add(entry['filename'])
+        if (entry.get('mime') != 'warc/revisit' and entry['filename'] in warc_files
+                and any(kind in entry.get('mime', 'text/html') for kind in TEXT_CONTENT_TYPES)):
+            entries.append(entry)
+    # A file missing from the index (written before it, or not compacted into it) would otherwise not be counted at all
+    unindexed_files = [warc_file for warc_file in warc_files if warc_file not in indexed_files]
+
+    units = [(('record', entry), entry['length']) for entry in entries]
+    units += [(('file', warc_file), os.path.getsize(os.path.join(output_folder, warc_file))) for warc_file in unindexed_files]
+    if not unindexed_files:
+        unit = 'record'
+    elif len(unindexed_files) == len(warc_files):
+        unit = 'file'
+    else:
+        unit = 'record and file'
+
+    def measure(batch):
+        # Records are counted together in one batch, files one at a time
+        tokens = [count_tokens_in_warc_file(os.path.join(output_folder, target), language_cache, counter) if kind == 'file' else None
+                  for kind, target in batch]
+        texts = []
+        for kind, entry in batch:
+            if kind == 'record':
+                with cdx_index.open_record(entry) as record:
+                    record_details = record_text_details(record)
+                texts.append(record_details[0] if record_language(record_details, language_cache) == 'id' else '')
+        record_tokens = iter(counter.count_batch(texts))
+        language_cache.commit()
+        return [next(record_tokens) if unit_tokens is None else unit_tokens for unit_tokens in tokens]
+
+    try:
+        # A whole file and a single record do not have the same bytes per token, so the two are stratified apart
+        result = stratified_sample(units, measure, target_margin, confidence, time_limit, seed, progress_callback,
+                                   group=lambda unit: unit[0])
+    finally:
+        language_cache.close()
 
-    return total_token_count, len(warc_files)
\ No newline at end of file
+    result['files'] = len(warc_files)
+    result['unit'] = unit
+    logging.info(f"Sampled {result['sampled']} {unit} units of {len(warc_files)} WARC files: about {result['estimate']:.0f} tokens "
+                 f"(± {result['margin']:.0f}, stopped on {result['stopped']})")
+    return result
@@ -0,0 +1,131 @@
+import math
+import time
+import random
+from statistics import NormalDist
+
+# Sampling stops once the confidence interval is within this share of the estimate either way
+SAMPLE_TARGET_MARGIN = 0.05
+SAMPLE_CONFIDENCE = 0.95
+
+# Seconds after which sampling stops with whatever interval it has
+SAMPLE_TIME_LIMIT = 60
+
+# Size strata the units are split into, and units drawn per round
+SAMPLE_STRATA = 5
+SAMPLE_ROUND_SIZE = 32
+
+# Units sampled from each stratum before the first estimate; with fewer, the interval is too often too narrow
+SAMPLE_MIN_PER_STRATUM = 10
+
+def size_strata(units, strata=SAMPLE_STRATA):
+    """Splits (unit, size) pairs into at most strata groups of neighbouring sizes holding about the same number of bytes."""
+    units = sorted(units, key=lambda unit: unit[1])
+    total_size = sum(size for _, size in units) or 1
+    groups, current, current_size = [], [], 0
+    for unit in units:
+        current.append(unit)
+        current_size += unit[1]
+        if current_size >= total_size * (len(groups) + 1) / strata and len(groups) < strata - 1:
+            groups.append(current)
+            current = []
+    if current:
+        groups.append(current)
+    return groups
+
+def _stratum_estimate(stratum, sample):
+    """Returns (total, variance) of a stratum estimated from its sampled (size, tokens) pairs.
+
+    Tokens are estimated per byte (a ratio estimator), since they grow with size; the variance
+    comes from how far the sampled units are off that ratio, with the finite population correction.
+    """
+    count, sampled = len(stratum), len(sample)
+    stratum_size = sum(size for _, size in stratum)
+    sample_size = sum(size for size, _ in sample)
+    ratio = sum(tokens for _, tokens in sample) / sample_size if sample_size else 0.0
+    total = ratio * stratum_size
+    if sampled < 2 or sampled >= count:
+        return total, 0.0
+    mean_size = stratum_size / count
+    residuals = [tokens - ratio * size for size, tokens in sample]
+    spread = sum(residual * residual for residual in residuals) / (sampled - 1)
+    variance = count * count * (1 - sampled / count) * spread / sampled
+    # Scaled by the stratum's mean size over the sample's, for samples of smaller or larger units than average
+    variance *= (mean_size * sampled / sample_size) ** 2 if sample_size else 1
+    return total, variance
+
+def stratified_sample(units, measure, target_margin=SAMPLE_TARGET_MARGIN, confidence=SAMPLE_CONFIDENCE,
+                      time_limit=SAMPLE_TIME_LIMIT, seed=None, progress_callback=None, group=None):
+    """Estimates the total tokens of units ((unit, size) pairs) from a stratified random sample.
+
+    measure is called with a list of units and returns their tokens in the same order. Units
+    are drawn in rounds, each spread over the size strata by how uncertain their estimate still
+    is (Neyman allocation), until the confidence interval is within target_margin of the
+    estimate, time_limit seconds have passed or every unit is measured. progress_callback, if
+    given, is called with (estimate, margin, sampled units) after every round. group, if given,
+    is called with a unit and units it returns different values for are never put in one stratum,
+    for units whose tokens grow with size at different rates.
+
+    Returns a dict with estimate, low and high (the interval), margin, confidence, units,
+    sampled, sampled_size, total_size, strata and stopped ('margin', 'time' or 'exhausted').
+    """
+    rng = random.Random(seed)
+    started = time.monotonic()
+    groups = {}
+    for unit in units:
+        groups.setdefault(group(unit[0]) if group else None, []).append(unit)
+    strata = [stratum for grouped in groups.values() for stratum in size_strata(grouped)]
+    # Each stratum is taken in a random order, so its first n units are a simple random sample
+    orders = [rng.sample(stratum, len(stratum)) for stratum in strata]
+    samples = [[] for _ in strata]
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    def draw(allocation):
+        batch = []
+        for index, count in enumerate(allocation):
+            start = len(samples[index])
+            batch.extend((index, unit) for unit in orders[index][start:start + count])
+        tokens = measure([unit for _, (unit, _) in batch])
+        for (index, (_, size)), unit_tokens in zip(batch, tokens):
+            samples[index].append((size, unit_tokens))
+
+    draw([min(SAMPLE_MIN_PER_STRATUM, len(stratum)) for stratum in strata])
+    while True:
+        estimates = [_stratum_estimate(stratum, sample) for stratum, sample in zip(strata, samples)]
+        estimate = sum(total for total, _ in estimates)
+        margin = z * math.sqrt(sum(variance for _, variance in estimates))
+        sampled = sum(len(sample) for sample in samples)
+        if progress_callback:
+            progress_callback(estimate, margin, sampled)
+
+        remaining = [len(stratum) - len(sample) for stratum, sample in zip(strata, samples)]
+        if not any(remaining):
+            stopped = 'exhausted'
+        # Every stratum has its minimum sample by now, so a zero-width interval (units that are all
+        # alike, e.g. all without text) is as converged as a narrow one
+        elif margin <= target_margin * estimate:
+            stopped = 'margin'
+        elif time.monotonic() - started >= time_limit:
+            stopped = 'time'
+        else:
+            # While no stratum shows any spread, the round is shared by the units each has left
+            weights = [math.sqrt(variance) if left else 0.0 for (_, variance), left in zip(estimates, remaining)]
+            if not any(weights):
+                weights = [float(left) for left in remaining]
+            allocation = [min(left, math.ceil(SAMPLE_ROUND_SIZE * weight / sum(weights))) for weight, left in zip(weights, remaining)]
+            draw(allocation)
+            continue
+        break
+
+    return {
+        'estimate': estimate,
+        'low': max(0.0, estimate - margin),
+        'high': estimate + margin,
+        'margin': margin,
+        'confidence': confidence,
+        'units': len(units),
+        'sampled': sampled,
+        'sampled_size': sum(size for sample in samples for size, _ in sample),
+        'total_size': sum(size for _, size in units),
+        'strata': len(strata),
+        'stopped': stopped,
+    }
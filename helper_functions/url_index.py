@@ -0,0 +1,287 @@
+import os
+import math
+import struct
+import sqlite3
+import hashlib
+import logging
+import posixpath
+import threading
+from helper_functions.frontier import DONE
+from urllib.parse import urlsplit, parse_qsl, urlencode, quote, unquote
+
+# Folder inside the output root holding the seen-URL index shared by all projects
+URL_INDEX_FOLDER = '.url-index'
+
+# What a URL was seen as; each scraper keeps its own set in the index
+LINKS = 'links'
+PDFS = 'pdfs'
+WARCS = 'warcs'
+
+# Query parameters that only track where a visitor came from and never change the page
+TRACKING_PARAMS = {'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', 'ref_src'}
+TRACKING_PREFIXES = ('utm_',)
+
+# Ports that are implied by the scheme
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+# Starting size and false positive rate of the Bloom filter; it is rebuilt twice as large once full
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.01
+
+# Header of the Bloom filter file: magic, bit count, hash count, capacity, entries it holds
+BLOOM_HEADER = struct.Struct('<8sQIQQ')
+BLOOM_MAGIC = b'EZBLOOM1'
+
+# Hashes looked up in one SQLite query
+LOOKUP_BATCH_SIZE = 500
+
+# Open indexes, one per folder and process
+_seen_indexes = {}
+_seen_indexes_lock = threading.Lock()
+
+def canonical_key(url):
+    """Returns the form of url used to decide whether two URLs are the same page.
+
+    The scheme (http and https count as one), a leading www., default ports, the fragment,
+    tracking parameters, the order of query parameters, dot segments, trailing slashes and
+    differences in percent-encoding are all dropped. Non-HTTP URLs are returned stripped only.
+    """
+    url = url.strip()
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        return url
+
+    host = (parts.hostname or '').rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and str(port) not in DEFAULT_PORTS.values():
+        host = f"{host}:{port}"
+
+    path = quote(unquote(parts.path), safe="/:@!$&'()*+,;=~")
+    # normpath resolves dot segments and drops the trailing slash
+    path = '/' + posixpath.normpath(path).lstrip('/') if path else '/'
+
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(query))
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+def url_hash(url, kind):
+    """Returns the signed 64-bit hash the index stores for url seen as kind."""
+    digest = hashlib.blake2b(f"{kind} {canonical_key(url)}".encode('utf-8'), digest_size=8).digest()
+    return struct.unpack('<q', digest)[0]
+
+class BloomFilter:
+    """Bit array answering "maybe seen" or "certainly not seen" for 64-bit hashes.
+
+    The probe positions come from the two 32-bit halves of the hash (double hashing), so the
+    filter can be rebuilt from the stored hashes alone.
+    """
+
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        value &= 0xFFFFFFFFFFFFFFFF
+        first, second = value & 0xFFFFFFFF, (value >> 32) | 1
+        return ((first + i * second) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def save(self, path):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.num_bits, self.num_hashes, self.capacity, self.count))
+            f.write(self.bits)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns the filter saved at path, or None if the file is missing or unreadable."""
+        try:
+            with open(path, 'rb') as f:
+                magic, num_bits, num_hashes, capacity, count = BLOOM_HEADER.unpack(f.read(BLOOM_HEADER.size))
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if magic != BLOOM_MAGIC or len(bits) != (num_bits + 7) // 8:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.num_bits, bloom.num_hashes, bloom.count, bloom.bits = capacity, num_bits, num_hashes, count, bits
+        return bloom
+
+class SeenIndex:
+    """Persistent set of every URL the scrapers have handled, across all projects.
+
+    URLs are stored as 64-bit hashes of their canonical_key in SQLite (the hash is the rowid,
+    so an entry costs a few bytes) with a Bloom filter in front of it: most new URLs are
+    answered by the filter without touching the database. The filter is saved next to the
+    database and rebuilt from it when it is missing, out of date or full. Safe to share
+    between threads.
+    """
+
+    def __init__(self, index_folder):
+        self.index_folder = index_folder
+        os.makedirs(index_folder, exist_ok=True)
+        self.bloom_path = os.path.join(index_folder, 'bloom.bin')
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(index_folder, 'seen.sqlite'), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS seen (hash INTEGER PRIMARY KEY)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self.count = self._stored_count()
+
+        self.bloom = BloomFilter.load(self.bloom_path)
+        if self.bloom is None or self.bloom.count != self.count:
+            self._rebuild_bloom(max(BLOOM_CAPACITY, self.count * 2))
+        self._dirty = False
+
+    def _stored_count(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'count'").fetchone()
+        return row[0] if row else 0
+
+    def _rebuild_bloom(self, capacity):
+        logging.info(f"Rebuilding the seen-URL Bloom filter for {self.count} URLs")
+        bloom = BloomFilter(capacity)
+        for (value,) in self.conn.execute("SELECT hash FROM seen"):
+            bloom.add(value)
+        self.bloom = bloom
+        self.bloom.save(self.bloom_path)
+
+    def _stored(self, hashes):
+        """Returns which of hashes are in the database."""
+        found = set()
+        for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+            batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+            query = f"SELECT hash FROM seen WHERE hash IN ({','.join('?' * len(batch))})"
+            found.update(row[0] for row in self.conn.execute(query, batch))
+        return found
+
+    def contains(self, url, kind):
+        value = url_hash(url, kind)
+        with self._lock:
+            if value not in self.bloom:
+                return False
+            return bool(self._stored([value]))
+
+    def filter_new(self, urls, kind):
+        """Returns the URLs not seen as kind yet, keeping the first of several that share a canonical key."""
+        hashed = {}
+        for url in urls:
+            hashed.setdefault(url_hash(url, kind), url)
+        with self._lock:
+            maybe_seen = [value for value in hashed if value in self.bloom]
+            seen = self._stored(maybe_seen)
+        return [url for value, url in hashed.items() if value not in seen]
+
+    def add_new(self, urls, kind):
+        """Records urls as seen as kind and returns the ones that were new, in one step.
+
+        Whether a URL is new is decided by its own insert, so when several callers add the same
+        URL at once (threads or processes) exactly one of them gets it back. Of several URLs
+        sharing a canonical key only the first can be returned.
+        """
+        hashed = {}
+        for url in urls:
+            hashed.setdefault(url_hash(url, kind), url)
+        with self._lock:
+            with self.conn:
+                # Sorted so the inserts walk the B-tree in order
+                new_values = [
+                    value for value in sorted(hashed)
+                    if self.conn.execute("INSERT OR IGNORE INTO seen (hash) VALUES (?)", (value,)).rowcount
+                ]
+                # Re-read the count inside the transaction, other processes may have added URLs too
+                self.count = self._stored_count() + len(new_values)
+                # URLs added elsewhere are missing from this filter; its count then stays behind, so the next open rebuilds it
+                bloom_count = self.bloom.count + len(new_values)
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('count', ?)", (self.count,))
+            if self.count > self.bloom.capacity:
+                self._rebuild_bloom(self.count * 2)
+            else:
+                for value in new_values:
+                    self.bloom.add(value)
+                self.bloom.count = bloom_count
+                self._dirty = True
+        new_values = set(new_values)
+        return [url for value, url in hashed.items() if value in new_values]
+
+    def add(self, urls, kind):
+        """Records urls as seen as kind and returns how many of them were new."""
+        return len(self.add_new(urls, kind))
+
+    def flush(self):
+        """Saves the Bloom filter if URLs were added since it was last saved."""
+        with self._lock:
+            if self._dirty:
+                self.bloom.save(self.bloom_path)
+                self._dirty = False
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self.conn.close()
+
+def dedupe_urls(urls):
+    """Returns urls without the ones whose canonical_key an earlier URL in the list already has."""
+    seen = set()
+    unique = []
+    for url in urls:
+        key = canonical_key(url)
+        if key not in seen:
+            seen.add(key)
+            unique.append(url)
+    return unique
+
+def skip_seen_links(frontier, link_list, seen_index, kind):
+    """Returns the links of link_list not handled as kind by any project yet.
+
+    The others are marked done in the frontier, since another project already has them.
+    """
+    new_links = set(seen_index.filter_new(link_list, kind))
+    skipped = [link for link in link_list if link not in new_links]
+    for link in skipped:
+        frontier.mark_done(link)
+    if skipped:
+        logging.info(f"Seen-URL index: skipping {len(skipped)} of {len(link_list)} links handled in another project")
+    return [link for link in link_list if link in new_links]
+
+def record_done_links(frontier, link_list, seen_index, kind):
+    """Adds the links of link_list the frontier has marked done to the seen-URL index."""
+    seen_index.add(frontier.select(link_list, DONE), kind)
+    seen_index.flush()
+
+def get_seen_index(output_root):
+    """Returns the shared SeenIndex under output_root in the current process."""
+    # Keyed by pid so a forked worker opens its own connection
+    key = (os.path.abspath(output_root), os.getpid())
+    with _seen_indexes_lock:
+        if key not in _seen_indexes:
+            _seen_indexes[key] = SeenIndex(os.path.join(output_root, URL_INDEX_FOLDER))
+        return _seen_indexes[key]
+
+def close_seen_indexes():
+    with _seen_indexes_lock:
+        for key, index in list(_seen_indexes.items()):
+            if key[1] == os.getpid():
+                index.close()
+                del _seen_indexes[key]
@@ -1,92 +1,439 @@
 import os
-import csv
+import re
 import time
+import zlib
+import functools
+import itertools
+import asyncio
+import threading
 import requests
 import socket
 from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from warcio.warcwriter import WARCWriter
+from warcio.recordbuilder import RecordBuilder
 from warcio.statusandheaders import StatusAndHeaders
 import logging
 import urllib3
+from helper_functions.browser_pool import BrowserPool
+from helper_functions.warc_writer import DEFAULT_MAX_WARC_SIZE, get_rolling_writer, close_rolling_writers
+from helper_functions.frontier import Frontier, FRONTIER_FILE, claim_links
+from helper_functions.politeness import HostScheduler, is_throttling_status
+from helper_functions.dedup import DEDUP_INDEX_FILE, SERVER_NOT_MODIFIED_PROFILE, get_digest_index, close_digest_indexes
+from helper_functions.cdx_index import CDXIndex, cdx_line
+from helper_functions.render_detect import RenderDetector, RENDER_MODES_FILE, STATIC
+from helper_functions.url_index import WARCS, skip_seen_links, record_done_links
+from helper_functions.link_store import read_link_list
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Headers sent by the plain HTTP capture path
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Encoding': 'gzip, deflate'
+}
+
+# How much of a body needs_javascript looks at
+JS_SNIFF_BYTES = 500_000
+
+# One requests.Session per worker thread so connections are reused per host
+_thread_local = threading.local()
+
 # Function to save a website to a WARC file
-def save_website_to_warc(url, driver, output_folder):
+# The HTTP response is stored as received; the DOM rendered by Chrome goes into a 'conversion' record
+# With dedup_index_path set, an unchanged page is stored as a revisit record and Chrome is skipped
+# A render_detector is shown both versions of the page to learn whether the host needs Chrome at all
+def save_website_to_warc(url, driver, output_folder, warc_format='per-url', max_warc_size=DEFAULT_MAX_WARC_SIZE, dedup_index_path=None,
+                         render_detector=None):
     try:
-        driver.get(url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
-        html = driver.page_source
-        response = requests.get(url, verify=False)
-        response_headers = response.headers
-        content_type = response_headers.get('Content-Type')
-        server = response_headers.get('Server', 'Unknown')
-        ip_address = socket.gethostbyname(url.split('/')[2])
-
-        request_headers_list = [
-            ('Host', url.split('/')[2]),
-            ('User-Agent', driver.execute_script("return navigator.userAgent;")),
-            ('Accept', 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8')
-        ]
-        request_status_line = "GET / HTTP/1.1"
-        http_request_headers = StatusAndHeaders(request_status_line, request_headers_list, is_http_request=True)
+        with fetch_for_capture(url, dedup_index_path) as response:
+            record_builder = RecordBuilder()
+            capture_record = create_capture_records(record_builder, url, response, dedup_index_path)
+            if capture_record is None:
+                return False
 
-        request_payload = BytesIO()
+            if capture_record.rec_type == 'revisit':
+                write_capture(url, capture_record.request_records + [capture_record], output_folder, warc_format, max_warc_size)
+                remember_capture(dedup_index_path, url, capture_record, response)
+                return True
 
-        sanitized_url = url.split("go.id/")[-1]
-        sanitized_url = sanitized_url.replace('.html', '').replace('.htm', '')
-        sanitized_url = sanitized_url.replace('/', '_').replace(':', '_')
+            driver.get(url)
+            WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+            page_source = driver.page_source
+            html = page_source.encode('utf-8')
+            if render_detector:
+                try:
+                    render_detector.observe(url, peek_body(capture_record).decode(response.encoding or 'utf-8', errors='replace'), page_source)
+                except Exception as e:
+                    logging.warning(f"Could not compare {url} over HTTP: {e}")
 
-        warc_writer = WARCWriter(open(os.path.join(output_folder, f'{filename(sanitized_url)}.warc'), 'wb'), gzip=False)
-        request_record = warc_writer.create_warc_record(url, 'request', payload=request_payload, http_headers=http_request_headers)
-        request_record.rec_headers.add_header('WARC-IP-Address', ip_address)
-        warc_writer.write_record(request_record)
+            conversion_record = record_builder.create_warc_record(
+                url, 'conversion', payload=BytesIO(html), length=len(html),
+                warc_content_type='text/html; charset=utf-8'
+            )
+            conversion_record.rec_headers.add_header('WARC-Refers-To', capture_record.rec_headers.get_header('WARC-Record-ID'))
 
-        response_status_line = f"HTTP/1.1 {response.status_code} OK"
-        response_headers_list = [
-            ('Content-Type', content_type),
-            ('Server', server),
-            ('Connection', 'keep-alive')
-        ]
-        http_response_headers = StatusAndHeaders(response_status_line, response_headers_list)
-        response_payload = BytesIO(html.encode('utf-8'))
-        response_record = warc_writer.create_warc_record(url, 'response', payload=response_payload, http_headers=http_response_headers)
-        response_record.rec_headers.add_header('WARC-Concurrent-To', request_record.rec_headers.get_header('WARC-Record-ID'))
-        response_record.rec_headers.add_header('WARC-IP-Address', ip_address)
-        warc_writer.write_record(response_record)
-
-        metadata_content = (f"URL: {url}\nTimestamp: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}\nContent-Length: {len(html.encode('utf-8'))}\n").encode('utf-8')
-        metadata_record = warc_writer.create_warc_record(uri='urn:uuid:metadata-record', record_type='metadata', payload=BytesIO(metadata_content))
-        metadata_record.rec_headers.add_header('WARC-Concurrent-To', response_record.rec_headers.get_header('WARC-Record-ID'))
-        warc_writer.write_record(metadata_record)
+            metadata_content = (f"URL: {url}\nTimestamp: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}\nContent-Length: {len(html)}\n").encode('utf-8')
+            metadata_record = record_builder.create_warc_record(uri='urn:uuid:metadata-record', record_type='metadata', payload=BytesIO(metadata_content))
+            metadata_record.rec_headers.add_header('WARC-Concurrent-To', capture_record.rec_headers.get_header('WARC-Record-ID'))
+
+            records = capture_record.request_records + [capture_record, conversion_record, metadata_record]
+            write_capture(url, records, output_folder, warc_format, max_warc_size)
+            remember_capture(dedup_index_path, url, capture_record, response)
+        return True
 
     except Exception as e:
         logging.error(f"Error scraping {url}: {str(e)}")
+        return False
+
+# Function to write the records of one capture, either to its own .warc or to the rolling .warc.gz files
+# Every record's position is appended to the folder's CDX index so it can be found again without a scan
+def write_capture(url, records, output_folder, warc_format='per-url', max_warc_size=DEFAULT_MAX_WARC_SIZE):
+    if warc_format == 'rolling':
+        positions = get_rolling_writer(output_folder, max_warc_size).write_records(records)
+    else:
+        warc_file, warc_path = create_capture_file(url, output_folder)
+        positions = []
+        with warc_file:
+            warc_writer = WARCWriter(warc_file, gzip=False)
+            for record in records:
+                offset = warc_file.tell()
+                warc_writer.write_record(record)
+                positions.append((os.path.basename(warc_path), offset, warc_file.tell() - offset))
+
+    CDXIndex(output_folder).append(cdx_line(record, *position) for record, position in zip(records, positions))
+
+# Function to start a headless Chrome for WARC capture (worker_id is passed by BrowserPool)
+def setup_headless_driver(worker_id=0):
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return webdriver.Chrome(options=options)
 
 # Helper function to create a valid filename
 def filename(url):
     return url.split('//')[-1].replace('/', '_').replace(':', '_')
 
-# Function to scrape the list of links and save them as WARC files
-def scrape_from_list(link_list, output_folder, catname):
-    options = Options()
-    options.add_experimental_option("detach", True)
+# Helper function to build the per-URL WARC path used by both capture paths
+def warc_path_for(url, output_folder):
+    sanitized_url = url.split("go.id/")[-1]
+    sanitized_url = sanitized_url.replace('.html', '').replace('.htm', '')
+    sanitized_url = sanitized_url.replace('/', '_').replace(':', '_')
+    return os.path.join(output_folder, f'{filename(sanitized_url)}.warc')
+
+def create_capture_file(url, output_folder):
+    """Opens a new per-URL .warc for writing and returns (file, path).
+
+    A URL captured before gets a timestamped name next to its earlier files, since revisit
+    records and the CDX index still point into those.
+    """
+    warc_path = warc_path_for(url, output_folder)
+    stem = warc_path[:-len('.warc')]
+    timestamp = time.strftime('%Y%m%d%H%M%S', time.gmtime())
+    candidates = itertools.chain([warc_path, f"{stem}-{timestamp}.warc"], (f"{stem}-{timestamp}-{n}.warc" for n in itertools.count(2)))
+    for path in candidates:
+        try:
+            return open(path, 'xb'), path
+        except FileExistsError:
+            continue
+
+def get_http_session():
+    """Returns the requests.Session owned by the current thread."""
+    session = getattr(_thread_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.verify = False
+        _thread_local.session = session
+    return session
+
+@functools.lru_cache(maxsize=4096)
+def resolve_ip(host):
+    return socket.gethostbyname(host)
+
+def needs_javascript(content_type, body):
+    """Heuristic check for HTML pages that only render their content with JavaScript."""
+    if 'html' not in (content_type or '').lower():
+        return False
+
+    html = body.decode('utf-8', errors='ignore').lower()
+    if '<noscript' in html and re.search(r'(enable|requires?|turn on) javascript', html):
+        return True
+
+    # An (almost) empty body next to scripts is the usual single-page-app shell
+    visible = re.sub(r'<script.*?</script>|<style.*?</style>', ' ', html, flags=re.S)
+    visible = re.sub(r'<[^>]+>', ' ', visible)
+    visible_length = len(re.sub(r'\s+', '', visible))
+    return visible_length < 200 and '<script' in html
+
+def peek_body(record, limit=JS_SNIFF_BYTES):
+    """Returns up to limit decoded bytes from the start of a spooled response record."""
+    stream = record.raw_stream
+    head = stream.read(limit)
+    stream.seek(0)
+
+    encoding = (record.http_headers.get_header('Content-Encoding') or '').lower()
+    if encoding in ('gzip', 'deflate'):
+        try:
+            # wbits=47 auto-detects gzip and zlib headers; a truncated stream is fine here
+            return zlib.decompressobj(47).decompress(head, limit)
+        except zlib.error:
+            return b''
+    return head
+
+# Function to turn a streamed requests response into WARC request/response records
+def create_response_records(record_builder, url, response):
+    """Builds the response record from the raw bytes on the wire.
+
+    The body is read from response.raw without decoding, and spooled once by warcio
+    (in memory up to 512 KB, then to a temporary file) while the payload digest is
+    computed. The status line and headers are the ones the server sent. The matching
+    request record is attached as response_record.request_records.
+    """
+    ip_address = resolve_ip(urlsplit(response.url).hostname)
+
+    request = response.request
+    request_url = urlsplit(request.url)
+    request_target = request_url.path or '/'
+    if request_url.query:
+        request_target += f'?{request_url.query}'
+    request_headers_list = [('Host', request_url.netloc)] + list(request.headers.items())
+    http_request_headers = StatusAndHeaders(f"{request.method} {request_target} HTTP/1.1", request_headers_list, is_http_request=True)
+
+    raw = response.raw
+    protocol = {9: 'HTTP/0.9', 10: 'HTTP/1.0', 11: 'HTTP/1.1', 20: 'HTTP/2'}.get(raw.version, 'HTTP/1.1')
+    # urllib3 removes the chunk framing, so the Transfer-Encoding header no longer describes the body
+    response_headers_list = [(name, value) for name, value in raw.headers.items() if name.lower() != 'transfer-encoding']
+    http_response_headers = StatusAndHeaders(f"{response.status_code} {response.reason}", response_headers_list, protocol=protocol)
+
+    request_record = record_builder.create_warc_record(url, 'request', payload=BytesIO(), http_headers=http_request_headers)
+    request_record.rec_headers.add_header('WARC-IP-Address', ip_address)
+
+    response_record = record_builder.create_warc_record(url, 'response', payload=raw, http_headers=http_response_headers)
+    # The body is spooled now, so give the record its length to stop warcio from buffering it again on write
+    response_record.length = response_record.payload_length
+    response_record.rec_headers.add_header('WARC-Concurrent-To', request_record.rec_headers.get_header('WARC-Record-ID'))
+    response_record.rec_headers.add_header('WARC-IP-Address', ip_address)
+    response_record.request_records = [request_record]
+    return response_record
+
+# Function to GET a URL for archiving, as a conditional request when it was captured before
+def fetch_for_capture(url, dedup_index_path=None):
+    headers = get_digest_index(dedup_index_path).conditional_headers(url) if dedup_index_path else {}
+    return get_http_session().get(url, stream=True, timeout=30, headers=headers)
+
+# Function to build the records for a response, replacing unchanged content by a revisit record
+def create_capture_records(record_builder, url, response, dedup_index_path=None):
+    """Returns the response record, or a revisit record when dedup finds the payload was stored before.
 
-    driver = webdriver.Chrome(options=options)
+    A 304 answer to a conditional request becomes a server-not-modified revisit; a full
+    response whose payload digest is already in the index becomes an identical-payload-digest
+    revisit. Either way only the HTTP headers are stored. The request record is attached as
+    .request_records, as with create_response_records. A 304 with no earlier capture to refer
+    to returns None, since its empty body is not worth storing.
+    """
+    response_record = create_response_records(record_builder, url, response)
+    if not dedup_index_path:
+        return response_record
+
+    digest_index = get_digest_index(dedup_index_path)
+    if response.status_code == 304:
+        original = digest_index.original_for_url(url)
+        if not original:
+            logging.warning(f"Skipping {url}: 304 Not Modified, but no earlier capture of it is in the dedup index")
+            return None
+        digest, original_url, original_date = original
+    else:
+        digest = response_record.rec_headers.get_header('WARC-Payload-Digest')
+        original = digest_index.original_for_digest(digest)
+        if not original:
+            return response_record
+        original_url, original_date = original
+
+    revisit_record = record_builder.create_revisit_record(url, digest, original_url, original_date, http_headers=response_record.http_headers)
+    if response.status_code == 304:
+        revisit_record.rec_headers.replace_header('WARC-Profile', SERVER_NOT_MODIFIED_PROFILE)
+    for header in ('WARC-Concurrent-To', 'WARC-IP-Address'):
+        revisit_record.rec_headers.add_header(header, response_record.rec_headers.get_header(header))
+    revisit_record.request_records = response_record.request_records
+    return revisit_record
+
+# Function to remember a written capture in the digest index, for later conditional requests and revisits
+def remember_capture(dedup_index_path, url, record, response):
+    if not dedup_index_path or (response.status_code != 304 and response.status_code >= 300):
+        return
+    get_digest_index(dedup_index_path).record_capture(
+        url,
+        record.rec_headers.get_header('WARC-Payload-Digest'),
+        record.rec_headers.get_header('WARC-Date'),
+        etag=response.headers.get('ETag'),
+        last_modified=response.headers.get('Last-Modified')
+    )
+
+# Function to fetch a URL over plain HTTP and save the real response to a WARC file
+def fetch_website_to_warc(url, output_folder, warc_format='per-url', max_warc_size=DEFAULT_MAX_WARC_SIZE, dedup_index_path=None):
+    """Returns 'saved', 'revisit', 'needs_js', 'throttled', 'http_error' (a 4xx/5xx status, not archived) or 'failed'."""
+    try:
+        with fetch_for_capture(url, dedup_index_path) as response:
+            # A 429/503 is the server asking us to back off, not content worth archiving
+            if is_throttling_status(response.status_code):
+                logging.warning(f"Throttled by server ({response.status_code}) on {url}")
+                return 'throttled'
+            if response.status_code >= 400:
+                logging.warning(f"HTTP {response.status_code} on {url}, not archived")
+                return 'http_error'
+
+            capture_record = create_capture_records(RecordBuilder(), url, response, dedup_index_path)
+            if capture_record is None:
+                return 'failed'
+
+            if capture_record.rec_type == 'response' and needs_javascript(response.headers.get('Content-Type'), peek_body(capture_record)):
+                return 'needs_js'
+
+            write_capture(url, capture_record.request_records + [capture_record], output_folder, warc_format, max_warc_size)
+            remember_capture(dedup_index_path, url, capture_record, response)
+
+        return 'revisit' if capture_record.rec_type == 'revisit' else 'saved'
+
+    except Exception as e:
+        logging.error(f"Error fetching {url}: {str(e)}")
+        return 'failed'
+
+async def _capture_one(url, executor, global_limit, scheduler, capture_kwargs):
+    # Take the global slot first, so the request starts as soon as its host token is taken and the pacing holds
+    async with global_limit:
+        await scheduler.acquire_async(url)
+        started = time.monotonic()
+        status = 'failed'
+        try:
+            loop = asyncio.get_running_loop()
+            status = await loop.run_in_executor(executor, functools.partial(fetch_website_to_warc, url, **capture_kwargs))
+        finally:
+            # A 404 says nothing about the host's load, so only errors and throttling slow it down
+            scheduler.release(url, latency=time.monotonic() - started, ok=status not in ('failed', 'throttled'))
+    return url, status
+
+async def capture_from_list(link_list, output_folder, catname, concurrency=16, per_host_concurrency=4,
+                            warc_format='per-url', max_warc_size=DEFAULT_MAX_WARC_SIZE, dedup_index_path=None,
+                            frontier=None, scheduler=None):
+    """Fetches link_list concurrently over HTTP and returns the URLs that need a browser.
+
+    concurrency caps the requests in flight overall; each host is paced by the scheduler,
+    which allows up to per_host_concurrency requests to it at once.
+    """
+    global_limit = asyncio.Semaphore(concurrency)
+    scheduler = scheduler or HostScheduler(max_concurrency=per_host_concurrency)
+    capture_kwargs = {'output_folder': output_folder, 'warc_format': warc_format, 'max_warc_size': max_warc_size,
+                      'dedup_index_path': dedup_index_path}
+    needs_browser = []
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        tasks = [
+            asyncio.create_task(_capture_one(link, executor, global_limit, scheduler, capture_kwargs))
+            for link in link_list
+        ]
+        for id, task in enumerate(asyncio.as_completed(tasks), start=1):
+            link, status = await task
+            if status == 'needs_js':
+                needs_browser.append(link)
+                logging.info(f"{id}/{len(link_list)} - {catname} - Needs JavaScript, queued for browser {link}")
+            elif status == 'saved':
+                logging.info(f"{id}/{len(link_list)} - {catname} - Saved WARC Index {link}")
+            elif status == 'revisit':
+                logging.info(f"{id}/{len(link_list)} - {catname} - Unchanged, saved revisit record {link}")
+            if frontier and status != 'needs_js':
+                frontier.mark(link, status in ('saved', 'revisit'), None if status in ('saved', 'revisit') else status)
+
+    return needs_browser
+
+# Function to capture links one by one in a single headless Chrome
+def capture_with_browser(link_list, catname, capture_kwargs, frontier=None, scheduler=None, render_detector=None):
+    scheduler = scheduler or HostScheduler()
+    driver = setup_headless_driver()
+    try:
+        for id, link in enumerate(link_list):
+            scheduler.acquire(link)
+            started = time.monotonic()
+            saved = save_website_to_warc(link, driver, render_detector=render_detector, **capture_kwargs)
+            scheduler.release(link, latency=time.monotonic() - started, ok=saved)
+            if frontier:
+                frontier.mark(link, saved)
+            logging.info(f"{id}/{len(link_list)} - {catname} - Saved WARC Index {link}")
+    finally:
+        driver.quit()
+
+# Function to scrape the list of links and save them as WARC files
+# mode='async' fetches over plain HTTP first and only opens Chrome for pages that need JavaScript
+# workers > 1 spreads the browser captures over a pool of headless Chrome processes
+# warc_format='rolling' appends to a few .warc.gz files rotated at max_warc_size instead of one .warc per URL
+# frontier, if given, records the outcome of every link so an interrupted run can be resumed
+# Requests to each host are paced by one HostScheduler shared by the HTTP and browser paths
+# dedup_index_path points to a DigestIndex; unchanged pages are then stored as revisit records
+# Records written are listed in output_folder/index.cdxj, sorted once the run is over
+# mode='auto' captures a few pages per host in Chrome, compares them with the plain HTTP response and
+# sends the rest of every host where both match through the HTTP path; decisions are kept in render_modes_path
+def scrape_from_list(link_list, output_folder, catname, mode='browser', concurrency=16, per_host_concurrency=4, workers=1,
+                     warc_format='per-url', max_warc_size=DEFAULT_MAX_WARC_SIZE, dedup_index_path=None, frontier=None, scheduler=None,
+                     render_modes_path=None):
     os.makedirs(output_folder, exist_ok=True)
-    
-    for id, link in enumerate(link_list):
-        save_website_to_warc(link, driver, output_folder=output_folder)
-        logging.info(f"{id}/{len(link_list)} - {catname} - Saved WARC Index {link}")
-            
-    driver.quit()
+    if not link_list:
+        return
+    capture_kwargs = {'output_folder': output_folder, 'warc_format': warc_format, 'max_warc_size': max_warc_size,
+                      'dedup_index_path': dedup_index_path}
+    scheduler = scheduler or HostScheduler(max_concurrency=per_host_concurrency)
+
+    try:
+        if mode == 'auto':
+            render_detector = RenderDetector(cache_path=render_modes_path)
+            samples = render_detector.pick_samples(link_list)
+            if samples:
+                capture_with_browser(samples, catname, capture_kwargs, frontier, scheduler, render_detector=render_detector)
+                sampled = set(samples)
+                link_list = [link for link in link_list if link not in sampled]
+
+            static_links = [link for link in link_list if render_detector.mode_for(link) == STATIC]
+            link_list = [link for link in link_list if render_detector.mode_for(link) != STATIC]
+            logging.info(f"{catname} - {len(static_links)} links on static hosts go over HTTP, {len(link_list)} need a browser")
+            if static_links:
+                link_list += asyncio.run(capture_from_list(static_links, catname=catname, concurrency=concurrency,
+                                                           per_host_concurrency=per_host_concurrency, frontier=frontier,
+                                                           scheduler=scheduler, **capture_kwargs))
+            if not link_list:
+                return
+
+        if mode == 'async':
+            link_list = asyncio.run(capture_from_list(link_list, catname=catname, concurrency=concurrency,
+                                                      per_host_concurrency=per_host_concurrency, frontier=frontier,
+                                                      scheduler=scheduler, **capture_kwargs))
+            if not link_list:
+                return
+
+        if workers > 1:
+            pool = BrowserPool(setup_headless_driver, save_website_to_warc, workers=workers, handler_kwargs=capture_kwargs, scheduler=scheduler)
+            progress_callback = (lambda done, total, link, ok: frontier.mark(link, ok)) if frontier else None
+            pool.run(link_list, catname=catname, progress_callback=progress_callback)
+            return
+
+        capture_with_browser(link_list, catname, capture_kwargs, frontier, scheduler)
+    finally:
+        close_rolling_writers()
+        close_digest_indexes()
+        CDXIndex(output_folder).compact()
 
 # Main function to process the CSV and scrape WARC files
-def warcscrappermain(path, project_folder):
+# Progress is journaled in frontier.sqlite; a new run continues with the links that are still pending
+# and retry_failed=True runs only the links that failed before
+# recrawl=True fetches finished links again; with dedup=True unchanged pages then cost only a revisit record
+def warcscrappermain(path, project_folder, mode='browser', concurrency=16, per_host_concurrency=4, workers=1,
+                     warc_format='per-url', max_warc_size=DEFAULT_MAX_WARC_SIZE, retry_failed=False,
+                     recrawl=False, dedup=False, seen_index=None):
     # Set up logging for WARC scraper
     log_dir = os.path.join(project_folder, 'logs')
     os.makedirs(log_dir, exist_ok=True)
@@ -97,18 +444,25 @@ def warcscrappermain(path, project_folder):
     output_folder = os.path.join(project_folder, 'scraped-warcs')
     os.makedirs(output_folder, exist_ok=True)
 
-    # Process the CSV or folder containing CSVs
-    if path.endswith('.csv'):
-        with open(path, 'r') as f:
-            reader = csv.reader(f)
-            next(reader)  # Skip header row
-            link_list = [row[0] for row in reader]
-        scrape_from_list(link_list=link_list, output_folder=output_folder, catname=path.split('/')[-1])
+    # Process the CSV or link store, or a folder containing CSVs
+    if path.endswith(('.csv', '.sqlite')):
+        csv_paths = [path]
     else:
-        csv_list = [f for f in os.listdir(path) if f.endswith('.csv')]
-        for csv_file in csv_list:
-            with open(os.path.join(path, csv_file), 'r') as f:
-                reader = csv.reader(f)
-                next(reader)  # Skip header row
-                link_list = [row[0] for row in reader]
-            scrape_from_list(link_list=link_list, output_folder=output_folder, catname=csv_file)
+        csv_paths = [os.path.join(path, f) for f in os.listdir(path) if f.endswith('.csv')]
+
+    with Frontier(os.path.join(project_folder, FRONTIER_FILE)) as frontier:
+        for csv_path in csv_paths:
+            link_list = read_link_list(csv_path)
+            link_list = claim_links(frontier, link_list, retry_failed=retry_failed, recrawl=recrawl)
+            # Pages another project already captured are skipped, the ones captured now are added for the next;
+            # a recrawl fetches every link again, including this project's own earlier captures
+            if seen_index and not recrawl:
+                link_list = skip_seen_links(frontier, link_list, seen_index, WARCS)
+            scrape_from_list(link_list=link_list, output_folder=output_folder, catname=csv_path.split('/')[-1],
+                             mode=mode, concurrency=concurrency, per_host_concurrency=per_host_concurrency, workers=workers,
+                             warc_format=warc_format, max_warc_size=max_warc_size,
+                             dedup_index_path=os.path.join(project_folder, DEDUP_INDEX_FILE) if dedup else None,
+                             frontier=frontier, render_modes_path=os.path.join(project_folder, RENDER_MODES_FILE))
+            if seen_index:
+                record_done_links(frontier, link_list, seen_index, WARCS)
+        logging.info(f"WARC frontier: {frontier.counts()}")
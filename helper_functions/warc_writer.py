@@ -0,0 +1,94 @@
+import os
+import time
+import threading
+from warcio.warcwriter import WARCWriter
+
+# File endings the token estimator, compressor and dashboard treat as WARC files
+WARC_EXTENSIONS = ('.warc', '.warc.gz')
+
+# Default size at which a rolling WARC file is closed and the next one started
+DEFAULT_MAX_WARC_SIZE = 1024 ** 3  # 1 GB
+
+# Open rolling writers, one per output folder and process
+_rolling_writers = {}
+_rolling_writers_lock = threading.Lock()
+
+def is_warc_file(name):
+    return name.endswith(WARC_EXTENSIONS)
+
+class RollingWARCWriter:
+    """Appends records to .warc.gz files, gzipped record by record, starting a new file at max_size bytes.
+
+    Records passed to one write_records call always end up next to each other in the same
+    file. The writer is safe to share between threads; each record is flushed as it is
+    written, so files stay readable even if the process is killed.
+    """
+
+    def __init__(self, output_folder, prefix='capture', max_size=DEFAULT_MAX_WARC_SIZE):
+        self.output_folder = output_folder
+        self.prefix = prefix
+        self.max_size = max_size
+        self.current_path = None
+
+        self._file = None
+        self._writer = None
+        self._serial = 0
+        self._lock = threading.Lock()
+        os.makedirs(output_folder, exist_ok=True)
+
+    def _open_next(self):
+        self._serial += 1
+        file_name = f"{self.prefix}-{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{os.getpid()}-{self._serial:05d}.warc.gz"
+        self.current_path = os.path.join(self.output_folder, file_name)
+        self._file = open(self.current_path, 'wb')
+        self._writer = WARCWriter(self._file, gzip=True)
+        self._writer.write_record(self._writer.create_warcinfo_record(file_name, {'software': 'ez-scrape', 'format': 'WARC File Format 1.0'}))
+
+    def write_records(self, records):
+        """Writes records and returns (file name, offset, length) for each, for indexing."""
+        with self._lock:
+            if self._file is None:
+                self._open_next()
+
+            positions = []
+            file_name = os.path.basename(self.current_path)
+            for record in records:
+                offset = self._file.tell()
+                self._writer.write_record(record)
+                positions.append((file_name, offset, self._file.tell() - offset))
+
+            if self._file.tell() >= self.max_size:
+                self._close_current()
+            return positions
+
+    def _close_current(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def close(self):
+        with self._lock:
+            self._close_current()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def get_rolling_writer(output_folder, max_size=DEFAULT_MAX_WARC_SIZE):
+    """Returns the shared rolling writer for output_folder in the current process."""
+    # Keyed by pid so a forked browser worker never reuses its parent's open file
+    key = (os.path.abspath(output_folder), os.getpid())
+    with _rolling_writers_lock:
+        if key not in _rolling_writers:
+            _rolling_writers[key] = RollingWARCWriter(output_folder, max_size=max_size)
+        return _rolling_writers[key]
+
+def close_rolling_writers():
+    with _rolling_writers_lock:
+        for key, writer in list(_rolling_writers.items()):
+            if key[1] == os.getpid():
+                writer.close()
+                del _rolling_writers[key]
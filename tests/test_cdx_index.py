@@ -0,0 +1,89 @@
+import os
+from io import BytesIO
+import pytest
+from warcio.archiveiterator import ArchiveIterator
+from warcio.statusandheaders import StatusAndHeaders
+from warcio.warcwriter import WARCWriter
+from helper_functions.cdx_index import CDXIndex, CDX_INDEX_FILE, CDX_LOG_FILE, cdx_line, surt_key
+
+def write_warc(path, pages, gzip=True):
+    """Writes a response record per (url, body) to path and returns their CDXJ lines."""
+    with open(path, 'wb') as stream:
+        writer = WARCWriter(stream, gzip=gzip)
+        for url, body in pages:
+            http_headers = StatusAndHeaders('200 OK', [('Content-Type', 'text/html; charset=utf-8')], protocol='HTTP/1.1')
+            writer.write_record(writer.create_warc_record(url, 'response', payload=BytesIO(body), http_headers=http_headers))
+    lines = []
+    with open(path, 'rb') as stream:
+        iterator = ArchiveIterator(stream)
+        for record in iterator:
+            lines.append(cdx_line(record, os.path.basename(path), iterator.get_record_offset(), iterator.get_record_length()))
+    return lines
+
+def pages_of(prefix, count):
+    return [(f'https://www.example.go.id/{prefix}/{i}', f'<p>{prefix} {i}</p>'.encode()) for i in range(count)]
+
+@pytest.mark.parametrize('url, key', [
+    ('https://www.bkn.go.id/Berita/?b=2&a=1', 'id,go,bkn)/berita/?a=1&b=2'),
+    ('http://bkn.go.id', 'id,go,bkn)/'),
+    ('https://bkn.go.id:8443/a b', 'id,go,bkn:8443)/a%20b'),
+])
+def test_surt_key(url, key):
+    assert surt_key(url) == key
+
+@pytest.mark.parametrize('gzip', [True, False])
+def test_build_and_lookup_read_the_right_record(tmp_path, gzip):
+    name = 'a.warc.gz' if gzip else 'a.warc'
+    write_warc(str(tmp_path / name), pages_of('berita', 200), gzip=gzip)
+    index = CDXIndex(str(tmp_path))
+    assert index.build() == 200
+    for i in (0, 57, 199):
+        entry = index.latest(f'https://example.go.id/berita/{i}')
+        assert entry['filename'] == name and entry['status'] == '200' and entry['mime'] == 'text/html'
+        with index.open_record(entry) as record:
+            assert record.rec_headers.get_header('WARC-Target-URI') == f'https://www.example.go.id/berita/{i}'
+            assert record.content_stream().read() == f'<p>berita {i}</p>'.encode()
+    assert not index.contains('https://example.go.id/berita/200')
+    assert index.lookup('https://example.go.id/berita') == []
+
+def test_index_file_is_sorted(tmp_path):
+    write_warc(str(tmp_path / 'b.warc.gz'), pages_of('zeta', 20) + pages_of('alpha', 20))
+    CDXIndex(str(tmp_path)).build()
+    with open(tmp_path / CDX_INDEX_FILE, encoding='utf-8') as index_file:
+        lines = index_file.readlines()
+    assert lines == sorted(lines) and len(lines) == 40
+
+def test_appended_entries_are_found_before_and_after_compact(tmp_path):
+    write_warc(str(tmp_path / 'a.warc.gz'), pages_of('berita', 50))
+    index = CDXIndex(str(tmp_path))
+    index.build()
+    index.append(write_warc(str(tmp_path / 'b.warc.gz'), pages_of('berita', 3) + pages_of('galeri', 10)))
+    assert os.path.exists(tmp_path / CDX_LOG_FILE)
+    assert [entry['filename'] for entry in index.lookup('https://example.go.id/berita/1')] == ['a.warc.gz', 'b.warc.gz']
+    assert index.latest('https://example.go.id/galeri/9')['filename'] == 'b.warc.gz'
+
+    index.compact()
+    assert not os.path.exists(tmp_path / CDX_LOG_FILE)
+    with open(tmp_path / CDX_INDEX_FILE, encoding='utf-8') as index_file:
+        lines = index_file.readlines()
+    assert lines == sorted(lines) and len(lines) == 63
+    # Entries of files indexed before are kept, next to the new capture of the same URL
+    assert [entry['filename'] for entry in index.lookup('https://example.go.id/berita/1')] == ['a.warc.gz', 'b.warc.gz']
+    with index.open_record(index.latest('https://example.go.id/galeri/9')) as record:
+        assert record.content_stream().read() == b'<p>galeri 9</p>'
+
+def test_compact_without_an_index_or_log(tmp_path):
+    index = CDXIndex(str(tmp_path))
+    index.compact()
+    assert not os.path.exists(tmp_path / CDX_INDEX_FILE)
+    index.append(write_warc(str(tmp_path / 'a.warc.gz'), pages_of('berita', 5)))
+    index.compact()
+    assert index.contains('https://example.go.id/berita/4')
+
+def test_build_replaces_the_log(tmp_path):
+    lines = write_warc(str(tmp_path / 'a.warc.gz'), pages_of('berita', 5))
+    index = CDXIndex(str(tmp_path))
+    index.append(lines)
+    assert index.build() == 5
+    assert not os.path.exists(tmp_path / CDX_LOG_FILE)
+    assert len(index.lookup('https://example.go.id/berita/0')) == 1
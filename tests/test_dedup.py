@@ -0,0 +1,121 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from warcio.archiveiterator import ArchiveIterator
+from helper_functions.dedup import DigestIndex, SERVER_NOT_MODIFIED_PROFILE, close_digest_indexes
+from helper_functions.warc_scraper import fetch_website_to_warc
+
+PAGE = b'<html><body>' + b'<p>Berita daerah hari ini</p>' * 20 + b'</body></html>'
+
+# Path: (body, ETag or None); changed by the tests between captures
+pages = {}
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body, etag = pages[self.path]
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+@pytest.fixture
+def capture(tmp_path):
+    output_folder = str(tmp_path / 'warcs')
+    os.makedirs(output_folder)
+    dedup_index_path = str(tmp_path / 'dedup.sqlite')
+    yield lambda url: fetch_website_to_warc(url, output_folder, dedup_index_path=dedup_index_path)
+    close_digest_indexes()
+
+def warc_records(output_folder):
+    records = []
+    # In the order they were written; a revisit's file gets a timestamped name next to the original's
+    paths = [os.path.join(output_folder, name) for name in os.listdir(output_folder) if name.endswith('.warc')]
+    for path in sorted(paths, key=os.path.getmtime):
+        with open(path, 'rb') as stream:
+            for record in ArchiveIterator(stream):
+                if record.rec_type in ('response', 'revisit'):
+                    records.append((record.rec_type, dict(record.rec_headers.headers), record.content_stream().read()))
+    return records
+
+def test_digest_index_keeps_first_capture_as_original(tmp_path):
+    index = DigestIndex(str(tmp_path / 'dedup.sqlite'))
+    index.record_capture('https://example.go.id/a', 'sha1:AAA', '2024-01-01T00:00:00Z', etag='"1"')
+    index.record_capture('https://example.go.id/b', 'sha1:AAA', '2024-02-01T00:00:00Z')
+    assert index.original_for_digest('sha1:AAA') == ('https://example.go.id/a', '2024-01-01T00:00:00Z')
+    assert index.original_for_digest('sha1:BBB') is None
+    assert index.original_for_url('https://example.go.id/b') == ('sha1:AAA', 'https://example.go.id/a', '2024-01-01T00:00:00Z')
+    index.close()
+
+def test_conditional_headers_follow_last_capture(tmp_path):
+    index = DigestIndex(str(tmp_path / 'dedup.sqlite'))
+    assert index.conditional_headers('https://example.go.id/a') == {}
+    index.record_capture('https://example.go.id/a', 'sha1:AAA', '2024-01-01T00:00:00Z', etag='"1"',
+                         last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    assert index.conditional_headers('https://example.go.id/a') == {
+        'If-None-Match': '"1"', 'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}
+    index.record_capture('https://example.go.id/a', 'sha1:BBB', '2024-02-01T00:00:00Z')
+    assert index.conditional_headers('https://example.go.id/a') == {}
+    index.close()
+
+def test_unchanged_page_becomes_identical_digest_revisit(server, capture, tmp_path):
+    pages['/same'] = (PAGE, None)
+    assert capture(f'{server}/same') == 'saved'
+    assert capture(f'{server}/same') == 'revisit'
+    records = warc_records(str(tmp_path / 'warcs'))
+    assert [record[0] for record in records] == ['response', 'revisit']
+    (_, response, body), (_, revisit, revisit_body) = records
+    # The earlier capture is kept in full and the revisit points to it
+    assert PAGE in body
+    assert revisit['WARC-Refers-To-Target-URI'] == f'{server}/same'
+    assert revisit['WARC-Refers-To-Date'] == response['WARC-Date']
+    assert revisit['WARC-Payload-Digest'] == response['WARC-Payload-Digest']
+    assert PAGE not in revisit_body
+
+def test_same_payload_at_another_url_is_a_revisit(server, capture):
+    pages['/first'] = (PAGE, None)
+    pages['/mirror'] = (PAGE, None)
+    assert capture(f'{server}/first') == 'saved'
+    assert capture(f'{server}/mirror') == 'revisit'
+
+def test_changed_page_is_stored_again(server, capture):
+    pages['/changing'] = (PAGE, None)
+    assert capture(f'{server}/changing') == 'saved'
+    pages['/changing'] = (PAGE.replace(b'hari ini', b'kemarin'), None)
+    assert capture(f'{server}/changing') == 'saved'
+
+def test_not_modified_becomes_server_not_modified_revisit(server, capture, tmp_path):
+    pages['/etag'] = (PAGE + b'<!-- etag -->', '"v1"')
+    assert capture(f'{server}/etag') == 'saved'
+    assert capture(f'{server}/etag') == 'revisit'
+    _, revisit, _ = warc_records(str(tmp_path / 'warcs'))[-1]
+    assert revisit['WARC-Profile'] == SERVER_NOT_MODIFIED_PROFILE
+
+def test_not_modified_without_original_is_skipped(server, capture, tmp_path):
+    pages['/orphan'] = (PAGE, '"v1"')
+    # A 304 the index has no full capture for is not written as an empty response
+    index = DigestIndex(str(tmp_path / 'dedup.sqlite'))
+    with index.conn:
+        index.conn.execute("INSERT INTO urls (url, digest, etag) VALUES (?, ?, ?)", (f'{server}/orphan', 'sha1:GONE', '"v1"'))
+    index.close()
+    assert capture(f'{server}/orphan') == 'failed'
+    assert warc_records(str(tmp_path / 'warcs')) == []
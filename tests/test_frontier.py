@@ -0,0 +1,56 @@
+from helper_functions.frontier import Frontier, claim_links, PENDING, IN_FLIGHT, DONE, FAILED
+
+LINKS = [f'https://example.go.id/page/{i}' for i in range(5)]
+
+def test_claim_takes_pending_links_in_order(tmp_path):
+    with Frontier(str(tmp_path / 'frontier.sqlite')) as frontier:
+        assert claim_links(frontier, LINKS) == LINKS
+        assert frontier.counts()[IN_FLIGHT] == 5
+        # Links already in flight are not handed out twice
+        assert claim_links(frontier, LINKS) == []
+
+def test_finished_links_are_skipped_on_the_next_run(tmp_path):
+    with Frontier(str(tmp_path / 'frontier.sqlite')) as frontier:
+        claim_links(frontier, LINKS)
+        frontier.mark(LINKS[0], True)
+        frontier.mark(LINKS[1], False, 'timeout')
+    with Frontier(str(tmp_path / 'frontier.sqlite')) as frontier:
+        # The three links left in flight belonged to a run that died
+        assert claim_links(frontier, LINKS) == LINKS[2:]
+        assert frontier.counts() == {PENDING: 0, IN_FLIGHT: 3, DONE: 1, FAILED: 1}
+
+def test_retry_failed_takes_only_failed_links(tmp_path):
+    with Frontier(str(tmp_path / 'frontier.sqlite')) as frontier:
+        claim_links(frontier, LINKS)
+        for link in LINKS:
+            frontier.mark(link, link != LINKS[3], 'HTTP 500')
+        assert claim_links(frontier, LINKS, retry_failed=True) == [LINKS[3]]
+        frontier.mark(LINKS[3], True)
+        assert claim_links(frontier, LINKS, retry_failed=True) == []
+        assert frontier.counts()[DONE] == 5
+
+def test_failure_keeps_error_and_attempts(tmp_path):
+    with Frontier(str(tmp_path / 'frontier.sqlite')) as frontier:
+        claim_links(frontier, LINKS[:1])
+        frontier.mark(LINKS[0], False, 'timeout')
+        claim_links(frontier, LINKS[:1], retry_failed=True)
+        frontier.mark(LINKS[0], False, 'HTTP 503')
+        assert frontier.conn.execute("SELECT attempts, last_error FROM urls").fetchone() == (2, 'HTTP 503')
+        frontier.mark(LINKS[0], True)
+        assert frontier.conn.execute("SELECT last_error FROM urls").fetchone() == (None,)
+
+def test_add_keeps_known_states(tmp_path):
+    with Frontier(str(tmp_path / 'frontier.sqlite')) as frontier:
+        claim_links(frontier, LINKS[:2])
+        frontier.mark(LINKS[0], True)
+        frontier.add(LINKS)
+        assert frontier.select(LINKS, DONE) == [LINKS[0]]
+        assert frontier.select(LINKS, PENDING) == LINKS[2:]
+
+def test_recrawl_takes_every_link_again(tmp_path):
+    with Frontier(str(tmp_path / 'frontier.sqlite')) as frontier:
+        claim_links(frontier, LINKS)
+        for link in LINKS:
+            frontier.mark(link, link != LINKS[0], 'timeout')
+        assert claim_links(frontier, LINKS, recrawl=True) == LINKS
+        assert frontier.counts()[IN_FLIGHT] == 5
@@ -0,0 +1,62 @@
+import os
+import pytest
+from warcio.archiveiterator import ArchiveIterator
+from helper_functions import lang_id
+from helper_functions.lang_id import detect_language, language_sample, normalize_language, stopword_language
+from helper_functions.token_est import record_text_details
+
+# News pages of bkn.go.id captured by the scraper: Indonesian text in a WordPress template with lang="en-US"
+BKN_WARC_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               'output', 'BKN', 'warc', 'warcs', 'scraped-warcs')
+
+INDONESIAN = ('Badan Kepegawaian Negara telah melaksanakan seleksi kompetensi dasar bagi para pelamar yang '
+              'mendaftar pada tahun ini, dan hasilnya akan diumumkan kepada peserta melalui laman resmi. ') * 3
+ENGLISH = ('The civil service agency has completed the basic competency test for the applicants who registered '
+           'this year, and the results will be announced to the participants on the official website. ') * 3
+
+def bkn_pages():
+    pages = []
+    for name in sorted(os.listdir(BKN_WARC_FOLDER)):
+        with open(os.path.join(BKN_WARC_FOLDER, name), 'rb') as stream:
+            for record in ArchiveIterator(stream):
+                if record.rec_type == 'response':
+                    text, html_lang, _ = record_text_details(record)
+                    if text.strip():
+                        pages.append((name, text, html_lang))
+    return pages
+
+@pytest.mark.parametrize('code, language', [('id-ID', 'id'), ('en_US', 'en'), ('IN', 'id'), ('', None), (None, None)])
+def test_normalize_language(code, language):
+    assert normalize_language(code) == language
+
+def test_language_sample_spreads_over_the_text():
+    text = 'menu ' * 1000 + 'isi berita ' * 1000
+    sample = language_sample(text, max_chars=400, windows=4)
+    assert len(sample) <= 403 and 'menu' in sample and 'berita' in sample
+
+def test_stopwords_decide_clear_texts():
+    assert stopword_language(INDONESIAN) == 'id'
+    assert stopword_language(ENGLISH) == 'en'
+    assert stopword_language('BKN') is None
+
+def test_template_lang_does_not_override_the_text():
+    assert detect_language(INDONESIAN, 'en-US') == 'id'
+    # Menus and archive lists dilute the stopwords; langdetect still decides, not the template
+    diluted = INDONESIAN + ' Januari Februari Maret April Mei Juni Juli Agustus September Oktober November Desember' * 30
+    assert stopword_language(language_sample(diluted)) is None
+    assert detect_language(diluted, 'en-US') == 'id'
+
+def test_html_lang_breaks_ties_only(monkeypatch):
+    class Unsure:
+        lang, prob = 'en', 0.55
+    monkeypatch.setattr(lang_id, 'detect_langs', lambda sample: [Unsure()])
+    assert detect_language('Jakarta Bandung Surabaya Medan', 'id') == 'id'
+    assert detect_language('Jakarta Bandung Surabaya Medan') == 'en'
+    assert detect_language('', 'id-ID') == 'id'
+    assert detect_language('') == 'unknown'
+
+def test_bkn_pages_are_indonesian():
+    pages = bkn_pages()
+    assert len(pages) == 30
+    assert {html_lang for _, _, html_lang in pages} == {'en-US'}
+    assert [name for name, text, html_lang in pages if detect_language(text, html_lang) != 'id'] == []
@@ -0,0 +1,76 @@
+import csv
+import pytest
+from helper_functions.link_store import LinkStore, LINK_FIELDS, read_link_list
+
+SITE = 'https://example.go.id'
+
+@pytest.fixture
+def store(tmp_path):
+    with LinkStore(str(tmp_path / 'links.sqlite')) as store:
+        yield store
+
+def probed(store, types):
+    """Adds a link per {path: content type or None} and records the types of those probed."""
+    store.add([SITE + path for path in types])
+    for path, content_type in types.items():
+        if content_type is not None:
+            store.set_status(SITE + path, 200, content_type)
+
+def test_add_keeps_first_discovery(store):
+    assert store.add([SITE + '/a', SITE + '/b'], {SITE + '/a': {'source_page': SITE + '/list', 'text': 'Berita', 'index': 3}}) == 2
+    assert store.add([SITE + '/a', SITE + '/c']) == 1
+    row = store.conn.execute("SELECT source_page, link_text, position FROM links WHERE url = ?", (SITE + '/a',)).fetchone()
+    assert row == (SITE + '/list', 'Berita', 3)
+    assert store.urls() == [SITE + '/a', SITE + '/b', SITE + '/c']
+
+def test_pdf_filter_keeps_aliases_generic_types_and_pdf_urls(store):
+    probed(store, {
+        '/report': 'application/pdf; qs=0.9',
+        '/x-pdf': 'application/x-pdf',
+        '/download': 'application/octet-stream',
+        '/binary': 'binary/octet-stream',
+        '/unprobed': None,
+        '/file.PDF': 'text/html',
+        '/file.pdf?v=2': 'text/html; charset=utf-8',
+        '/page': 'text/html; charset=utf-8',
+        '/photo': 'image/jpeg',
+    })
+    assert store.urls(content_type='application/pdf') == [SITE + path for path in (
+        '/report', '/x-pdf', '/download', '/binary', '/unprobed', '/file.PDF', '/file.pdf?v=2')]
+    assert store.urls(content_type='text/html') == [SITE + path for path in (
+        '/download', '/binary', '/unprobed', '/file.PDF', '/file.pdf?v=2', '/page')]
+    assert store.urls(unchecked=True) == [SITE + '/unprobed']
+    assert store.counts_by_content_type()['unchecked'] == 1
+    assert store.counts_by_content_type()['text/html'] == 3
+
+def test_filters_combine(store):
+    store.add([SITE + '/a', SITE + '/b'], {SITE + '/a': {'source_page': SITE + '/list'}})
+    store.set_status(SITE + '/a', 404, 'text/html')
+    store.set_status(SITE + '/b', 200, 'text/html')
+    assert store.urls(status=200) == [SITE + '/b']
+    assert store.urls(source_page=SITE + '/list') == [SITE + '/a']
+    assert store.urls(status=200, source_page=SITE + '/list') == []
+    assert store.urls(since=store.conn.execute("SELECT MAX(discovered_at) FROM links").fetchone()[0] + 1) == []
+
+def test_merge_and_diff_across_stores(store, tmp_path):
+    other_path = str(tmp_path / 'other.sqlite')
+    with LinkStore(other_path) as other:
+        other.add([SITE + '/b', SITE + '/c'], {SITE + '/c': {'source_page': SITE + '/seed', 'text': 'Galeri'}})
+        other.set_status(SITE + '/c', 200, 'application/pdf')
+    store.add([SITE + '/a', SITE + '/b'])
+    assert store.diff(other_path) == [SITE + '/a']
+    assert store.merge_from(other_path) == 1
+    assert store.merge_from(other_path) == 0
+    assert store.count() == 3
+    row = store.conn.execute("SELECT source_page, link_text, http_status, content_type FROM links WHERE url = ?", (SITE + '/c',)).fetchone()
+    assert row == (SITE + '/seed', 'Galeri', 200, 'application/pdf')
+
+def test_export_and_read_link_list(store, tmp_path):
+    probed(store, {'/a.pdf': 'application/pdf', '/b': 'text/html'})
+    csv_path = str(tmp_path / 'links.csv')
+    store.export_csv(csv_path)
+    with open(csv_path, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == LINK_FIELDS and [row[0] for row in rows[1:]] == [SITE + '/a.pdf', SITE + '/b']
+    assert read_link_list(csv_path) == [SITE + '/a.pdf', SITE + '/b']
+    assert read_link_list(store.db_path, content_type='application/pdf') == [SITE + '/a.pdf']
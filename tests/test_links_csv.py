@@ -0,0 +1,30 @@
+import pytest
+from helper_functions.link_scrapper import load_known_links, save_links_to_csv
+
+def read_links(folder):
+    return (folder / 'links.csv').read_text().splitlines()
+
+def test_missing_links_csv_has_no_known_links(tmp_path):
+    assert load_known_links(str(tmp_path)) == set()
+
+@pytest.mark.parametrize('content', ['', '\n', 'url\nhttps://example.go.id/a\n'])
+def test_links_csv_without_link_column_has_no_known_links(tmp_path, content):
+    (tmp_path / 'links.csv').write_text(content)
+    assert load_known_links(str(tmp_path)) == set()
+
+def test_append_adds_only_new_links(tmp_path):
+    save_links_to_csv(['https://example.go.id/a', 'https://example.go.id/b'], str(tmp_path))
+    save_links_to_csv(['https://example.go.id/b', 'https://example.go.id/c', 'https://example.go.id/c'], str(tmp_path), append=True)
+    assert read_links(tmp_path) == ['link', 'https://example.go.id/a', 'https://example.go.id/b', 'https://example.go.id/c']
+    assert load_known_links(str(tmp_path)) == {'https://example.go.id/a', 'https://example.go.id/b', 'https://example.go.id/c'}
+
+def test_append_to_an_empty_links_csv_writes_the_header(tmp_path):
+    # A run that found no links leaves a links.csv without a header
+    save_links_to_csv([], str(tmp_path))
+    save_links_to_csv(['https://example.go.id/a'], str(tmp_path), append=True)
+    assert read_links(tmp_path) == ['link', 'https://example.go.id/a']
+
+def test_without_append_links_csv_is_rewritten(tmp_path):
+    save_links_to_csv(['https://example.go.id/a'], str(tmp_path))
+    save_links_to_csv(['https://example.go.id/b'], str(tmp_path))
+    assert read_links(tmp_path) == ['link', 'https://example.go.id/b']
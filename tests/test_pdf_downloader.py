@@ -0,0 +1,141 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from helper_functions.pdf_downloader import PDFDownloader, PARTIAL_FOLDER, OK, NOT_PDF, HTTP_ERROR
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PDF = b'%PDF-1.4\n' + bytes(range(256)) * 2000 + b'\n%%EOF\n'
+
+# Path: dict of body, length (send Content-Length), ranges (honour Range), stall (Event the
+# first half of a full response waits on) and etag; requests lists (path, Range header)
+files = {}
+requests_seen = []
+
+class FileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        served = files.get(self.path)
+        if served is None:
+            self.send_error(404)
+            return
+        body = served['body']
+        byte_range = self.headers.get('Range')
+        requests_seen.append((self.path, byte_range))
+        if_range = self.headers.get('If-Range')
+        if byte_range and served['ranges'] and (not if_range or if_range == served.get('etag')):
+            start, end = byte_range.split('=')[1].split('-')
+            start, end = int(start), int(end) if end else len(body) - 1
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+            body = body[start:end + 1]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        if served['length'] or byte_range:
+            self.send_header('Content-Length', str(len(body)))
+        if served['ranges']:
+            self.send_header('Accept-Ranges', 'bytes')
+        if served.get('etag'):
+            self.send_header('ETag', served['etag'])
+        self.end_headers()
+        try:
+            if served.get('stall') and not byte_range:
+                self.wfile.write(body[:len(body) // 2])
+                self.wfile.flush()
+                served['stall'].wait(10)
+                return
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), FileHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    for served in files.values():
+        if served.get('stall'):
+            served['stall'].set()
+    httpd.shutdown()
+
+def serve(path, body=PDF, length=True, ranges=True, stall=False, etag=None):
+    files[path] = {'body': body, 'length': length, 'ranges': ranges, 'stall': threading.Event() if stall else None, 'etag': etag}
+
+def kill_mid_download(output_folder, url):
+    """Runs a download in another process and kills it once part of the file is on disk."""
+    process = subprocess.Popen(
+        [sys.executable, '-c', 'import sys; from helper_functions.pdf_downloader import PDFDownloader; '
+                               'PDFDownloader(sys.argv[1]).download(sys.argv[2])', output_folder, url],
+        cwd=REPO_ROOT, env=dict(os.environ, PYTHONPATH=os.pathsep.join([REPO_ROOT] + sys.path)))
+    partial_folder = os.path.join(output_folder, PARTIAL_FOLDER)
+    deadline = time.monotonic() + 20
+    while time.monotonic() < deadline:
+        parts = [name for name in os.listdir(partial_folder) if name.endswith('.part')] if os.path.isdir(partial_folder) else []
+        if parts and os.path.getsize(os.path.join(partial_folder, parts[0])) > 0:
+            break
+        time.sleep(0.05)
+    process.kill()
+    process.wait()
+    assert parts, "the download never started"
+    return os.path.getsize(os.path.join(partial_folder, parts[0]))
+
+def test_download_streams_whole_pdf(server, tmp_path):
+    serve('/whole.pdf')
+    result = PDFDownloader(str(tmp_path)).download(f'{server}/whole.pdf')
+    assert result['status'] == OK and result['bytes'] == len(PDF)
+    assert (tmp_path / 'whole.pdf').read_bytes() == PDF
+    assert os.listdir(tmp_path / PARTIAL_FOLDER) == []
+
+def test_not_pdf_and_http_errors_keep_no_file(server, tmp_path):
+    serve('/login.pdf', body=b'<html>Please log in</html>')
+    downloader = PDFDownloader(str(tmp_path))
+    assert downloader.download(f'{server}/login.pdf')['status'] == NOT_PDF
+    assert downloader.download(f'{server}/missing.pdf')['status'] == HTTP_ERROR
+    assert [name for name in os.listdir(tmp_path) if name != PARTIAL_FOLDER] == []
+
+def test_large_file_is_assembled_from_parallel_ranges(server, tmp_path):
+    serve('/large.pdf')
+    requests_seen.clear()
+    result = PDFDownloader(str(tmp_path), parallel_min_size=1024, range_parts=4).download(f'{server}/large.pdf')
+    assert result['status'] == OK
+    assert (tmp_path / 'large.pdf').read_bytes() == PDF
+    assert len([byte_range for path, byte_range in requests_seen if path == '/large.pdf' and byte_range]) == 4
+
+def test_killed_download_resumes_with_a_range(server, tmp_path):
+    serve('/resumable.pdf', stall=True, etag='"v1"')
+    requests_seen.clear()
+    partial_size = kill_mid_download(str(tmp_path), f'{server}/resumable.pdf')
+    assert 0 < partial_size < len(PDF)
+
+    result = PDFDownloader(str(tmp_path)).download(f'{server}/resumable.pdf')
+    assert result['status'] == OK
+    assert (tmp_path / 'resumable.pdf').read_bytes() == PDF
+    assert ('/resumable.pdf', f'bytes={partial_size}-{len(PDF) - 1}') in requests_seen
+
+def test_killed_download_without_ranges_starts_over(server, tmp_path):
+    # No Content-Length and no Accept-Ranges: the partial file cannot be told apart from a whole one
+    serve('/unsized.pdf', length=False, ranges=False, stall=True)
+    assert kill_mid_download(str(tmp_path), f'{server}/unsized.pdf') < len(PDF)
+
+    files['/unsized.pdf']['stall'] = None
+    result = PDFDownloader(str(tmp_path)).download(f'{server}/unsized.pdf')
+    assert result['status'] == OK and result['bytes'] == len(PDF)
+    assert (tmp_path / 'unsized.pdf').read_bytes() == PDF
+
+def test_changed_file_is_fetched_anew(server, tmp_path):
+    serve('/changed.pdf', stall=True, etag='"v1"')
+    kill_mid_download(str(tmp_path), f'{server}/changed.pdf')
+
+    changed = PDF.replace(b'%%EOF', b'%%EOF\n% changed')
+    serve('/changed.pdf', body=changed, etag='"v2"')
+    result = PDFDownloader(str(tmp_path)).download(f'{server}/changed.pdf')
+    assert result['status'] == OK
+    assert (tmp_path / 'changed.pdf').read_bytes() == changed
@@ -0,0 +1,91 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from helper_functions.pdf_downloader import PDFDownloader, OK
+from helper_functions.pdf_store import PDFStore, sha256_file, unique_pdf_files
+
+REPORT = b'%PDF-1.4\nlaporan tahunan\n%%EOF\n'
+OTHER = b'%PDF-1.4\nlaporan bulanan\n%%EOF\n'
+
+# Path: body; requests_seen lists the documents fetched
+documents = {}
+requests_seen = []
+
+class DocumentHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in documents:
+            self.send_error(404)
+            return
+        requests_seen.append(self.path)
+        body = documents[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope='module')
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), DocumentHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    httpd.shutdown()
+
+def write(path, body):
+    path.write_bytes(body)
+    return str(path)
+
+def test_store_keeps_each_document_once(tmp_path):
+    store = PDFStore(str(tmp_path / 'store'))
+    project = tmp_path / 'project'
+    project.mkdir()
+    first = store.add(write(project / 'a.pdf', REPORT), 'https://example.go.id/a.pdf')
+    second = store.add(write(project / 'b.pdf', REPORT), 'https://example.go.id/b.pdf')
+    assert first == second == sha256_file(str(project / 'a.pdf'))
+    assert os.path.samefile(project / 'a.pdf', store.object_path(first))
+    assert os.path.samefile(project / 'b.pdf', store.object_path(first))
+    assert store.lookup_url('https://example.go.id/b.pdf') == (first, 'a.pdf')
+    assert store.lookup_url('https://example.go.id/c.pdf') is None
+    store.close()
+
+def test_lookup_ignores_documents_missing_from_the_store(tmp_path):
+    store = PDFStore(str(tmp_path / 'store'))
+    sha256 = store.add(write(tmp_path / 'a.pdf', REPORT), 'https://example.go.id/a.pdf')
+    os.remove(store.object_path(sha256))
+    assert store.lookup_url('https://example.go.id/a.pdf') is None
+    store.close()
+
+def test_unique_pdf_files_leaves_out_duplicates(tmp_path):
+    write(tmp_path / 'a.pdf', REPORT)
+    write(tmp_path / 'b.pdf', OTHER)
+    write(tmp_path / 'c.pdf', REPORT)
+    write(tmp_path / 'notes.txt', REPORT)
+    assert unique_pdf_files(str(tmp_path)) == ['a.pdf', 'b.pdf']
+
+def test_same_document_at_two_urls_is_kept_once(server, tmp_path):
+    documents['/report.pdf'] = REPORT
+    documents['/mirror/laporan.pdf'] = REPORT
+    downloader = PDFDownloader(str(tmp_path), log_path=str(tmp_path / 'log.csv'))
+    results = downloader.run([f'{server}/report.pdf', f'{server}/mirror/laporan.pdf'])
+    assert {result['status'] for result in results.values()} == {OK}
+    assert len({result['file'] for result in results.values()}) == 1
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.pdf')]) == 1
+
+def test_store_serves_other_projects_without_downloading(server, tmp_path):
+    documents['/shared.pdf'] = OTHER
+    store = PDFStore(str(tmp_path / 'store'))
+    first, second = tmp_path / 'first', tmp_path / 'second'
+    first.mkdir()
+    second.mkdir()
+    requests_seen.clear()
+    PDFDownloader(str(first), store=store).run([f'{server}/shared.pdf'])
+    result = PDFDownloader(str(second), store=store).run([f'{server}/shared.pdf'])[f'{server}/shared.pdf']
+    assert requests_seen == ['/shared.pdf']
+    assert result['status'] == OK and result['file'] == 'shared.pdf'
+    assert os.path.samefile(first / 'shared.pdf', second / 'shared.pdf')
+    store.close()
@@ -0,0 +1,69 @@
+import os
+import pytest
+from helper_functions.token_cache import TokenCache, PDF_KIND, WARC_KIND, TOKENS_FOLDER, cached_token_totals
+
+@pytest.fixture
+def subproject(tmp_path):
+    (tmp_path / 'scraped-pdfs').mkdir()
+    return tmp_path
+
+@pytest.fixture
+def cache(subproject):
+    with TokenCache(str(subproject)) as cache:
+        yield cache
+
+def write(path, body, mtime_ns=None):
+    path.write_bytes(body)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+def test_unchanged_file_is_a_hit(cache, subproject):
+    path = write(subproject / 'scraped-pdfs' / 'a.pdf', b'%PDF-1.4 laporan')
+    assert cache.lookup(PDF_KIND, path) is None
+    cache.store(PDF_KIND, path, 120)
+    assert cache.lookup(PDF_KIND, path) == (120, None)
+    # Kinds are kept apart
+    assert cache.lookup(WARC_KIND, path) is None
+
+def test_size_change_is_a_miss(cache, subproject):
+    path = write(subproject / 'scraped-pdfs' / 'a.pdf', b'%PDF-1.4 laporan')
+    cache.store(PDF_KIND, path, 120)
+    write(subproject / 'scraped-pdfs' / 'a.pdf', b'%PDF-1.4 laporan tahunan')
+    assert cache.lookup(PDF_KIND, path) is None
+
+def test_touched_file_is_a_hit_and_keeps_its_new_mtime(cache, subproject):
+    path = write(subproject / 'scraped-pdfs' / 'a.pdf', b'%PDF-1.4 laporan', mtime_ns=1_000_000_000)
+    cache.store(PDF_KIND, path, 120)
+    write(subproject / 'scraped-pdfs' / 'a.pdf', b'%PDF-1.4 laporan', mtime_ns=2_000_000_000)
+    assert cache.lookup(PDF_KIND, path) == (120, None)
+    row = cache.conn.execute("SELECT mtime_ns FROM files WHERE path = ?", (os.path.join('scraped-pdfs', 'a.pdf'),)).fetchone()
+    assert row == (2_000_000_000,)
+
+def test_same_size_new_content_is_a_miss(cache, subproject):
+    path = write(subproject / 'scraped-pdfs' / 'a.pdf', b'%PDF-1.4 laporan', mtime_ns=1_000_000_000)
+    cache.store(PDF_KIND, path, 120)
+    write(subproject / 'scraped-pdfs' / 'a.pdf', b'%PDF-1.4 LAPORAN', mtime_ns=2_000_000_000)
+    assert cache.lookup(PDF_KIND, path) is None
+
+def test_errors_are_cached(cache, subproject):
+    path = write(subproject / 'scraped-pdfs' / 'broken.pdf', b'not a pdf')
+    cache.store(PDF_KIND, path, 0, 'PDFSyntaxError: No /Root object!')
+    assert cache.lookup(PDF_KIND, path) == (0, 'PDFSyntaxError: No /Root object!')
+
+def test_prune_drops_removed_files_of_that_folder_only(cache, subproject):
+    folder = subproject / 'scraped-pdfs'
+    for name in ('a.pdf', 'b.pdf'):
+        cache.store(PDF_KIND, write(folder / name, name.encode()), 10)
+    cache.store(PDF_KIND, write(subproject / 'elsewhere.pdf', b'c'), 5)
+    cache.prune(PDF_KIND, str(folder), ['a.pdf'])
+    assert cache.totals() == {PDF_KIND: (15, 2)}
+    assert cache.lookup(PDF_KIND, str(folder / 'a.pdf')) == (10, None)
+
+def test_cached_token_totals(subproject):
+    assert cached_token_totals(str(subproject)) == {}
+    assert not os.path.exists(subproject / TOKENS_FOLDER)
+    with TokenCache(str(subproject)) as cache:
+        cache.store(PDF_KIND, write(subproject / 'scraped-pdfs' / 'a.pdf', b'a'), 10)
+        cache.store(WARC_KIND, write(subproject / 'a.warc.gz', b'w'), 30)
+    assert cached_token_totals(str(subproject)) == {PDF_KIND: (10, 1), WARC_KIND: (30, 1)}
@@ -0,0 +1,96 @@
+import random
+import pytest
+from helper_functions.token_sampling import stratified_sample, size_strata
+
+def make_units(count, seed=0):
+    """(name, size) units of lognormal sizes, with tokens of about a quarter of the size each."""
+    rng = random.Random(seed)
+    units = [(f'unit-{i}', int(rng.lognormvariate(8, 1)) + 100) for i in range(count)]
+    tokens = {name: int(size * rng.uniform(0.15, 0.35)) for name, size in units}
+    return units, tokens
+
+def measure_with(tokens, calls=None):
+    def measure(batch):
+        if calls is not None:
+            calls.append(len(batch))
+        return [tokens[name] for name in batch]
+    return measure
+
+def test_size_strata_partitions_units():
+    units, _ = make_units(500)
+    strata = size_strata(units, strata=5)
+    assert len(strata) <= 5
+    assert sorted(unit for stratum in strata for unit in stratum) == sorted(units)
+    # Neighbouring sizes: every unit of a stratum is at most as large as those of the next one
+    for smaller, larger in zip(strata, strata[1:]):
+        assert max(size for _, size in smaller) <= min(size for _, size in larger)
+
+def test_size_strata_of_few_units():
+    assert size_strata([], strata=5) == []
+    assert size_strata([('a', 10)], strata=5) == [[('a', 10)]]
+
+def test_exhausted_sample_is_exact():
+    units, tokens = make_units(30)
+    result = stratified_sample(units, measure_with(tokens), target_margin=0.0, seed=1)
+    assert result['stopped'] == 'exhausted'
+    assert result['sampled'] == result['units'] == 30
+    assert result['estimate'] == pytest.approx(sum(tokens.values()))
+    assert result['low'] == result['high'] == result['estimate']
+
+def test_no_units():
+    calls = []
+    result = stratified_sample([], measure_with({}, calls), seed=1)
+    assert result['estimate'] == 0
+    assert result['stopped'] == 'exhausted'
+    assert result['units'] == result['sampled'] == 0
+
+def test_stops_on_margin_before_measuring_everything():
+    units, tokens = make_units(5000)
+    calls = []
+    result = stratified_sample(units, measure_with(tokens, calls), target_margin=0.05, seed=1)
+    assert result['stopped'] == 'margin'
+    assert result['sampled'] < len(units) / 4
+    assert sum(calls) == result['sampled']
+    assert result['margin'] <= 0.05 * result['estimate']
+
+def test_stops_at_time_limit():
+    units, tokens = make_units(5000)
+    result = stratified_sample(units, measure_with(tokens), target_margin=0.0, time_limit=0, seed=1)
+    assert result['stopped'] == 'time'
+    assert result['sampled'] < len(units)
+
+def test_interval_covers_total_in_most_samples():
+    units, tokens = make_units(3000)
+    total = sum(tokens.values())
+    covered = 0
+    for seed in range(40):
+        result = stratified_sample(units, measure_with(tokens), target_margin=0.05, seed=seed)
+        covered += result['low'] <= total <= result['high']
+    # A 95% interval; fewer than 34 of 40 would be well outside chance
+    assert covered >= 34
+
+def test_groups_are_stratified_apart():
+    units, tokens = make_units(200)
+    # One large unit with far fewer tokens per byte than the rest
+    units.append(('whole-file', 200_000))
+    tokens['whole-file'] = 5_000
+    result = stratified_sample(units, measure_with(tokens), target_margin=0.05, seed=1,
+                               group=lambda unit: unit == 'whole-file')
+    assert result['strata'] == 6
+    assert abs(result['estimate'] - sum(tokens.values())) <= 0.1 * sum(tokens.values())
+
+def test_progress_callback_gets_every_round():
+    units, tokens = make_units(1000)
+    progress = []
+    result = stratified_sample(units, measure_with(tokens), seed=1,
+                               progress_callback=lambda estimate, margin, sampled: progress.append(sampled))
+    assert progress[-1] == result['sampled']
+    assert progress == sorted(progress)
+
+def test_units_without_tokens_stop_after_the_minimum_sample():
+    units, _ = make_units(2000)
+    calls = []
+    result = stratified_sample(units, measure_with({name: 0 for name, _ in units}, calls), seed=1)
+    assert result['stopped'] == 'margin'
+    assert result['estimate'] == result['margin'] == 0
+    assert sum(calls) == result['sampled'] == 10 * result['strata']
@@ -0,0 +1,87 @@
+import pytest
+from helper_functions.url_index import BloomFilter, SeenIndex, LINKS, PDFS, canonical_key, dedupe_urls, url_hash
+
+@pytest.mark.parametrize('first, second', [
+    ('http://example.go.id/berita', 'https://www.example.go.id/berita/'),
+    ('https://example.go.id:443/a/./b/../c', 'https://example.go.id/a/c'),
+    ('https://example.go.id/p?b=2&a=1', 'https://example.go.id/p?a=1&b=2'),
+    ('https://example.go.id/p?id=3&utm_source=x&fbclid=y', 'https://example.go.id/p?id=3'),
+    ('https://example.go.id/p#section', 'https://example.go.id/p'),
+    ('https://example.go.id/a%20b', 'https://example.go.id/a b'),
+    ('https://Example.GO.id/p', 'https://example.go.id/p'),
+])
+def test_canonical_key_matches_variants(first, second):
+    assert canonical_key(first) == canonical_key(second)
+
+@pytest.mark.parametrize('first, second', [
+    ('https://example.go.id/a', 'https://example.go.id/b'),
+    ('https://example.go.id/p?id=1', 'https://example.go.id/p?id=2'),
+    ('https://example.go.id:8080/p', 'https://example.go.id/p'),
+    ('https://example.go.id/Berita', 'https://example.go.id/berita'),
+])
+def test_canonical_key_keeps_different_pages_apart(first, second):
+    assert canonical_key(first) != canonical_key(second)
+
+def test_canonical_key_leaves_other_schemes():
+    assert canonical_key(' mailto:info@example.go.id ') == 'mailto:info@example.go.id'
+
+def test_url_hash_depends_on_kind():
+    assert url_hash('https://example.go.id/a', LINKS) != url_hash('https://example.go.id/a', PDFS)
+
+def test_dedupe_urls_keeps_first_variant():
+    assert dedupe_urls(['https://example.go.id/a/', 'http://www.example.go.id/a', 'https://example.go.id/b']) == [
+        'https://example.go.id/a/', 'https://example.go.id/b']
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives(tmp_path):
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    added = [url_hash(f'https://example.go.id/{i}', LINKS) for i in range(10_000)]
+    for value in added:
+        bloom.add(value)
+    assert all(value in bloom for value in added)
+    others = [url_hash(f'https://other.go.id/{i}', LINKS) for i in range(10_000)]
+    assert sum(value in bloom for value in others) < 300
+
+    bloom.save(str(tmp_path / 'bloom.bin'))
+    loaded = BloomFilter.load(str(tmp_path / 'bloom.bin'))
+    assert loaded.count == bloom.count and all(value in loaded for value in added[:100])
+
+def test_bloom_filter_load_rejects_bad_file(tmp_path):
+    (tmp_path / 'bloom.bin').write_bytes(b'not a bloom filter')
+    assert BloomFilter.load(str(tmp_path / 'bloom.bin')) is None
+    assert BloomFilter.load(str(tmp_path / 'missing.bin')) is None
+
+def test_seen_index_filter_new_and_add(tmp_path):
+    index = SeenIndex(str(tmp_path / 'index'))
+    urls = [f'https://example.go.id/{i}' for i in range(100)]
+    assert index.filter_new(urls, LINKS) == urls
+    assert index.add(urls[:50], LINKS) == 50
+    assert index.filter_new(urls, LINKS) == urls[50:]
+    # Variants of seen URLs are seen too, and kinds are kept apart
+    assert index.filter_new(['http://www.example.go.id/3/', 'https://example.go.id/3?utm_medium=x'], LINKS) == []
+    assert index.filter_new(urls[:2], PDFS) == urls[:2]
+    assert index.contains('https://example.go.id/7', LINKS) and not index.contains('https://example.go.id/70', LINKS)
+    index.close()
+
+def test_seen_index_add_new_returns_each_url_once(tmp_path):
+    index = SeenIndex(str(tmp_path / 'index'))
+    assert index.add_new(['https://example.go.id/a', 'https://example.go.id/a/', 'https://example.go.id/b'], LINKS) == [
+        'https://example.go.id/a', 'https://example.go.id/b']
+    assert index.add_new(['https://example.go.id/b', 'https://example.go.id/c'], LINKS) == ['https://example.go.id/c']
+    index.close()
+
+def test_seen_index_survives_reopen_and_stale_bloom(tmp_path):
+    folder = str(tmp_path / 'index')
+    index = SeenIndex(folder)
+    index.add([f'https://example.go.id/{i}' for i in range(20)], LINKS)
+    index.close()
+
+    reopened = SeenIndex(folder)
+    assert reopened.count == 20
+    assert reopened.filter_new(['https://example.go.id/5', 'https://example.go.id/50'], LINKS) == ['https://example.go.id/50']
+    reopened.close()
+
+    # A filter saved before other URLs were added is rebuilt from the database
+    (tmp_path / 'index' / 'bloom.bin').unlink()
+    rebuilt = SeenIndex(folder)
+    assert rebuilt.filter_new(['https://example.go.id/5'], LINKS) == []
+    rebuilt.close()